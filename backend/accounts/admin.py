@@ -2,6 +2,8 @@ from django.contrib import admin
 from django.utils.html import format_html
 from django.utils import timezone
 
+from umrah_link.cache import invalidate_public_listings
+
 from .models import CustomerProfile, ProviderProfile, User
 
 
@@ -59,11 +61,13 @@ class UserAdmin(admin.ModelAdmin):
     @admin.action(description="Ban selected users")
     def ban_selected_users(self, request, queryset):
         updated = queryset.filter(is_superuser=False).update(is_banned=True, is_active=False)
+        invalidate_public_listings()
         self.message_user(request, f"{updated} user(s) banned.")
 
     @admin.action(description="Unban selected users")
     def unban_selected_users(self, request, queryset):
         updated = queryset.update(is_banned=False, is_active=True)
+        invalidate_public_listings()
         self.message_user(request, f"{updated} user(s) unbanned.")
 
 
@@ -175,6 +179,7 @@ class ProviderProfileAdmin(admin.ModelAdmin):
             approved_by=request.user,
             rejected_reason="",
         )
+        invalidate_public_listings()
         self.message_user(request, f"{updated} provider profile(s) approved.")
 
     @admin.action(description="Reject selected providers")
@@ -183,6 +188,7 @@ class ProviderProfileAdmin(admin.ModelAdmin):
             verification_status=ProviderProfile.VerificationStatus.REJECTED,
             is_accepting_bookings=False,
         )
+        invalidate_public_listings()
         self.message_user(request, f"{updated} provider profile(s) rejected.")
 
     @admin.action(description="Suspend selected providers")
@@ -191,6 +197,7 @@ class ProviderProfileAdmin(admin.ModelAdmin):
             verification_status=ProviderProfile.VerificationStatus.SUSPENDED,
             is_accepting_bookings=False,
         )
+        invalidate_public_listings()
         self.message_user(request, f"{updated} provider profile(s) suspended.")
 
     @admin.action(description="Ban selected provider user accounts")
@@ -201,4 +208,5 @@ class ProviderProfileAdmin(admin.ModelAdmin):
             verification_status=ProviderProfile.VerificationStatus.SUSPENDED,
             is_accepting_bookings=False,
         )
+        invalidate_public_listings()
         self.message_user(request, f"{updated} provider user account(s) banned.")
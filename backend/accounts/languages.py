@@ -0,0 +1,26 @@
+import re
+
+
+def normalize_language(value) -> str:
+    return re.sub(r"\s+", " ", str(value or "")).strip().casefold()[:64]
+
+
+def normalize_languages(values) -> list[str]:
+    if not isinstance(values, (list, tuple)):
+        return []
+    codes = []
+    for value in values:
+        code = normalize_language(value)
+        if code and code not in codes:
+            codes.append(code)
+    return codes
+
+
+def sync_language_rows(*, model, owner_field: str, owner_id: int, languages) -> None:
+    """Mirror a JSON language list into its indexed lookup table."""
+    codes = normalize_languages(languages)
+    model.objects.filter(**{owner_field: owner_id}).exclude(code__in=codes).delete()
+    model.objects.bulk_create(
+        [model(**{owner_field: owner_id, "code": code}) for code in codes],
+        ignore_conflicts=True,
+    )
@@ -0,0 +1,35 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:40
+
+from django.db import migrations, models
+
+
+def mark_stored_photos(apps, schema_editor):
+    from accounts.photo_store import get_provider_photo
+
+    ProviderProfile = apps.get_model("accounts", "ProviderProfile")
+    stored_ids = [
+        profile_id
+        for profile_id in ProviderProfile.objects.values_list("id", flat=True).iterator()
+        if get_provider_photo(provider_profile_id=profile_id)
+    ]
+    ProviderProfile.objects.filter(id__in=stored_ids).update(profile_photo_version=1)
+
+
+def noop_reverse(apps, schema_editor):
+    return
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0003_sanitize_provider_profile_data'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='providerprofile',
+            name='profile_photo_version',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(mark_stored_photos, noop_reverse),
+    ]
@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_provider_languages(apps, schema_editor):
+    from accounts.languages import normalize_languages
+
+    ProviderProfile = apps.get_model("accounts", "ProviderProfile")
+    ProviderLanguage = apps.get_model("accounts", "ProviderLanguage")
+    rows = [
+        ProviderLanguage(provider_id=profile_id, code=code)
+        for profile_id, languages in ProviderProfile.objects.values_list("id", "supported_languages").iterator()
+        for code in normalize_languages(languages)
+    ]
+    ProviderLanguage.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+
+
+def noop_reverse(apps, schema_editor):
+    return
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0004_providerprofile_profile_photo_version'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderLanguage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=64)),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='language_codes', to='accounts.providerprofile')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['code', 'provider'], name='provider_language_code_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='providerlanguage',
+            constraint=models.UniqueConstraint(fields=('provider', 'code'), name='uniq_provider_language'),
+        ),
+        migrations.RunPython(backfill_provider_languages, noop_reverse),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0005_provider_language'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='providerprofile',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 09:12
+
+from django.db import migrations, models
+
+
+def mark_stored_photos(apps, schema_editor):
+    ProviderProfile = apps.get_model("accounts", "ProviderProfile")
+    ProviderProfile.objects.filter(profile_photo_version__gt=0).update(profile_photo_stored=True)
+
+
+def noop_reverse(apps, schema_editor):
+    return
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_providerprofile_rating_sum'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='providerprofile',
+            name='profile_photo_stored',
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(mark_stored_photos, noop_reverse),
+    ]
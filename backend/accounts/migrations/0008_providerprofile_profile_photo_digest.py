@@ -0,0 +1,36 @@
+# Generated by Django 4.2.30 on 2026-10-17 09:40
+
+import hashlib
+
+from django.db import migrations, models
+
+
+def record_photo_digests(apps, schema_editor):
+    from accounts.photo_store import get_provider_photo
+
+    ProviderProfile = apps.get_model("accounts", "ProviderProfile")
+    for profile in ProviderProfile.objects.filter(profile_photo_stored=True).only("id").iterator():
+        stored_photo = get_provider_photo(provider_profile_id=profile.id)
+        if stored_photo:
+            profile.profile_photo_digest = hashlib.sha256(stored_photo["content"]).hexdigest()
+            profile.save(update_fields=["profile_photo_digest"])
+
+
+def noop_reverse(apps, schema_editor):
+    return
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0007_providerprofile_profile_photo_stored'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='providerprofile',
+            name='profile_photo_digest',
+            field=models.CharField(blank=True, max_length=64),
+        ),
+        migrations.RunPython(record_photo_digests, noop_reverse),
+    ]
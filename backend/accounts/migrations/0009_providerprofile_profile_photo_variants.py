@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 10:05
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0008_providerprofile_profile_photo_digest'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='providerprofile',
+            name='profile_photo_variants',
+            field=models.JSONField(blank=True, default=list),
+        ),
+    ]
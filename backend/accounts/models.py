@@ -1,6 +1,10 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
 
+from umrah_link.cache import invalidate_public_listings
+
+from .languages import sync_language_rows
+
 
 class User(AbstractUser):
     class Role(models.TextChoices):
@@ -46,6 +50,13 @@ class ProviderProfile(models.Model):
     base_locations = models.JSONField(default=list, blank=True)
     supported_languages = models.JSONField(default=list, blank=True)
     profile_photo = models.FileField(upload_to="providers/profile/%Y/%m/%d", blank=True, null=True)
+    # Bumped whenever a photo blob is written to photo_store and never reset; names the stored variant files.
+    profile_photo_version = models.PositiveIntegerField(default=0)
+    profile_photo_stored = models.BooleanField(default=False)
+    # SHA-256 of the stored blob, taken at upload; photo URLs and ETags are built from it.
+    profile_photo_digest = models.CharField(max_length=64, blank=True)
+    # "<size>.<format>" keys of the variants already written to storage for the current version.
+    profile_photo_variants = models.JSONField(default=list, blank=True)
     years_experience = models.PositiveIntegerField(default=0)
     credentials_summary = models.TextField(blank=True)
     is_accepting_bookings = models.BooleanField(default=False)
@@ -56,6 +67,8 @@ class ProviderProfile(models.Model):
     )
     rating_average = models.DecimalField(max_digits=3, decimal_places=2, default=0)
     total_reviews = models.PositiveIntegerField(default=0)
+    # Sum of public review ratings; rating_average is derived from it and total_reviews.
+    rating_sum = models.PositiveIntegerField(default=0)
     approved_at = models.DateTimeField(null=True, blank=True)
     approved_by = models.ForeignKey(
         User,
@@ -74,3 +87,32 @@ class ProviderProfile(models.Model):
     @property
     def is_verified(self) -> bool:
         return self.verification_status == self.VerificationStatus.APPROVED
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "supported_languages" in update_fields:
+            sync_language_rows(
+                model=ProviderLanguage,
+                owner_field="provider_id",
+                owner_id=self.pk,
+                languages=self.supported_languages,
+            )
+        invalidate_public_listings()
+
+
+class ProviderLanguage(models.Model):
+    # Normalized copy of ProviderProfile.supported_languages so directory filters hit an index.
+    provider = models.ForeignKey(ProviderProfile, on_delete=models.CASCADE, related_name="language_codes")
+    code = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["provider", "code"], name="uniq_provider_language"),
+        ]
+        indexes = [
+            models.Index(fields=["code", "provider"], name="provider_language_code_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"ProviderLanguage<{self.provider_id}:{self.code}>"
@@ -0,0 +1,119 @@
+from io import BytesIO
+from typing import Optional
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from .models import ProviderProfile
+from .photo_store import get_provider_photo
+
+PHOTO_VARIANT_SIZES = (64, 256, 768)
+PHOTO_VARIANT_FORMATS = {
+    "webp": ("WEBP", "image/webp"),
+    "jpeg": ("JPEG", "image/jpeg"),
+}
+DEFAULT_PHOTO_VARIANT_FORMAT = "webp"
+PHOTO_VARIANT_QUALITY = 82
+PHOTO_VARIANT_ROOT = "provider_photos/variants"
+
+
+def photo_variant_path(*, provider_profile_id: int, version: int, size: int, image_format: str) -> str:
+    return f"{PHOTO_VARIANT_ROOT}/{provider_profile_id}/v{version}/{size}.{image_format}"
+
+
+def _variant_paths(*, provider_profile_id: int, version: int) -> list[str]:
+    return [
+        photo_variant_path(
+            provider_profile_id=provider_profile_id,
+            version=version,
+            size=size,
+            image_format=image_format,
+        )
+        for size in PHOTO_VARIANT_SIZES
+        for image_format in PHOTO_VARIANT_FORMATS
+    ]
+
+
+def render_photo_variant(content: bytes, *, size: int, image_format: str) -> Optional[bytes]:
+    pil_format, _content_type = PHOTO_VARIANT_FORMATS[image_format]
+    try:
+        with Image.open(BytesIO(content)) as source:
+            image = ImageOps.exif_transpose(source)
+            image.thumbnail((size, size), Image.Resampling.LANCZOS)
+            if pil_format == "JPEG" and image.mode != "RGB":
+                image = image.convert("RGB")
+            elif image.mode not in {"RGB", "RGBA"}:
+                image = image.convert("RGBA")
+            output = BytesIO()
+            image.save(output, format=pil_format, quality=PHOTO_VARIANT_QUALITY)
+    except (OSError, ValueError, Image.DecompressionBombError):
+        return None
+    return output.getvalue()
+
+
+def _store_variant(path: str, rendered: bytes) -> None:
+    # Paths are versioned, so an existing file already holds these bytes; saving again would only add a renamed copy.
+    if not default_storage.exists(path):
+        default_storage.save(path, ContentFile(rendered))
+
+
+def photo_variant_key(*, size: int, image_format: str) -> str:
+    return f"{size}.{image_format}"
+
+
+def generate_photo_variants(*, provider_profile_id: int, version: int, content: bytes) -> list[str]:
+    """Render every size/format once at upload time, store them next to the upload and return their keys."""
+    variants = {}
+    for size in PHOTO_VARIANT_SIZES:
+        for image_format in PHOTO_VARIANT_FORMATS:
+            rendered = render_photo_variant(content, size=size, image_format=image_format)
+            if rendered is None:
+                return []
+            path = photo_variant_path(
+                provider_profile_id=provider_profile_id,
+                version=version,
+                size=size,
+                image_format=image_format,
+            )
+            variants[path] = (photo_variant_key(size=size, image_format=image_format), rendered)
+    for path, (_key, rendered) in variants.items():
+        _store_variant(path, rendered)
+    return [key for key, _rendered in variants.values()]
+
+
+def invalidate_photo_variants(*, provider_profile_id: int, version: int) -> None:
+    if version:
+        for path in _variant_paths(provider_profile_id=provider_profile_id, version=version):
+            default_storage.delete(path)
+
+
+def get_photo_variant(*, profile, size: int, image_format: str) -> Optional[str]:
+    """Return the storage path of a variant, or None if the original cannot be rendered.
+
+    Variants listed on profile.profile_photo_variants are returned without touching storage, so a
+    hit costs no remote round trip. Anything else is rendered from the original once and recorded.
+    """
+    path = photo_variant_path(
+        provider_profile_id=profile.pk,
+        version=profile.profile_photo_version,
+        size=size,
+        image_format=image_format,
+    )
+    key = photo_variant_key(size=size, image_format=image_format)
+    if key in profile.profile_photo_variants:
+        return path
+
+    stored_photo = get_provider_photo(provider_profile_id=profile.pk)
+    if not stored_photo:
+        return None
+    rendered = render_photo_variant(stored_photo["content"], size=size, image_format=image_format)
+    if rendered is None:
+        return None
+    _store_variant(path, rendered)
+    profile.profile_photo_variants = [*profile.profile_photo_variants, key]
+    # Guard on the version so a request racing a new upload cannot record a key for the old files.
+    ProviderProfile.objects.filter(pk=profile.pk, profile_photo_version=profile.profile_photo_version).update(
+        profile_photo_variants=profile.profile_photo_variants
+    )
+    return path
@@ -1,3 +1,4 @@
+import hashlib
 import re
 
 from django.contrib.auth import get_user_model
@@ -6,7 +7,8 @@ from django.urls import reverse
 from rest_framework import serializers
 
 from .models import CustomerProfile, ProviderProfile
-from .photo_store import delete_provider_photo, get_provider_photo, upsert_provider_photo
+from .photo_store import delete_provider_photo, upsert_provider_photo
+from .photo_variants import generate_photo_variants, invalidate_photo_variants
 
 User = get_user_model()
 
@@ -69,24 +71,23 @@ def resolve_file_url(request, file_field):
     return url
 
 
-def resolve_provider_photo_url(request, profile):
+def provider_photo_url_version(profile):
+    # A digest prefix can only ever name one set of bytes, so URLs carrying it may be cached as immutable.
+    return profile.profile_photo_digest[:16] or str(profile.profile_photo_version)
+
+
+def resolve_provider_photo_url(request, profile, size=None):
     if not profile:
         return ""
-    stored_photo = get_provider_photo(provider_profile_id=profile.pk)
-    if stored_photo:
+    if profile.profile_photo_stored:
         photo_path = reverse("provider-directory-photo", kwargs={"pk": profile.pk})
+        photo_path = f"{photo_path}?v={provider_photo_url_version(profile)}"
+        if size:
+            photo_path = f"{photo_path}&size={size}"
         if request:
             return request.build_absolute_uri(photo_path)
         return photo_path
-    file_field = getattr(profile, "profile_photo", None)
-    if not file_field:
-        return ""
-    try:
-        if file_field.storage.exists(file_field.name):
-            return resolve_file_url(request, file_field)
-    except Exception:  # pragma: no cover
-        return ""
-    return ""
+    return resolve_file_url(request, getattr(profile, "profile_photo", None))
 
 
 def read_uploaded_photo_blob(file_obj):
@@ -108,6 +109,54 @@ def read_uploaded_photo_blob(file_obj):
     return content, str(getattr(file_obj, "content_type", "") or "application/octet-stream")
 
 
+def store_provider_photo(profile, *, content, content_type):
+    if not content:
+        return
+    try:
+        upsert_provider_photo(
+            provider_profile_id=profile.id,
+            content=content,
+            content_type=content_type,
+        )
+    except Exception:  # pragma: no cover
+        return
+    previous_version = profile.profile_photo_version if profile.profile_photo_stored else 0
+    profile.profile_photo_version += 1
+    profile.profile_photo_stored = True
+    profile.profile_photo_digest = hashlib.sha256(content).hexdigest()
+    profile.profile_photo_variants = generate_photo_variants(
+        provider_profile_id=profile.id,
+        version=profile.profile_photo_version,
+        content=content,
+    )
+    profile.save(
+        update_fields=[
+            "profile_photo_version",
+            "profile_photo_stored",
+            "profile_photo_digest",
+            "profile_photo_variants",
+            "updated_at",
+        ]
+    )
+    invalidate_photo_variants(provider_profile_id=profile.id, version=previous_version)
+
+
+def clear_provider_photo(profile):
+    try:
+        delete_provider_photo(provider_profile_id=profile.id)
+    except Exception:  # pragma: no cover
+        return
+    if profile.profile_photo_stored:
+        invalidate_photo_variants(provider_profile_id=profile.id, version=profile.profile_photo_version)
+        # Keep the version: the next upload must not reuse a ?v= URL that clients cached as immutable.
+        profile.profile_photo_stored = False
+        profile.profile_photo_digest = ""
+        profile.profile_photo_variants = []
+        profile.save(
+            update_fields=["profile_photo_stored", "profile_photo_digest", "profile_photo_variants", "updated_at"]
+        )
+
+
 def normalize_provider_location(value):
     text = str(value or "").strip()
     if not text:
@@ -282,21 +331,10 @@ class ProviderProfileSerializer(serializers.ModelSerializer):
 
         profile = super().update(instance, validated_data)
         if remove_profile_photo:
-            try:
-                delete_provider_photo(provider_profile_id=profile.id)
-            except Exception:  # pragma: no cover
-                pass
+            clear_provider_photo(profile)
         elif new_profile_photo:
             blob, content_type = read_uploaded_photo_blob(new_profile_photo)
-            if blob:
-                try:
-                    upsert_provider_photo(
-                        provider_profile_id=profile.id,
-                        content=blob,
-                        content_type=content_type,
-                    )
-                except Exception:  # pragma: no cover
-                    pass
+            store_provider_photo(profile, content=blob, content_type=content_type)
         return profile
 
     class Meta:
@@ -437,15 +475,7 @@ class ProviderRegisterSerializer(BaseRegisterSerializer):
             years_experience=years_experience,
             credentials_summary=credentials_summary,
         )
-        if profile_photo_blob:
-            try:
-                upsert_provider_photo(
-                    provider_profile_id=profile.id,
-                    content=profile_photo_blob,
-                    content_type=profile_photo_content_type,
-                )
-            except Exception:  # pragma: no cover
-                pass
+        store_provider_photo(profile, content=profile_photo_blob, content_type=profile_photo_content_type)
         return user
 
 
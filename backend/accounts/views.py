@@ -9,7 +9,9 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
 
-from notifications.services import notify_user
+from notifications.services import notify_many, notify_user
+from umrah_link.cache import invalidate_public_listings
+from umrah_link.pagination import CreatedAtCursorPagination, DateJoinedCursorPagination
 
 from .models import ProviderProfile
 from .permissions import IsPlatformAdmin
@@ -39,18 +41,17 @@ def notify_admins_about_registration(*, registered_user: User):
     ).exclude(id=registered_user.id)
 
     role_label = "provider" if registered_user.role == User.Role.PROVIDER else "customer"
-    for admin_user in admin_users:
-        notify_user(
-            user=admin_user,
-            title="Someone registered",
-            body=f"New {role_label} registered: {registered_user.username} ({registered_user.email}).",
-            metadata={
-                "source": "registration_alert",
-                "registered_user_id": registered_user.id,
-                "registered_user_role": registered_user.role,
-                "registered_user_email": registered_user.email,
-            },
-        )
+    notify_many(
+        users=admin_users.only("id", "email", "phone_number"),
+        title="Someone registered",
+        body=f"New {role_label} registered: {registered_user.username} ({registered_user.email}).",
+        metadata={
+            "source": "registration_alert",
+            "registered_user_id": registered_user.id,
+            "registered_user_role": registered_user.role,
+            "registered_user_email": registered_user.email,
+        },
+    )
 
 
 class RegisterCustomerView(APIView):
@@ -174,6 +175,7 @@ class LogoutView(APIView):
 class ProviderModerationViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated, IsPlatformAdmin]
     serializer_class = ProviderProfileSerializer
+    pagination_class = CreatedAtCursorPagination
 
     def get_queryset(self):
         queryset = ProviderProfile.objects.select_related("user", "payout_profile").all()
@@ -230,6 +232,7 @@ class ProviderModerationViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin
         profile.user.is_banned = True
         profile.user.is_active = False
         profile.user.save(update_fields=["is_banned", "is_active", "updated_at"])
+        invalidate_public_listings()
         notify_user(
             user=profile.user,
             title="Account banned",
@@ -243,6 +246,7 @@ class ProviderModerationViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin
 class UserModerationViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated, IsPlatformAdmin]
     serializer_class = UserSerializer
+    pagination_class = DateJoinedCursorPagination
 
     def get_queryset(self):
         queryset = User.objects.all()
@@ -265,6 +269,7 @@ class UserModerationViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, vi
         user.is_banned = True
         user.is_active = False
         user.save(update_fields=["is_banned", "is_active", "updated_at"])
+        invalidate_public_listings()
         notify_user(
             user=user,
             title="Account banned",
@@ -280,6 +285,7 @@ class UserModerationViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, vi
         user.is_banned = False
         user.is_active = True
         user.save(update_fields=["is_banned", "is_active", "updated_at"])
+        invalidate_public_listings()
         notify_user(
             user=user,
             title="Account reactivated",
@@ -1,6 +1,6 @@
 from django.contrib import admin
 
-from .models import Booking, BookingStatusEvent, PaymentWebhookEvent
+from .models import Booking, BookingStatusEvent, PaymentReference, PaymentWebhookEvent
 
 
 @admin.register(Booking)
@@ -29,4 +29,10 @@ class BookingStatusEventAdmin(admin.ModelAdmin):
 class PaymentWebhookEventAdmin(admin.ModelAdmin):
     list_display = ("id", "booking", "event_type", "processed", "received_at")
     list_filter = ("event_type", "processed")
-    search_fields = ("external_reference",)
+    search_fields = ("external_event_id", "external_reference")
+
+
+@admin.register(PaymentReference)
+class PaymentReferenceAdmin(admin.ModelAdmin):
+    list_display = ("id", "reference", "booking", "created_at")
+    search_fields = ("reference", "booking__reference")
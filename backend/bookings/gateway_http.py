@@ -0,0 +1,180 @@
+import ssl
+import threading
+import time
+from dataclasses import dataclass
+from http.client import HTTPConnection, HTTPException, HTTPSConnection, RemoteDisconnected
+from typing import Optional
+from urllib.parse import urlsplit
+
+from django.conf import settings
+
+# Errors that mean the server dropped an idle keep-alive connection before reading our request.
+STALE_CONNECTION_ERRORS = (RemoteDisconnected, ConnectionResetError, BrokenPipeError)
+# Only these may be sent twice: once the request is on the wire, a POST may already have been acted on.
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD"})
+
+
+class GatewayConnectionError(RuntimeError):
+    pass
+
+
+@dataclass
+class GatewayResponse:
+    status: int
+    headers: dict[str, str]
+    body: bytes
+
+
+class _HostPool:
+    def __init__(self, max_connections: int):
+        self.slots = threading.BoundedSemaphore(max_connections)
+        self.idle: list[tuple[HTTPConnection, float]] = []
+        self.lock = threading.Lock()
+
+
+class GatewayHTTPClient:
+    """Keep-alive HTTP(S) client shared by the payment gateways, with a bounded connection pool per host."""
+
+    def __init__(
+        self,
+        *,
+        max_connections_per_host: int = 4,
+        connect_timeout: float = 5.0,
+        read_timeout: float = 20.0,
+        idle_timeout: float = 60.0,
+        pool_timeout: float = 10.0,
+        ssl_context: Optional[ssl.SSLContext] = None,
+    ):
+        self.max_connections_per_host = max(1, max_connections_per_host)
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.idle_timeout = idle_timeout
+        self.pool_timeout = pool_timeout
+        self.ssl_context = ssl_context or ssl.create_default_context()
+        self._pools: dict[tuple[str, str, int], _HostPool] = {}
+        self._pools_lock = threading.Lock()
+        self.connections_opened = 0
+
+    def _pool(self, key: tuple[str, str, int]) -> _HostPool:
+        with self._pools_lock:
+            if key not in self._pools:
+                self._pools[key] = _HostPool(self.max_connections_per_host)
+            return self._pools[key]
+
+    def _open(self, scheme: str, host: str, port: int) -> HTTPConnection:
+        if scheme == "https":
+            connection = HTTPSConnection(host, port, timeout=self.connect_timeout, context=self.ssl_context)
+        else:
+            connection = HTTPConnection(host, port, timeout=self.connect_timeout)
+        connection.connect()
+        connection.sock.settimeout(self.read_timeout)
+        with self._pools_lock:
+            self.connections_opened += 1
+        return connection
+
+    def _checkout(self, pool: _HostPool) -> Optional[HTTPConnection]:
+        now = time.monotonic()
+        with pool.lock:
+            while pool.idle:
+                connection, idle_since = pool.idle.pop()
+                if now - idle_since < self.idle_timeout:
+                    return connection
+                connection.close()
+        return None
+
+    def _checkin(self, pool: _HostPool, connection: HTTPConnection) -> None:
+        with pool.lock:
+            pool.idle.append((connection, time.monotonic()))
+
+    def request(
+        self,
+        method: str,
+        url: str,
+        *,
+        headers: Optional[dict[str, str]] = None,
+        body: Optional[bytes] = None,
+    ) -> GatewayResponse:
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in {"http", "https"} or not parts.hostname:
+            raise GatewayConnectionError(f"Unsupported gateway URL: {url}")
+        port = parts.port or (443 if scheme == "https" else 80)
+        target = parts.path or "/"
+        if parts.query:
+            target = f"{target}?{parts.query}"
+
+        pool = self._pool((scheme, parts.hostname, port))
+        if not pool.slots.acquire(timeout=self.pool_timeout):
+            raise GatewayConnectionError(f"No free connection to {parts.hostname} within {self.pool_timeout}s.")
+        try:
+            connection = self._checkout(pool)
+            reused = connection is not None
+            method = method.upper()
+            while True:
+                sent = False
+                try:
+                    if connection is None:
+                        connection = self._open(scheme, parts.hostname, port)
+                    connection.request(method, target, body=body, headers=headers or {})
+                    sent = True
+                    response = connection.getresponse()
+                    payload = response.read()
+                except STALE_CONNECTION_ERRORS as exc:
+                    if connection is not None:
+                        connection.close()
+                    connection = None
+                    if reused and (not sent or method in IDEMPOTENT_METHODS):
+                        reused = False
+                        continue
+                    raise GatewayConnectionError(str(exc) or exc.__class__.__name__) from exc
+                except (OSError, HTTPException) as exc:
+                    if connection is not None:
+                        connection.close()
+                    raise GatewayConnectionError(str(exc) or exc.__class__.__name__) from exc
+                break
+
+            if response.will_close:
+                connection.close()
+            else:
+                self._checkin(pool, connection)
+            return GatewayResponse(
+                status=response.status,
+                headers={name.lower(): value for name, value in response.getheaders()},
+                body=payload,
+            )
+        finally:
+            pool.slots.release()
+
+    def close(self) -> None:
+        with self._pools_lock:
+            pools = list(self._pools.values())
+            self._pools = {}
+        for pool in pools:
+            with pool.lock:
+                for connection, _idle_since in pool.idle:
+                    connection.close()
+                pool.idle = []
+
+
+_client: Optional[GatewayHTTPClient] = None
+_client_lock = threading.Lock()
+
+
+def get_gateway_client() -> GatewayHTTPClient:
+    global _client
+    with _client_lock:
+        if _client is None:
+            _client = GatewayHTTPClient(
+                max_connections_per_host=settings.PAYMENT_GATEWAY_MAX_CONNECTIONS,
+                connect_timeout=settings.PAYMENT_GATEWAY_CONNECT_TIMEOUT,
+                read_timeout=settings.PAYMENT_GATEWAY_READ_TIMEOUT,
+            )
+        return _client
+
+
+def reset_gateway_client() -> None:
+    global _client
+    with _client_lock:
+        client, _client = _client, None
+    if client is not None:
+        client.close()
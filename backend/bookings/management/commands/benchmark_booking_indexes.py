@@ -0,0 +1,186 @@
+import time
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import DEFAULT_DB_ALIAS, connections, transaction
+from django.utils import timezone
+
+from accounts.models import ProviderProfile, User
+from bookings.models import Booking
+from marketplace.models import Service
+
+SEED_BATCH_SIZE = 5000
+
+
+class BenchmarkRollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = (
+        "Seed synthetic bookings inside a transaction, print query plans and timings for the booking hot paths "
+        "with and without the Booking indexes, then roll everything back."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=1_000_000)
+        parser.add_argument("--customers", type=int, default=1000)
+        parser.add_argument("--providers", type=int, default=200)
+        parser.add_argument("--repeat", type=int, default=5, help="Runs per query; the fastest is reported.")
+        parser.add_argument(
+            "--database",
+            default=DEFAULT_DB_ALIAS,
+            help="Database alias to benchmark; point it at a scratch copy rather than the live database.",
+        )
+        parser.add_argument(
+            "--i-know-this-locks-bookings",
+            action="store_true",
+            dest="allow_locking",
+            help="Run against the default database outside DEBUG anyway.",
+        )
+
+    def handle(self, *args, **options):
+        self.database = options["database"]
+        if self.database not in connections:
+            raise CommandError(f"Unknown database alias: {self.database}")
+        # Dropping the indexes takes an exclusive lock on bookings_booking until the rollback at the end,
+        # which would stall every booking query on a live database for the whole run.
+        if self.database == DEFAULT_DB_ALIAS and not settings.DEBUG and not options["allow_locking"]:
+            raise CommandError(
+                "This command locks the bookings table for the whole run. Use --database with a scratch "
+                "database, or pass --i-know-this-locks-bookings."
+            )
+        self.connection = connections[self.database]
+        repeat = max(1, options["repeat"])
+        try:
+            with transaction.atomic(using=self.database):
+                self._seed(
+                    rows=max(1, options["rows"]),
+                    customers=max(1, options["customers"]),
+                    providers=max(1, options["providers"]),
+                )
+                self.stdout.write(self.style.MIGRATE_LABEL("With Booking indexes"))
+                with_indexes = self._report(repeat=repeat)
+                if self.connection.features.can_rollback_ddl:
+                    self._drop_indexes()
+                    self.stdout.write(self.style.MIGRATE_LABEL("Without Booking indexes"))
+                    without_indexes = self._report(repeat=repeat)
+                    self._summarize(before=without_indexes, after=with_indexes)
+                else:
+                    self.stdout.write("This database cannot roll back DDL; skipped the run without indexes.")
+                raise BenchmarkRollback
+        except BenchmarkRollback:
+            self.stdout.write("Rolled back seeded rows and index changes.")
+
+    def _seed(self, *, rows: int, customers: int, providers: int):
+        prefix = uuid.uuid4().hex[:8]
+        customer_users = User.objects.using(self.database).bulk_create(
+            [
+                User(username=f"bench-{prefix}-c{index}", email=f"bench-{prefix}-c{index}@example.com", password="!")
+                for index in range(customers)
+            ]
+        )
+        provider_users = User.objects.using(self.database).bulk_create(
+            [
+                User(
+                    username=f"bench-{prefix}-p{index}",
+                    email=f"bench-{prefix}-p{index}@example.com",
+                    password="!",
+                    role=User.Role.PROVIDER,
+                )
+                for index in range(providers)
+            ]
+        )
+        profiles = ProviderProfile.objects.using(self.database).bulk_create(
+            [ProviderProfile(user=user, professional_name=user.username) for user in provider_users]
+        )
+        services = Service.objects.using(self.database).bulk_create(
+            [
+                Service(
+                    provider=profile,
+                    service_type=Service.ServiceType.UMRAH_BADAL,
+                    title="Benchmark service",
+                    description="Benchmark service",
+                    city_scope=Service.CityScope.MAKKAH,
+                    price_amount="100.00",
+                )
+                for profile in profiles
+            ]
+        )
+
+        now = timezone.now()
+        started = time.monotonic()
+        for offset in range(0, rows, SEED_BATCH_SIZE):
+            batch = []
+            for index in range(offset, min(rows, offset + SEED_BATCH_SIZE)):
+                service = services[index % len(services)]
+                # Roughly 2% of rows are open requests, the slice the expiry sweep actually reads.
+                is_requested = index % 50 == 0
+                batch.append(
+                    Booking(
+                        customer=customer_users[index % len(customer_users)],
+                        provider_id=service.provider_id,
+                        service=service,
+                        status=Booking.Status.REQUESTED if is_requested else Booking.Status.COMPLETED,
+                        acceptance_deadline_at=now + timedelta(minutes=(index % 2880) - 1440) if is_requested else None,
+                        payment_reference=f"cs_bench_{prefix}_{index}" if index % 2 else "",
+                    )
+                )
+            Booking.objects.using(self.database).bulk_create(batch)
+        self.stdout.write(f"Seeded {rows} booking(s) in {time.monotonic() - started:.1f}s.")
+
+        self._analyze()
+
+        self._sample_customer_id = customer_users[0].id
+        self._sample_provider_id = profiles[0].id
+        self._sample_payment_reference = f"cs_bench_{prefix}_{(rows // 2) | 1}"
+
+    def _analyze(self):
+        with self.connection.cursor() as cursor:
+            cursor.execute(f"ANALYZE {self.connection.ops.quote_name(Booking._meta.db_table)}")
+
+    def _drop_indexes(self):
+        # Dropped inside the benchmark transaction, so the rollback puts them back. The SQL is built without
+        # entering the schema editor, which SQLite refuses to open inside a transaction.
+        schema_editor = self.connection.schema_editor()
+        with self.connection.cursor() as cursor:
+            for index in Booking._meta.indexes:
+                cursor.execute(str(index.remove_sql(Booking, schema_editor)))
+        self._analyze()
+
+    def _report(self, *, repeat: int) -> dict[str, float]:
+        now = timezone.now()
+        bookings = Booking.objects.using(self.database)
+        queries = {
+            "expiry sweep": bookings.filter(
+                status=Booking.Status.REQUESTED,
+                acceptance_deadline_at__isnull=False,
+                acceptance_deadline_at__lte=now,
+            )
+            .order_by("acceptance_deadline_at", "id")
+            .values_list("id", flat=True)[:200],
+            "payment reference lookup": bookings.filter(payment_reference=self._sample_payment_reference),
+            "customer booking list": bookings.filter(customer_id=self._sample_customer_id).order_by("-created_at")[:20],
+            "provider booking list": bookings.filter(provider_id=self._sample_provider_id).order_by("-created_at")[:20],
+            "admin booking list": bookings.order_by("-created_at", "-id")[:20],
+        }
+        timings = {}
+        for label, queryset in queries.items():
+            runs = []
+            for _ in range(repeat):
+                started = time.monotonic()
+                list(queryset.all())
+                runs.append((time.monotonic() - started) * 1000)
+            timings[label] = min(runs)
+            self.stdout.write(self.style.MIGRATE_HEADING(f"{label} ({timings[label]:.1f} ms)"))
+            self.stdout.write(queryset.explain())
+        return timings
+
+    def _summarize(self, *, before: dict[str, float], after: dict[str, float]):
+        self.stdout.write(self.style.MIGRATE_LABEL("Summary (without -> with indexes)"))
+        for label, before_ms in before.items():
+            after_ms = after[label]
+            speedup = before_ms / after_ms if after_ms else float("inf")
+            self.stdout.write(f"{label}: {before_ms:.1f} ms -> {after_ms:.1f} ms ({speedup:.1f}x)")
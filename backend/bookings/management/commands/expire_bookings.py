@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.services import EXPIRY_BATCH_SIZE, expire_due_bookings
+
+
+class Command(BaseCommand):
+    help = "Auto-cancel REQUESTED bookings whose provider acceptance deadline has passed."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=EXPIRY_BATCH_SIZE)
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running and sweep every N seconds. Runs once when omitted.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        interval = max(0, options["interval"])
+
+        while True:
+            expired = expire_due_bookings(batch_size=batch_size)
+            self.stdout.write(f"Expired {expired} booking(s).")
+            if not interval:
+                break
+            time.sleep(interval)
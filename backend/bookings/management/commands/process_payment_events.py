@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.payments import PAYMENT_EVENT_BATCH_SIZE, process_pending_payment_events
+
+
+class Command(BaseCommand):
+    help = "Apply queued payment webhook events to their bookings, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=PAYMENT_EVENT_BATCH_SIZE)
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running and poll the queue every N seconds. Drains once when omitted.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        interval = max(0, options["interval"])
+
+        while True:
+            totals = {"processed": 0, "deferred": 0, "retrying": 0, "failed": 0}
+            while True:
+                summary = process_pending_payment_events(batch_size=batch_size)
+                for key, value in summary.items():
+                    totals[key] += value
+                if sum(summary.values()) < batch_size:
+                    break
+            self.stdout.write(
+                f"Processed {totals['processed']}, deferred {totals['deferred']}, "
+                f"retrying {totals['retrying']}, failed {totals['failed']} payment event(s)."
+            )
+            if not interval:
+                break
+            time.sleep(interval)
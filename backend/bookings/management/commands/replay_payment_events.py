@@ -0,0 +1,44 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from bookings.payments import PAYMENT_EVENT_BATCH_SIZE, process_pending_payment_events, requeue_payment_events
+
+
+class Command(BaseCommand):
+    help = "Requeue unprocessed payment webhook events (for example after exhausting retries) and apply them."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--event", type=int, action="append", dest="event_ids", help="Event id; repeatable.")
+        parser.add_argument("--booking", type=int, action="append", dest="booking_ids", help="Booking id; repeatable.")
+        parser.add_argument("--since", help="Only events received at or after this ISO date/time.")
+        parser.add_argument("--batch-size", type=int, default=PAYMENT_EVENT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        since = None
+        if options["since"]:
+            try:
+                since = datetime.fromisoformat(options["since"])
+            except ValueError as exc:
+                raise CommandError(f"Invalid --since value: {exc}")
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        event_ids = requeue_payment_events(
+            event_ids=options["event_ids"],
+            booking_ids=options["booking_ids"],
+            since=since,
+        )
+        batch_size = max(1, options["batch_size"])
+        totals = {"processed": 0, "deferred": 0, "retrying": 0, "failed": 0}
+        while event_ids:
+            summary = process_pending_payment_events(batch_size=batch_size, event_ids=event_ids)
+            for key, value in summary.items():
+                totals[key] += value
+            if sum(summary.values()) < batch_size:
+                break
+        self.stdout.write(
+            f"Requeued {len(event_ids)} event(s): processed {totals['processed']}, deferred {totals['deferred']}, "
+            f"retrying {totals['retrying']}, failed {totals['failed']}."
+        )
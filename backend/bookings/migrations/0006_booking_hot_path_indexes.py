@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_booking_completion_confirmations'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(condition=models.Q(('acceptance_deadline_at__isnull', False), ('status', 'REQUESTED')), fields=['acceptance_deadline_at', 'id'], name='booking_requested_deadline_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['payment_reference'], name='booking_payment_ref_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['customer', '-created_at'], name='booking_customer_recent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['provider', '-created_at'], name='booking_provider_recent_idx'),
+        ),
+    ]
@@ -0,0 +1,22 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_booking_recent_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentwebhookevent',
+            name='external_event_id',
+            field=models.CharField(blank=True, default='', max_length=255),
+        ),
+        migrations.AddConstraint(
+            model_name='paymentwebhookevent',
+            constraint=models.UniqueConstraint(condition=models.Q(('external_event_id', ''), _negated=True), fields=('external_event_id',), name='uniq_payment_webhook_event_id'),
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:59
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_payment_webhook_event_id'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='paymentwebhookevent',
+            name='attempts',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='paymentwebhookevent',
+            name='last_error',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='paymentwebhookevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(default=django.utils.timezone.now),
+        ),
+        migrations.AddField(
+            model_name='paymentwebhookevent',
+            name='payment_reference',
+            field=models.CharField(blank=True, max_length=140),
+        ),
+        migrations.AddIndex(
+            model_name='paymentwebhookevent',
+            index=models.Index(condition=models.Q(('processed', False)), fields=['next_attempt_at', 'id'], name='payment_event_pending_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='paymentwebhookevent',
+            index=models.Index(condition=models.Q(('processed', False)), fields=['booking', 'id'], name='payment_event_booking_open_idx'),
+        ),
+    ]
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:01
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_payment_references(apps, schema_editor):
+    Booking = apps.get_model("bookings", "Booking")
+    PaymentReference = apps.get_model("bookings", "PaymentReference")
+    rows = (
+        PaymentReference(booking_id=booking_id, reference=reference)
+        for booking_id, reference in Booking.objects.exclude(payment_reference="")
+        .values_list("id", "payment_reference")
+        .iterator()
+    )
+    PaymentReference.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+
+
+def noop_reverse(apps, schema_editor):
+    return
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_payment_event_queue'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='PaymentReference',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('reference', models.CharField(max_length=255, unique=True)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='payment_references', to='bookings.booking')),
+            ],
+            options={
+                'ordering': ['id'],
+            },
+        ),
+        migrations.RunPython(backfill_payment_references, noop_reverse),
+    ]
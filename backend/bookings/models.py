@@ -64,6 +64,17 @@ class Booking(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(
+                fields=["acceptance_deadline_at", "id"],
+                condition=models.Q(status="REQUESTED", acceptance_deadline_at__isnull=False),
+                name="booking_requested_deadline_idx",
+            ),
+            models.Index(fields=["payment_reference"], name="booking_payment_ref_idx"),
+            models.Index(fields=["customer", "-created_at"], name="booking_customer_recent_idx"),
+            models.Index(fields=["provider", "-created_at"], name="booking_provider_recent_idx"),
+            models.Index(fields=["-created_at", "-id"], name="booking_recent_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"Booking<{self.reference}>"
@@ -150,12 +161,47 @@ class PaymentWebhookEvent(models.Model):
         PAYMENT_REFUNDED = "PAYMENT_REFUNDED", "Payment Refunded"
 
     booking = models.ForeignKey(Booking, on_delete=models.SET_NULL, null=True, blank=True, related_name="payment_events")
+    external_event_id = models.CharField(max_length=255, blank=True, default="")
     external_reference = models.CharField(max_length=140, blank=True)
+    payment_reference = models.CharField(max_length=140, blank=True)
     event_type = models.CharField(max_length=30, choices=EventType.choices)
     payload = models.JSONField(default=dict, blank=True)
     processed = models.BooleanField(default=False)
+    attempts = models.PositiveIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True)
     received_at = models.DateTimeField(auto_now_add=True)
     processed_at = models.DateTimeField(null=True, blank=True)
 
     class Meta:
         ordering = ["-received_at"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["external_event_id"],
+                condition=~models.Q(external_event_id=""),
+                name="uniq_payment_webhook_event_id",
+            ),
+        ]
+        indexes = [
+            models.Index(
+                fields=["next_attempt_at", "id"],
+                name="payment_event_pending_idx",
+                condition=models.Q(processed=False),
+            ),
+            models.Index(
+                fields=["booking", "id"],
+                name="payment_event_booking_open_idx",
+                condition=models.Q(processed=False),
+            ),
+        ]
+
+
+class PaymentReference(models.Model):
+    """Any Stripe id seen for a booking (checkout session, payment intent, charge)."""
+
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name="payment_references")
+    reference = models.CharField(max_length=255, unique=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        ordering = ["id"]
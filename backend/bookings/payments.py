@@ -0,0 +1,389 @@
+import uuid
+from datetime import timedelta
+from typing import Any, Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Case, F, IntegerField, Q, Value, When
+from django.utils import timezone
+
+from notifications.services import notify_booking_participants
+from payouts.services import sync_payout_ledger_for_booking
+
+from .models import Booking, PaymentReference, PaymentWebhookEvent
+from .services import expire_booking_if_overdue
+
+PAYMENT_EVENT_BATCH_SIZE = 100
+MAX_PAYMENT_EVENT_ATTEMPTS = 5
+RETRY_BASE_DELAY = timedelta(minutes=1)
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def map_stripe_session_to_event(*, payment_status: str, session_status: str) -> Optional[str]:
+    normalized_payment = payment_status.strip().upper()
+    normalized_session = session_status.strip().upper()
+
+    if normalized_payment in {"PAID", "NO_PAYMENT_REQUIRED"}:
+        return PaymentWebhookEvent.EventType.PAYMENT_SUCCEEDED
+    if normalized_session == "EXPIRED":
+        return PaymentWebhookEvent.EventType.PAYMENT_FAILED
+    return None
+
+
+def map_stripe_webhook_type_to_event(event_type: str) -> Optional[str]:
+    normalized = str(event_type or "").strip().lower()
+    if normalized in {"checkout.session.completed", "checkout.session.async_payment_succeeded"}:
+        return PaymentWebhookEvent.EventType.PAYMENT_SUCCEEDED
+    if normalized in {"checkout.session.async_payment_failed", "payment_intent.payment_failed"}:
+        return PaymentWebhookEvent.EventType.PAYMENT_FAILED
+    if normalized in {"charge.refunded", "charge.refund.updated"}:
+        return PaymentWebhookEvent.EventType.PAYMENT_REFUNDED
+    return None
+
+
+def register_payment_references(*, booking_id: int, references: Iterable[Any]) -> None:
+    rows = [
+        PaymentReference(booking_id=booking_id, reference=reference)
+        for reference in dict.fromkeys(str(value or "").strip() for value in references)
+        if reference
+    ]
+    if rows:
+        PaymentReference.objects.bulk_create(rows, ignore_conflicts=True)
+
+
+def stripe_object_references(stripe_object: dict[str, Any]) -> list[str]:
+    candidates = [
+        stripe_object.get("id"),
+        stripe_object.get("checkout_session"),
+        stripe_object.get("payment_intent"),
+        stripe_object.get("latest_charge"),
+    ]
+    return [str(candidate or "").strip() for candidate in candidates if str(candidate or "").strip()]
+
+
+def stripe_object_keys(stripe_object: dict[str, Any]) -> list[tuple[str, str]]:
+    metadata = stripe_object.get("metadata") if isinstance(stripe_object.get("metadata"), dict) else {}
+    booking_reference = metadata.get("booking_reference") or stripe_object.get("client_reference_id")
+    return [
+        ("id", str(metadata.get("booking_id") or "").strip()),
+        ("reference", str(booking_reference or "").strip()),
+        *(("external", reference) for reference in stripe_object_references(stripe_object)),
+    ]
+
+
+def resolve_payment_booking(keys: Iterable[tuple[str, str]]) -> Optional[Booking]:
+    """Return the booking matching the earliest of `keys` (`id`, `reference` or `external` Stripe id) in one query."""
+    direct_q = Q()
+    direct_whens = []
+    external_whens = []
+    external_references = []
+    for priority, (kind, value) in enumerate(keys):
+        if kind == "id" and value.isdigit():
+            condition = Q(id=int(value))
+        elif kind == "reference" and value:
+            try:
+                condition = Q(reference=uuid.UUID(value))
+            except ValueError:
+                continue
+        elif kind == "external" and value:
+            condition = Q(payment_reference=value)
+            external_references.append(value)
+            external_whens.append(When(payment_references__reference=value, then=Value(priority)))
+        else:
+            continue
+        direct_q |= condition
+        direct_whens.append(When(condition, then=Value(priority)))
+
+    if not direct_whens:
+        return None
+    # Each branch is answered from its own index (pk, reference, payment_reference, the mapping table);
+    # UNION ALL keeps that true where an OR across the join would not.
+    queryset = (
+        Booking.objects.filter(direct_q)
+        .annotate(resolve_priority=Case(*direct_whens, output_field=IntegerField()))
+        .order_by()
+    )
+    if external_references:
+        mapped = (
+            Booking.objects.filter(payment_references__reference__in=external_references)
+            .annotate(resolve_priority=Case(*external_whens, output_field=IntegerField()))
+            .order_by()
+        )
+        queryset = queryset.union(mapped, all=True)
+    return queryset.order_by("resolve_priority").first()
+
+
+def resolve_booking_from_stripe_object(stripe_object: dict[str, Any]) -> Optional[Booking]:
+    return resolve_payment_booking(stripe_object_keys(stripe_object))
+
+
+def apply_payment_event_to_booking(*, booking: Booking, event_type: str, payment_reference: str = "", actor=None):
+    update_fields = ["updated_at"]
+
+    if (
+        payment_reference
+        and event_type != PaymentWebhookEvent.EventType.PAYMENT_REFUNDED
+        and booking.payment_reference != payment_reference
+    ):
+        booking.payment_reference = payment_reference
+        update_fields.append("payment_reference")
+
+    if event_type == PaymentWebhookEvent.EventType.PAYMENT_SUCCEEDED:
+        if booking.status in {Booking.Status.CANCELLED, Booking.Status.REJECTED}:
+            if booking.escrow_status != Booking.EscrowStatus.REFUNDED:
+                booking.escrow_status = Booking.EscrowStatus.REFUNDED
+                update_fields.append("escrow_status")
+            notify_booking_participants(
+                booking=booking,
+                title="Payment captured on closed booking",
+                body=f"Payment was received for closed booking {booking.reference} and marked for refund.",
+                actor=actor,
+            )
+            booking.save(update_fields=list(dict.fromkeys(update_fields)))
+            return
+        if booking.escrow_status != Booking.EscrowStatus.HELD:
+            booking.escrow_status = Booking.EscrowStatus.HELD
+            update_fields.append("escrow_status")
+        if booking.status == Booking.Status.REQUESTED and not booking.acceptance_deadline_at:
+            booking.acceptance_deadline_at = timezone.now() + timedelta(hours=24)
+            update_fields.append("acceptance_deadline_at")
+        notify_booking_participants(
+            booking=booking,
+            title="Payment succeeded",
+            body=f"Payment received for booking {booking.reference}.",
+            actor=actor,
+        )
+
+    elif event_type == PaymentWebhookEvent.EventType.PAYMENT_FAILED:
+        if booking.escrow_status not in {
+            Booking.EscrowStatus.HELD,
+            Booking.EscrowStatus.RELEASED,
+            Booking.EscrowStatus.REFUNDED,
+        }:
+            booking.escrow_status = Booking.EscrowStatus.FAILED
+            update_fields.append("escrow_status")
+        notify_booking_participants(
+            booking=booking,
+            title="Payment failed",
+            body=f"Payment failed for booking {booking.reference}.",
+            actor=actor,
+        )
+
+    elif event_type == PaymentWebhookEvent.EventType.PAYMENT_REFUNDED:
+        if booking.escrow_status != Booking.EscrowStatus.REFUNDED:
+            booking.escrow_status = Booking.EscrowStatus.REFUNDED
+            update_fields.append("escrow_status")
+        if booking.status not in {Booking.Status.COMPLETED, Booking.Status.CANCELLED}:
+            booking.status = Booking.Status.CANCELLED
+            update_fields.append("status")
+        if booking.acceptance_deadline_at is not None:
+            booking.acceptance_deadline_at = None
+            update_fields.append("acceptance_deadline_at")
+        if booking.provider_completed_confirmed_at is not None:
+            booking.provider_completed_confirmed_at = None
+            update_fields.append("provider_completed_confirmed_at")
+        if booking.customer_completed_confirmed_at is not None:
+            booking.customer_completed_confirmed_at = None
+            update_fields.append("customer_completed_confirmed_at")
+        if booking.cancellation_reason != "Payment refunded":
+            booking.cancellation_reason = "Payment refunded"
+            update_fields.append("cancellation_reason")
+        booking.release_availability_slot()
+        notify_booking_participants(
+            booking=booking,
+            title="Payment refunded",
+            body=f"Payment refunded for booking {booking.reference}.",
+            actor=actor,
+        )
+
+    booking.save(update_fields=list(dict.fromkeys(update_fields)))
+    sync_payout_ledger_for_booking(booking=booking, actor=actor)
+
+
+def stripe_event_object(stripe_event: dict[str, Any]) -> dict[str, Any]:
+    payload_data = stripe_event.get("data") if isinstance(stripe_event.get("data"), dict) else {}
+    return payload_data.get("object") if isinstance(payload_data.get("object"), dict) else {}
+
+
+def record_payment_event(
+    *,
+    external_event_id: str,
+    event_type: str,
+    payload: dict,
+    booking: Optional[Booking] = None,
+    external_reference: str = "",
+    payment_reference: str = "",
+) -> tuple[PaymentWebhookEvent, bool]:
+    """Store an incoming payment event once per provider event id; redeliveries return the existing row."""
+    values = {
+        "booking": booking,
+        "external_reference": external_reference,
+        "payment_reference": payment_reference,
+        "event_type": event_type,
+        "payload": payload,
+        "processed": False,
+    }
+    if not external_event_id:
+        return PaymentWebhookEvent.objects.create(**values), True
+    return PaymentWebhookEvent.objects.get_or_create(external_event_id=external_event_id, defaults=values)
+
+
+def apply_recorded_payment_event(event_id: int, *, actor=None) -> bool:
+    # Lock the event and then its booking so concurrent deliveries of the same event apply it once
+    # and different events for one booking apply one after the other.
+    with transaction.atomic():
+        event = PaymentWebhookEvent.objects.select_for_update().filter(id=event_id, processed=False).first()
+        if event is None:
+            return False
+        if event.booking_id:
+            booking = Booking.objects.select_for_update().get(id=event.booking_id)
+            expire_booking_if_overdue(booking)
+            apply_payment_event_to_booking(
+                booking=booking,
+                event_type=event.event_type,
+                payment_reference=event.payment_reference,
+                actor=actor,
+            )
+        event.processed = True
+        event.processed_at = timezone.now()
+        event.last_error = ""
+        event.save(update_fields=["processed", "processed_at", "last_error"])
+    return True
+
+
+def claim_pending_payment_events(
+    *,
+    batch_size: int = PAYMENT_EVENT_BATCH_SIZE,
+    event_ids: Optional[Iterable[int]] = None,
+    now=None,
+) -> list[PaymentWebhookEvent]:
+    now = now or timezone.now()
+    with transaction.atomic():
+        queryset = PaymentWebhookEvent.objects.filter(
+            processed=False,
+            attempts__lt=MAX_PAYMENT_EVENT_ATTEMPTS,
+            next_attempt_at__lte=now,
+        )
+        if event_ids is not None:
+            queryset = queryset.filter(id__in=list(event_ids))
+        claimed_ids = list(
+            queryset.select_for_update(skip_locked=True).order_by("id").values_list("id", flat=True)[:batch_size]
+        )
+        if not claimed_ids:
+            return []
+        # Lease the rows so other workers skip them while this one applies them.
+        PaymentWebhookEvent.objects.filter(id__in=claimed_ids).update(
+            attempts=F("attempts") + 1,
+            next_attempt_at=now + CLAIM_LEASE,
+        )
+
+    return list(PaymentWebhookEvent.objects.filter(id__in=claimed_ids).order_by("id"))
+
+
+def _resolve_event_booking(event: PaymentWebhookEvent) -> None:
+    if event.booking_id or "data" not in event.payload:
+        return
+    stripe_object = stripe_event_object(event.payload)
+    booking = resolve_booking_from_stripe_object(stripe_object)
+    if booking:
+        event.booking = booking
+        event.save(update_fields=["booking"])
+        # Remember the intent/charge ids so later refund events resolve straight from the mapping table.
+        register_payment_references(booking_id=booking.id, references=stripe_object_references(stripe_object))
+
+
+def _event_references(event: PaymentWebhookEvent) -> set[str]:
+    references = {event.external_reference, event.payment_reference}
+    if "data" in event.payload:
+        references.update(stripe_object_references(stripe_event_object(event.payload)))
+    if event.booking_id:
+        references.update(
+            PaymentReference.objects.filter(booking_id=event.booking_id).values_list("reference", flat=True)
+        )
+        references.update(Booking.objects.filter(id=event.booking_id).values_list("payment_reference", flat=True))
+    references.discard("")
+    return references
+
+
+def _has_earlier_pending_event(event: PaymentWebhookEvent) -> bool:
+    # Another worker may hold an older event for this booking that it has not resolved yet,
+    # so unresolved events carrying one of this booking's Stripe ids also count.
+    references = _event_references(event)
+    same_booking = Q(booking_id=event.booking_id)
+    if references:
+        same_booking |= Q(booking__isnull=True) & (
+            Q(external_reference__in=references) | Q(payment_reference__in=references)
+        )
+    return PaymentWebhookEvent.objects.filter(
+        same_booking,
+        processed=False,
+        attempts__lt=MAX_PAYMENT_EVENT_ATTEMPTS,
+        id__lt=event.id,
+    ).exists()
+
+
+def process_pending_payment_events(
+    *,
+    batch_size: int = PAYMENT_EVENT_BATCH_SIZE,
+    event_ids: Optional[Iterable[int]] = None,
+) -> dict[str, int]:
+    """Apply one claimed batch of queued payment events, oldest first, keeping each booking's events in order."""
+    events = claim_pending_payment_events(batch_size=batch_size, event_ids=event_ids)
+    summary = {"processed": 0, "deferred": 0, "retrying": 0, "failed": 0}
+
+    # Resolve the whole batch before applying any of it, so an older event later in this batch
+    # already has its booking when a newer one checks for earlier pending events.
+    resolve_errors = {}
+    for event in events:
+        try:
+            _resolve_event_booking(event)
+        except Exception as exc:
+            resolve_errors[event.id] = exc
+
+    for event in events:
+        now = timezone.now()
+        try:
+            if event.id in resolve_errors:
+                raise resolve_errors[event.id]
+            if event.booking_id and _has_earlier_pending_event(event):
+                # An older event for this booking is still queued or retrying; try again after it.
+                PaymentWebhookEvent.objects.filter(id=event.id).update(
+                    attempts=F("attempts") - 1,
+                    next_attempt_at=now + RETRY_BASE_DELAY,
+                )
+                summary["deferred"] += 1
+                continue
+            apply_recorded_payment_event(event.id)
+            summary["processed"] += 1
+        except Exception as exc:
+            update = {"last_error": str(exc)[:1000]}
+            if event.attempts >= MAX_PAYMENT_EVENT_ATTEMPTS:
+                summary["failed"] += 1
+            else:
+                update["next_attempt_at"] = now + RETRY_BASE_DELAY * (2 ** (event.attempts - 1))
+                summary["retrying"] += 1
+            PaymentWebhookEvent.objects.filter(id=event.id).update(**update)
+
+    return summary
+
+
+def requeue_payment_events(
+    *,
+    event_ids: Optional[Iterable[int]] = None,
+    booking_ids: Optional[Iterable[int]] = None,
+    since=None,
+) -> list[int]:
+    """Reset attempts on unprocessed events so the worker picks them up again."""
+    queryset = PaymentWebhookEvent.objects.filter(processed=False)
+    if event_ids is not None:
+        queryset = queryset.filter(id__in=list(event_ids))
+    if booking_ids is not None:
+        queryset = queryset.filter(booking_id__in=list(booking_ids))
+    if since is not None:
+        queryset = queryset.filter(received_at__gte=since)
+    requeued_ids = list(queryset.order_by("id").values_list("id", flat=True))
+    PaymentWebhookEvent.objects.filter(id__in=requeued_ids).update(
+        attempts=0,
+        next_attempt_at=timezone.now(),
+        last_error="",
+    )
+    return requeued_ids
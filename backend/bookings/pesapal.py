@@ -1,14 +1,23 @@
 import json
+import threading
+import time
+from datetime import datetime
 from decimal import Decimal
 from typing import Any, Optional
-from urllib.error import HTTPError, URLError
 from urllib.parse import urlencode
-from urllib.request import Request, urlopen
 
 from django.conf import settings
 
+from .gateway_http import GatewayConnectionError, get_gateway_client
+
 SANDBOX_BASE_URL = "https://cybqa.pesapal.com/pesapalv3/api"
 LIVE_BASE_URL = "https://pay.pesapal.com/v3/api"
+# Pesapal tokens last five minutes; refresh a little early so a token never expires mid-request.
+TOKEN_FALLBACK_LIFETIME = 240
+TOKEN_REFRESH_MARGIN = 30
+
+_token_lock = threading.Lock()
+_cached_token: dict[str, Any] = {}
 
 
 class PesapalError(RuntimeError):
@@ -23,6 +32,10 @@ class PesapalAPIError(PesapalError):
     pass
 
 
+class PesapalAuthenticationError(PesapalAPIError):
+    pass
+
+
 def is_configured() -> bool:
     return bool(settings.PESAPAL_CONSUMER_KEY and settings.PESAPAL_CONSUMER_SECRET)
 
@@ -79,26 +92,25 @@ def _request_json(
     if payload is not None:
         data = json.dumps(payload).encode("utf-8")
 
-    request = Request(url, data=data, headers=headers, method=method.upper())
-
     try:
-        with urlopen(request, timeout=25) as response:
-            body = response.read()
-            data = _parse_json_response(body)
-            http_status = response.status
-    except HTTPError as exc:
-        body = exc.read() if hasattr(exc, "read") else b""
-        parsed = _parse_json_response(body) if body else {}
-        message = parsed.get("error", {}).get("message") or parsed.get("message") or parsed.get("error")
-        if not isinstance(message, str) or not message:
-            message = f"Pesapal HTTP {exc.code}"
-        raise PesapalAPIError(message)
-    except URLError as exc:
-        raise PesapalAPIError(f"Unable to reach Pesapal: {exc.reason}") from exc
+        response = get_gateway_client().request(method, url, headers=headers, body=data)
+    except GatewayConnectionError as exc:
+        raise PesapalAPIError(f"Unable to reach Pesapal: {exc}") from exc
 
+    http_status = response.status
     if http_status >= 400:
-        message = data.get("error", {}).get("message") or data.get("message") or f"Pesapal HTTP {http_status}"
-        raise PesapalAPIError(str(message))
+        try:
+            parsed = _parse_json_response(response.body)
+        except PesapalAPIError:
+            parsed = {}
+        error = parsed.get("error")
+        message = (error.get("message") if isinstance(error, dict) else error) or parsed.get("message")
+        if not isinstance(message, str) or not message:
+            message = f"Pesapal HTTP {http_status}"
+        if http_status == 401:
+            raise PesapalAuthenticationError(message)
+        raise PesapalAPIError(message)
+    data = _parse_json_response(response.body)
 
     status_value = data.get("status")
     if isinstance(status_value, int) and status_value >= 400:
@@ -127,16 +139,56 @@ def _request_json(
     return data
 
 
-def request_access_token() -> str:
-    payload = {
-        "consumer_key": settings.PESAPAL_CONSUMER_KEY,
-        "consumer_secret": settings.PESAPAL_CONSUMER_SECRET,
-    }
-    response = _request_json(method="POST", path="/Auth/RequestToken", payload=payload)
-    token = response.get("token")
-    if not isinstance(token, str) or not token:
-        raise PesapalAPIError("Pesapal token is missing from auth response.")
-    return token
+def _token_expires_at(response: dict[str, Any], now: float) -> float:
+    expiry = response.get("expiryDate")
+    if isinstance(expiry, str) and expiry:
+        # Pesapal sends up to seven fractional digits, which fromisoformat does not accept.
+        head, _, fraction = expiry.rstrip("Z").partition(".")
+        try:
+            expires = datetime.fromisoformat(f"{head}.{fraction[:6] or 0}+00:00")
+        except ValueError:
+            pass
+        else:
+            return now + (expires.timestamp() - time.time())
+    return now + TOKEN_FALLBACK_LIFETIME
+
+
+def request_access_token(*, force_refresh: bool = False) -> str:
+    """Return a cached access token, requesting a new one when it is missing or about to expire."""
+    with _token_lock:
+        now = time.monotonic()
+        cache_key = (resolve_base_url(), settings.PESAPAL_CONSUMER_KEY)
+        if (
+            not force_refresh
+            and _cached_token.get("key") == cache_key
+            and _cached_token.get("expires_at", 0) - TOKEN_REFRESH_MARGIN > now
+        ):
+            return _cached_token["token"]
+
+        payload = {
+            "consumer_key": settings.PESAPAL_CONSUMER_KEY,
+            "consumer_secret": settings.PESAPAL_CONSUMER_SECRET,
+        }
+        response = _request_json(method="POST", path="/Auth/RequestToken", payload=payload)
+        token = response.get("token")
+        if not isinstance(token, str) or not token:
+            raise PesapalAPIError("Pesapal token is missing from auth response.")
+        _cached_token.update(key=cache_key, token=token, expires_at=_token_expires_at(response, now))
+        return token
+
+
+def clear_access_token() -> None:
+    with _token_lock:
+        _cached_token.clear()
+
+
+def _request_json_with_token(*, token: str, **kwargs) -> dict[str, Any]:
+    # A 401 means Pesapal revoked or expired the token before our local expiry; the request was not
+    # acted on, so fetch a new token and try once more.
+    try:
+        return _request_json(token=token, **kwargs)
+    except PesapalAuthenticationError:
+        return _request_json(token=request_access_token(force_refresh=True), **kwargs)
 
 
 def register_ipn(*, token: str, ipn_url: str) -> str:
@@ -144,7 +196,7 @@ def register_ipn(*, token: str, ipn_url: str) -> str:
         "url": ipn_url,
         "ipn_notification_type": "GET",
     }
-    response = _request_json(method="POST", path="/URLSetup/RegisterIPN", token=token, payload=payload)
+    response = _request_json_with_token(method="POST", path="/URLSetup/RegisterIPN", token=token, payload=payload)
     ipn_id = response.get("ipn_id")
     if not isinstance(ipn_id, str) or not ipn_id:
         raise PesapalAPIError("Pesapal IPN registration did not return ipn_id.")
@@ -187,11 +239,16 @@ def submit_order_request(
             "zip_code": "",
         },
     }
-    return _request_json(method="POST", path="/Transactions/SubmitOrderRequest", token=token, payload=payload)
+    return _request_json_with_token(
+        method="POST",
+        path="/Transactions/SubmitOrderRequest",
+        token=token,
+        payload=payload,
+    )
 
 
 def get_transaction_status(*, token: str, order_tracking_id: str) -> dict[str, Any]:
-    return _request_json(
+    return _request_json_with_token(
         method="GET",
         path="/Transactions/GetTransactionStatus",
         token=token,
@@ -75,6 +75,7 @@ class BookingStatusEventSerializer(serializers.ModelSerializer):
 
 
 class PaymentWebhookSerializer(serializers.Serializer):
+    event_id = serializers.CharField(max_length=255, required=False, allow_blank=True)
     event_type = serializers.ChoiceField(choices=PaymentWebhookEvent.EventType.choices)
     booking_id = serializers.IntegerField(required=False)
     booking_reference = serializers.UUIDField(required=False)
@@ -0,0 +1,112 @@
+from typing import Iterable, Optional
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.utils import timezone
+
+from marketplace.models import ProviderAvailability
+from notifications.services import notify_booking_participants
+
+from .models import Booking, BookingStatusEvent
+
+AUTO_CANCELLATION_NOTE = "Provider did not accept within 24 hours."
+EXPIRY_BATCH_SIZE = 200
+
+
+def is_acceptance_overdue(booking: Booking, now=None) -> bool:
+    if booking.status != Booking.Status.REQUESTED or booking.acceptance_deadline_at is None:
+        return False
+    return booking.acceptance_deadline_at <= (now or timezone.now())
+
+
+def _claim_due_booking_ids(*, now, batch_size: int, booking_ids: Optional[Iterable[int]] = None) -> list[int]:
+    queryset = Booking.objects.filter(
+        status=Booking.Status.REQUESTED,
+        acceptance_deadline_at__isnull=False,
+        acceptance_deadline_at__lte=now,
+    )
+    if booking_ids is not None:
+        queryset = queryset.filter(id__in=list(booking_ids))
+    # Concurrent sweepers skip rows another worker already holds instead of queueing behind it.
+    return list(
+        queryset.select_for_update(skip_locked=True)
+        .order_by("acceptance_deadline_at", "id")
+        .values_list("id", flat=True)[:batch_size]
+    )
+
+
+def _expire_claimed_bookings(*, booking_ids: list[int], now) -> None:
+    Booking.objects.filter(id__in=booking_ids).update(
+        status=Booking.Status.CANCELLED,
+        cancellation_reason=AUTO_CANCELLATION_NOTE,
+        cancelled_by=None,
+        acceptance_deadline_at=None,
+        provider_completed_confirmed_at=None,
+        customer_completed_confirmed_at=None,
+        escrow_status=Case(
+            When(
+                escrow_status__in=[Booking.EscrowStatus.PAID, Booking.EscrowStatus.HELD],
+                then=Value(Booking.EscrowStatus.REFUNDED),
+            ),
+            default=F("escrow_status"),
+        ),
+        updated_at=now,
+    )
+    ProviderAvailability.objects.filter(booked_by_id__in=booking_ids).update(
+        is_available=True,
+        booked_by=None,
+        updated_at=now,
+    )
+    BookingStatusEvent.objects.bulk_create(
+        [
+            BookingStatusEvent(
+                booking_id=booking_id,
+                from_status=Booking.Status.REQUESTED,
+                to_status=Booking.Status.CANCELLED,
+                changed_by=None,
+                note=AUTO_CANCELLATION_NOTE,
+            )
+            for booking_id in booking_ids
+        ]
+    )
+
+
+def _notify_expired_bookings(booking_ids: list[int]) -> None:
+    expired = Booking.objects.filter(id__in=booking_ids).select_related("customer", "provider", "provider__user")
+    for booking in expired:
+        notify_booking_participants(
+            booking=booking,
+            title="Booking auto-cancelled",
+            body=f"Booking {booking.reference} was auto-cancelled because the provider did not accept in 24 hours.",
+            actor=None,
+        )
+
+
+def expire_due_bookings(*, now=None, batch_size: int = EXPIRY_BATCH_SIZE, booking_ids: Optional[Iterable[int]] = None) -> int:
+    """Cancel REQUESTED bookings whose acceptance deadline has passed, one locked batch at a time."""
+    now = now or timezone.now()
+    if booking_ids is not None:
+        booking_ids = list(booking_ids)
+    expired_count = 0
+
+    while True:
+        with transaction.atomic():
+            claimed_ids = _claim_due_booking_ids(now=now, batch_size=batch_size, booking_ids=booking_ids)
+            if not claimed_ids:
+                break
+            _expire_claimed_bookings(booking_ids=claimed_ids, now=now)
+
+        _notify_expired_bookings(claimed_ids)
+        expired_count += len(claimed_ids)
+        if len(claimed_ids) < batch_size:
+            break
+
+    return expired_count
+
+
+def expire_booking_if_overdue(booking: Booking) -> bool:
+    if not is_acceptance_overdue(booking):
+        return False
+    expire_due_bookings(booking_ids=[booking.id])
+    booking.refresh_from_db()
+    return True
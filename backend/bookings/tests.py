@@ -0,0 +1,396 @@
+import hashlib
+import hmac
+import json
+import threading
+import time
+from datetime import timedelta
+from decimal import Decimal
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import ProviderProfile, User
+from marketplace.models import Service
+
+from notifications.models import Notification
+
+from . import pesapal
+from .gateway_http import GatewayConnectionError, get_gateway_client, reset_gateway_client
+from .models import Booking, BookingStatusEvent, PaymentReference, PaymentWebhookEvent
+from .payments import MAX_PAYMENT_EVENT_ATTEMPTS, process_pending_payment_events, resolve_booking_from_stripe_object
+from .services import AUTO_CANCELLATION_NOTE, expire_due_bookings
+
+
+class BookingFixtureMixin:
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username="customer_user",
+            email="customer@example.com",
+            password="StrongPass123!",
+            role=User.Role.CUSTOMER,
+        )
+        provider_user = User.objects.create_user(
+            username="provider_user",
+            email="provider@example.com",
+            password="StrongPass123!",
+            role=User.Role.PROVIDER,
+        )
+        self.provider = ProviderProfile.objects.create(
+            user=provider_user,
+            professional_name="Trusted Provider",
+            verification_status=ProviderProfile.VerificationStatus.APPROVED,
+            is_accepting_bookings=True,
+        )
+        self.service = Service.objects.create(
+            provider=self.provider,
+            service_type=Service.ServiceType.UMRAH_BADAL,
+            title="Umrah Badal",
+            description="Performed on your behalf.",
+            city_scope=Service.CityScope.MAKKAH,
+            price_amount=Decimal("100.00"),
+        )
+
+    def _booking(self, **overrides):
+        values = {
+            "customer": self.customer,
+            "provider": self.provider,
+            "service": self.service,
+            "escrow_status": Booking.EscrowStatus.HELD,
+        }
+        values.update(overrides)
+        return Booking.objects.create(**values)
+
+
+class BookingExpirySweepTests(BookingFixtureMixin, TestCase):
+    def test_sweep_cancels_only_overdue_requests(self):
+        overdue = self._booking(acceptance_deadline_at=timezone.now() - timedelta(minutes=5))
+        pending = self._booking(acceptance_deadline_at=timezone.now() + timedelta(hours=2))
+
+        expired = expire_due_bookings(batch_size=1)
+
+        self.assertEqual(expired, 1)
+        overdue.refresh_from_db()
+        pending.refresh_from_db()
+        self.assertEqual(overdue.status, Booking.Status.CANCELLED)
+        self.assertEqual(overdue.escrow_status, Booking.EscrowStatus.REFUNDED)
+        self.assertEqual(overdue.cancellation_reason, AUTO_CANCELLATION_NOTE)
+        self.assertIsNone(overdue.acceptance_deadline_at)
+        self.assertEqual(pending.status, Booking.Status.REQUESTED)
+        self.assertTrue(
+            BookingStatusEvent.objects.filter(booking=overdue, to_status=Booking.Status.CANCELLED).exists()
+        )
+
+    def test_booking_list_does_not_write(self):
+        self._booking(acceptance_deadline_at=timezone.now() - timedelta(minutes=5))
+        self.client.force_login(self.customer)
+
+        response = self.client.get("/api/bookings/")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["results"][0]["status"], Booking.Status.REQUESTED)
+        self.assertFalse(BookingStatusEvent.objects.exists())
+
+    def test_booking_list_uses_cursor_pagination_unless_page_requested(self):
+        bookings = [self._booking() for _ in range(3)]
+        self.client.force_login(self.customer)
+
+        first_page = self.client.get("/api/bookings/", {"page_size": 2}).json()
+        second_page = self.client.get(first_page["next"]).json()
+        numbered = self.client.get("/api/bookings/", {"page": 1}).json()
+
+        self.assertNotIn("count", first_page)
+        self.assertEqual(
+            [item["id"] for item in first_page["results"] + second_page["results"]],
+            [booking.id for booking in reversed(bookings)],
+        )
+        self.assertIsNone(second_page["next"])
+        self.assertEqual(numbered["count"], 3)
+
+
+TEST_STRIPE_WEBHOOK_SECRET = "whsec_test"
+
+
+@override_settings(STRIPE_WEBHOOK_SECRET=TEST_STRIPE_WEBHOOK_SECRET)
+class PaymentWebhookQueueTests(BookingFixtureMixin, TestCase):
+    def _stripe_event(self, booking, event_id="evt_1", event_type="checkout.session.completed"):
+        return {
+            "id": event_id,
+            "type": event_type,
+            "data": {"object": {"id": "cs_test_1", "metadata": {"booking_id": str(booking.id)}}},
+        }
+
+    def _post(self, payload, *, body=None):
+        signed_body = json.dumps(payload).encode()
+        body = signed_body if body is None else body
+        timestamp = str(int(time.time()))
+        signature = hmac.new(
+            TEST_STRIPE_WEBHOOK_SECRET.encode(),
+            f"{timestamp}.".encode() + signed_body,
+            hashlib.sha256,
+        ).hexdigest()
+        return self.client.post(
+            "/api/bookings/webhook/",
+            body,
+            content_type="application/json",
+            HTTP_STRIPE_SIGNATURE=f"t={timestamp},v1={signature}",
+        )
+
+    def test_webhook_only_queues_and_redeliveries_are_ignored(self):
+        booking = self._booking(escrow_status=Booking.EscrowStatus.UNPAID)
+        payload = self._stripe_event(booking)
+
+        first = self._post(payload)
+        with self.assertNumQueries(1):
+            second = self._post(payload)
+
+        self.assertEqual(first.status_code, 200)
+        self.assertFalse(first.json()["duplicate"])
+        self.assertTrue(second.json()["duplicate"])
+        self.assertEqual(PaymentWebhookEvent.objects.filter(external_event_id="evt_1").count(), 1)
+        booking.refresh_from_db()
+        self.assertEqual(booking.escrow_status, Booking.EscrowStatus.UNPAID)
+        self.assertFalse(Notification.objects.exists())
+
+        summary = process_pending_payment_events()
+        notifications = Notification.objects.count()
+        self._post(payload)
+        process_pending_payment_events()
+
+        self.assertEqual(summary["processed"], 1)
+        self.assertEqual(Notification.objects.count(), notifications)
+        booking.refresh_from_db()
+        self.assertEqual(booking.escrow_status, Booking.EscrowStatus.HELD)
+        self.assertEqual(booking.payment_reference, "cs_test_1")
+        self.assertEqual(PaymentWebhookEvent.objects.get(external_event_id="evt_1").booking_id, booking.id)
+
+    def test_signed_stripe_payload_is_verified_before_queueing(self):
+        booking = self._booking(escrow_status=Booking.EscrowStatus.UNPAID)
+        payload = self._stripe_event(booking)
+        tampered = json.dumps({**payload, "id": "evt_forged"}).encode()
+
+        rejected = self._post(payload, body=tampered)
+        accepted = self._post(payload)
+
+        self.assertEqual(rejected.status_code, 400)
+        self.assertEqual(accepted.status_code, 200)
+        self.assertEqual(accepted.json()["event_type"], PaymentWebhookEvent.EventType.PAYMENT_SUCCEEDED)
+        self.assertEqual(
+            list(PaymentWebhookEvent.objects.values_list("external_event_id", flat=True)),
+            ["evt_1"],
+        )
+
+    def test_events_for_a_booking_wait_for_earlier_ones(self):
+        booking = self._booking(escrow_status=Booking.EscrowStatus.UNPAID)
+        self._post(self._stripe_event(booking))
+        self._post(self._stripe_event(booking, event_id="evt_2", event_type="charge.refunded"))
+        first, second = PaymentWebhookEvent.objects.order_by("id")
+        PaymentWebhookEvent.objects.filter(id=first.id).update(booking=booking, next_attempt_at=timezone.now() + timedelta(minutes=1))
+
+        deferred = process_pending_payment_events()
+        PaymentWebhookEvent.objects.update(next_attempt_at=timezone.now())
+        processed = process_pending_payment_events()
+
+        self.assertEqual(deferred, {"processed": 0, "deferred": 1, "retrying": 0, "failed": 0})
+        self.assertEqual(processed["processed"], 2)
+        booking.refresh_from_db()
+        self.assertEqual(booking.escrow_status, Booking.EscrowStatus.REFUNDED)
+        self.assertEqual(booking.status, Booking.Status.CANCELLED)
+
+    def test_unresolved_earlier_event_with_a_booking_reference_blocks_later_ones(self):
+        booking = self._booking(escrow_status=Booking.EscrowStatus.UNPAID, payment_reference="cs_test_1")
+        PaymentReference.objects.create(booking=booking, reference="cs_test_1")
+        checkout = self._stripe_event(booking)
+        checkout["data"]["object"]["metadata"] = {}
+        self._post(checkout)
+        refund = self._stripe_event(booking, event_id="evt_2", event_type="charge.refunded")
+        refund["data"]["object"]["id"] = "ch_test_1"
+        self._post(refund)
+        first = PaymentWebhookEvent.objects.get(external_event_id="evt_1")
+        # Another worker has claimed the checkout event but not resolved its booking yet.
+        PaymentWebhookEvent.objects.filter(id=first.id).update(
+            attempts=1,
+            next_attempt_at=timezone.now() + timedelta(minutes=5),
+        )
+
+        summary = process_pending_payment_events()
+
+        self.assertEqual(summary, {"processed": 0, "deferred": 1, "retrying": 0, "failed": 0})
+        booking.refresh_from_db()
+        self.assertEqual(booking.escrow_status, Booking.EscrowStatus.UNPAID)
+
+    def test_batch_is_resolved_before_any_event_is_applied(self):
+        booking = self._booking(escrow_status=Booking.EscrowStatus.UNPAID)
+        self._post(self._stripe_event(booking))
+        self._post(self._stripe_event(booking, event_id="evt_2", event_type="charge.refunded"))
+
+        summary = process_pending_payment_events()
+
+        self.assertEqual(summary["processed"], 2)
+        self.assertEqual(
+            set(PaymentWebhookEvent.objects.values_list("booking_id", flat=True)),
+            {booking.id},
+        )
+        booking.refresh_from_db()
+        self.assertEqual(booking.escrow_status, Booking.EscrowStatus.REFUNDED)
+
+    def test_replay_requeues_exhausted_events(self):
+        booking = self._booking(escrow_status=Booking.EscrowStatus.UNPAID)
+        self._post(self._stripe_event(booking))
+        PaymentWebhookEvent.objects.update(attempts=MAX_PAYMENT_EVENT_ATTEMPTS, last_error="boom")
+
+        self.assertEqual(process_pending_payment_events()["processed"], 0)
+        call_command("replay_payment_events", stdout=StringIO())
+
+        event = PaymentWebhookEvent.objects.get()
+        self.assertTrue(event.processed)
+        self.assertEqual(event.attempts, 1)
+        self.assertEqual(event.last_error, "")
+
+    def test_refund_resolves_through_references_learned_from_checkout(self):
+        booking = self._booking(escrow_status=Booking.EscrowStatus.UNPAID)
+        checkout = self._stripe_event(booking)
+        checkout["data"]["object"]["payment_intent"] = "pi_test_1"
+        self._post(checkout)
+        process_pending_payment_events()
+        refund = {"id": "ch_test_1", "payment_intent": "pi_test_1", "metadata": {}}
+
+        with self.assertNumQueries(1):
+            resolved = resolve_booking_from_stripe_object(refund)
+
+        self.assertEqual(resolved, booking)
+        self.assertEqual(
+            set(PaymentReference.objects.filter(booking=booking).values_list("reference", flat=True)),
+            {"cs_test_1", "pi_test_1"},
+        )
+
+    def test_resolution_prefers_metadata_over_payment_references(self):
+        booking = self._booking()
+        other = self._booking(payment_reference="cs_other")
+
+        with self.assertNumQueries(1):
+            resolved = resolve_booking_from_stripe_object(
+                {"id": "cs_other", "metadata": {"booking_reference": str(booking.reference)}}
+            )
+
+        self.assertEqual(resolved, booking)
+        self.assertEqual(resolve_booking_from_stripe_object({"id": "cs_other", "metadata": {}}), other)
+        self.assertIsNone(resolve_booking_from_stripe_object({"id": "cs_missing", "metadata": {"booking_reference": "x"}}))
+
+
+class _StubPesapalHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def setup(self):
+        super().setup()
+        self.server.connections += 1
+
+    def do_POST(self):
+        self.server.paths.append(self.path)
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        if self.path.endswith("/drop"):
+            # Read the request, then hang up without answering, like a server closing an idle socket.
+            self.close_connection = True
+            return
+        if self.path.endswith("/Auth/RequestToken"):
+            self._reply({"token": "tok-1", "expiryDate": "2999-01-01T00:00:00.1234567Z", "status": "200"})
+        elif self.headers.get("Authorization") == "Bearer revoked":
+            self._reply({"error": {"message": "Invalid token"}}, status=401)
+        else:
+            self._reply({"ipn_id": "ipn-1", "status": "200"})
+
+    def do_GET(self):
+        self.server.paths.append(self.path)
+        if self.path.endswith("/drop"):
+            self.close_connection = True
+            return
+        self._reply({"status": "500", "error": {"message": "Order not found"}}, status=200)
+
+    def _reply(self, payload, status=200):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+class PesapalGatewayClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), _StubPesapalHandler)
+        self.server.connections = 0
+        self.server.paths = []
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        reset_gateway_client()
+        pesapal.clear_access_token()
+        base_url = f"http://127.0.0.1:{self.server.server_port}/v3/api"
+        settings_override = override_settings(
+            PESAPAL_BASE_URL=base_url,
+            PESAPAL_CONSUMER_KEY="key",
+            PESAPAL_CONSUMER_SECRET="secret",
+            PESAPAL_ENV="sandbox",
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.addCleanup(self.server.server_close)
+        self.addCleanup(self.server.shutdown)
+        self.addCleanup(reset_gateway_client)
+
+    def test_calls_share_one_connection_and_cached_token(self):
+        token = pesapal.request_access_token()
+        pesapal.register_ipn(token=pesapal.request_access_token(), ipn_url="https://example.com/ipn")
+        with self.assertRaisesMessage(pesapal.PesapalAPIError, "Order not found"):
+            pesapal.get_transaction_status(token=pesapal.request_access_token(), order_tracking_id="trk-1")
+
+        self.assertEqual(token, "tok-1")
+        self.assertEqual(
+            self.server.paths,
+            [
+                "/v3/api/Auth/RequestToken",
+                "/v3/api/URLSetup/RegisterIPN",
+                "/v3/api/Transactions/GetTransactionStatus?orderTrackingId=trk-1",
+            ],
+        )
+        self.assertEqual(self.server.connections, 1)
+
+    def test_dropped_post_on_a_reused_connection_is_not_resent(self):
+        client = get_gateway_client()
+        base_url = f"http://127.0.0.1:{self.server.server_port}/v3/api"
+        client.request("GET", f"{base_url}/warm")
+
+        with self.assertRaises(GatewayConnectionError):
+            client.request("POST", f"{base_url}/drop", body=b"{}")
+        client.request("GET", f"{base_url}/warm")
+        with self.assertRaises(GatewayConnectionError):
+            client.request("GET", f"{base_url}/drop")
+
+        self.assertEqual(self.server.paths.count("/v3/api/drop"), 3)
+
+    def test_expired_token_is_refreshed(self):
+        pesapal.request_access_token()
+        pesapal._cached_token["expires_at"] = 0
+
+        pesapal.request_access_token()
+
+        self.assertEqual(self.server.paths.count("/v3/api/Auth/RequestToken"), 2)
+
+    def test_rejected_token_is_refreshed_once(self):
+        pesapal._cached_token.update(
+            key=(pesapal.resolve_base_url(), "key"),
+            token="revoked",
+            expires_at=time.monotonic() + 600,
+        )
+
+        ipn_id = pesapal.register_ipn(token=pesapal.request_access_token(), ipn_url="https://example.com/ipn")
+
+        self.assertEqual(ipn_id, "ipn-1")
+        self.assertEqual(pesapal.request_access_token(), "tok-1")
+        self.assertEqual(
+            self.server.paths,
+            ["/v3/api/URLSetup/RegisterIPN", "/v3/api/Auth/RequestToken", "/v3/api/URLSetup/RegisterIPN"],
+        )
@@ -1,4 +1,4 @@
-from typing import Any, Optional
+from typing import Any
 from decimal import Decimal
 from datetime import timedelta
 
@@ -15,8 +15,19 @@ from rest_framework.views import APIView
 from accounts.models import User
 from notifications.services import notify_booking_participants
 from payouts.services import sync_payout_ledger_for_booking
-
-from .models import PLATFORM_FEE_RATE, Booking, BookingStatusEvent, PaymentWebhookEvent
+from umrah_link.pagination import CreatedAtCursorPagination
+
+from .models import PLATFORM_FEE_RATE, Booking, BookingStatusEvent
+from .payments import (
+    apply_recorded_payment_event,
+    map_stripe_session_to_event,
+    map_stripe_webhook_type_to_event,
+    record_payment_event,
+    register_payment_references,
+    resolve_payment_booking,
+    stripe_event_object,
+    stripe_object_keys,
+)
 from .permissions import IsBookingParticipantOrAdmin, IsCustomerUser
 from .serializers import (
     BookingCancellationSerializer,
@@ -26,6 +37,7 @@ from .serializers import (
     PaymentWebhookEventSerializer,
     PaymentWebhookSerializer,
 )
+from .services import expire_booking_if_overdue
 from .stripe_gateway import (
     StripeAPIError,
     StripeConfigurationError,
@@ -36,54 +48,6 @@ from .stripe_gateway import (
 )
 
 ALLOWED_PAYMENT_METHODS = {"CARD", "APPLE_PAY"}
-AUTO_CANCELLATION_NOTE = "Provider did not accept within 24 hours."
-
-
-def expire_requested_bookings(queryset=None):
-    now = timezone.now()
-    base_queryset = queryset if queryset is not None else Booking.objects.all()
-    expired = (
-        base_queryset.filter(
-            status=Booking.Status.REQUESTED,
-            acceptance_deadline_at__isnull=False,
-            acceptance_deadline_at__lte=now,
-        )
-        .select_related("customer", "provider", "provider__user", "service")
-    )
-
-    for booking in expired:
-        update_fields = ["status", "cancellation_reason", "cancelled_by", "updated_at"]
-        booking.status = Booking.Status.CANCELLED
-        booking.cancellation_reason = AUTO_CANCELLATION_NOTE
-        booking.cancelled_by = None
-        if booking.acceptance_deadline_at is not None:
-            booking.acceptance_deadline_at = None
-            update_fields.append("acceptance_deadline_at")
-        if booking.provider_completed_confirmed_at is not None:
-            booking.provider_completed_confirmed_at = None
-            update_fields.append("provider_completed_confirmed_at")
-        if booking.customer_completed_confirmed_at is not None:
-            booking.customer_completed_confirmed_at = None
-            update_fields.append("customer_completed_confirmed_at")
-        if booking.escrow_status in {Booking.EscrowStatus.PAID, Booking.EscrowStatus.HELD}:
-            booking.escrow_status = Booking.EscrowStatus.REFUNDED
-            update_fields.append("escrow_status")
-        booking.save(update_fields=list(dict.fromkeys(update_fields)))
-        booking.release_availability_slot()
-
-        BookingStatusEvent.objects.create(
-            booking=booking,
-            from_status=Booking.Status.REQUESTED,
-            to_status=Booking.Status.CANCELLED,
-            changed_by=None,
-            note=AUTO_CANCELLATION_NOTE,
-        )
-        notify_booking_participants(
-            booking=booking,
-            title="Booking auto-cancelled",
-            body=f"Booking {booking.reference} was auto-cancelled because the provider did not accept in 24 hours.",
-            actor=None,
-        )
 
 
 def normalize_payment_method(value: Any) -> str:
@@ -99,154 +63,6 @@ def normalize_payment_method(value: Any) -> str:
     return method
 
 
-def map_stripe_session_to_event(*, payment_status: str, session_status: str) -> Optional[str]:
-    normalized_payment = payment_status.strip().upper()
-    normalized_session = session_status.strip().upper()
-
-    if normalized_payment in {"PAID", "NO_PAYMENT_REQUIRED"}:
-        return PaymentWebhookEvent.EventType.PAYMENT_SUCCEEDED
-    if normalized_session == "EXPIRED":
-        return PaymentWebhookEvent.EventType.PAYMENT_FAILED
-    return None
-
-
-def map_stripe_webhook_type_to_event(event_type: str) -> Optional[str]:
-    normalized = str(event_type or "").strip().lower()
-    if normalized in {"checkout.session.completed", "checkout.session.async_payment_succeeded"}:
-        return PaymentWebhookEvent.EventType.PAYMENT_SUCCEEDED
-    if normalized in {"checkout.session.async_payment_failed", "payment_intent.payment_failed"}:
-        return PaymentWebhookEvent.EventType.PAYMENT_FAILED
-    if normalized in {"charge.refunded", "charge.refund.updated"}:
-        return PaymentWebhookEvent.EventType.PAYMENT_REFUNDED
-    return None
-
-
-def resolve_booking_for_payment(*, booking_reference: str = "", external_reference: str = "") -> Optional[Booking]:
-    booking = None
-    if booking_reference:
-        booking = Booking.objects.filter(reference=booking_reference).first()
-    if not booking and external_reference:
-        booking = Booking.objects.filter(payment_reference=external_reference).first()
-    return booking
-
-
-def resolve_booking_from_stripe_object(stripe_object: dict[str, Any]) -> Optional[Booking]:
-    metadata = stripe_object.get("metadata") if isinstance(stripe_object.get("metadata"), dict) else {}
-    booking_id = str(metadata.get("booking_id") or "").strip()
-    if booking_id.isdigit():
-        booking = Booking.objects.filter(id=int(booking_id)).first()
-        if booking:
-            return booking
-
-    booking_reference = str(
-        metadata.get("booking_reference")
-        or stripe_object.get("client_reference_id")
-        or ""
-    ).strip()
-    if booking_reference:
-        booking = Booking.objects.filter(reference=booking_reference).first()
-        if booking:
-            return booking
-
-    external_candidates = [
-        stripe_object.get("id"),
-        stripe_object.get("checkout_session"),
-        stripe_object.get("payment_intent"),
-        stripe_object.get("latest_charge"),
-    ]
-    for candidate in external_candidates:
-        external_reference = str(candidate or "").strip()
-        if not external_reference:
-            continue
-        booking = Booking.objects.filter(payment_reference=external_reference).first()
-        if booking:
-            return booking
-    return None
-
-
-def apply_payment_event_to_booking(*, booking: Booking, event_type: str, payment_reference: str = "", actor=None):
-    update_fields = ["updated_at"]
-
-    if (
-        payment_reference
-        and event_type != PaymentWebhookEvent.EventType.PAYMENT_REFUNDED
-        and booking.payment_reference != payment_reference
-    ):
-        booking.payment_reference = payment_reference
-        update_fields.append("payment_reference")
-
-    if event_type == PaymentWebhookEvent.EventType.PAYMENT_SUCCEEDED:
-        if booking.status in {Booking.Status.CANCELLED, Booking.Status.REJECTED}:
-            if booking.escrow_status != Booking.EscrowStatus.REFUNDED:
-                booking.escrow_status = Booking.EscrowStatus.REFUNDED
-                update_fields.append("escrow_status")
-            notify_booking_participants(
-                booking=booking,
-                title="Payment captured on closed booking",
-                body=f"Payment was received for closed booking {booking.reference} and marked for refund.",
-                actor=actor,
-            )
-            booking.save(update_fields=list(dict.fromkeys(update_fields)))
-            return
-        if booking.escrow_status != Booking.EscrowStatus.HELD:
-            booking.escrow_status = Booking.EscrowStatus.HELD
-            update_fields.append("escrow_status")
-        if booking.status == Booking.Status.REQUESTED and not booking.acceptance_deadline_at:
-            booking.acceptance_deadline_at = timezone.now() + timedelta(hours=24)
-            update_fields.append("acceptance_deadline_at")
-        notify_booking_participants(
-            booking=booking,
-            title="Payment succeeded",
-            body=f"Payment received for booking {booking.reference}.",
-            actor=actor,
-        )
-
-    elif event_type == PaymentWebhookEvent.EventType.PAYMENT_FAILED:
-        if booking.escrow_status not in {
-            Booking.EscrowStatus.HELD,
-            Booking.EscrowStatus.RELEASED,
-            Booking.EscrowStatus.REFUNDED,
-        }:
-            booking.escrow_status = Booking.EscrowStatus.FAILED
-            update_fields.append("escrow_status")
-        notify_booking_participants(
-            booking=booking,
-            title="Payment failed",
-            body=f"Payment failed for booking {booking.reference}.",
-            actor=actor,
-        )
-
-    elif event_type == PaymentWebhookEvent.EventType.PAYMENT_REFUNDED:
-        if booking.escrow_status != Booking.EscrowStatus.REFUNDED:
-            booking.escrow_status = Booking.EscrowStatus.REFUNDED
-            update_fields.append("escrow_status")
-        if booking.status not in {Booking.Status.COMPLETED, Booking.Status.CANCELLED}:
-            booking.status = Booking.Status.CANCELLED
-            update_fields.append("status")
-        if booking.acceptance_deadline_at is not None:
-            booking.acceptance_deadline_at = None
-            update_fields.append("acceptance_deadline_at")
-        if booking.provider_completed_confirmed_at is not None:
-            booking.provider_completed_confirmed_at = None
-            update_fields.append("provider_completed_confirmed_at")
-        if booking.customer_completed_confirmed_at is not None:
-            booking.customer_completed_confirmed_at = None
-            update_fields.append("customer_completed_confirmed_at")
-        if booking.cancellation_reason != "Payment refunded":
-            booking.cancellation_reason = "Payment refunded"
-            update_fields.append("cancellation_reason")
-        booking.release_availability_slot()
-        notify_booking_participants(
-            booking=booking,
-            title="Payment refunded",
-            body=f"Payment refunded for booking {booking.reference}.",
-            actor=actor,
-        )
-
-    booking.save(update_fields=list(dict.fromkeys(update_fields)))
-    sync_payout_ledger_for_booking(booking=booking, actor=actor)
-
-
 def process_stripe_session(*, session_id: str, booking_reference: str = "", actor=None):
     if not session_id:
         raise ValidationError("Stripe session id is required.")
@@ -256,39 +72,33 @@ def process_stripe_session(*, session_id: str, booking_reference: str = "", acto
     session_status = str(session_payload.get("status") or "").upper()
     event_type = map_stripe_session_to_event(payment_status=payment_status, session_status=session_status)
 
-    booking = resolve_booking_for_payment(
-        booking_reference=booking_reference,
-        external_reference=session_id,
+    booking = resolve_payment_booking(
+        [("reference", booking_reference), ("external", session_id), *stripe_object_keys(session_payload)]
     )
 
-    if not booking:
-        booking = resolve_booking_from_stripe_object(session_payload)
-
     if booking and booking.payment_reference != session_id:
         booking.payment_reference = session_id
         booking.save(update_fields=["payment_reference", "updated_at"])
+    if booking:
+        register_payment_references(
+            booking_id=booking.id,
+            references=[session_id, session_payload.get("payment_intent")],
+        )
 
     if booking:
-        expire_requested_bookings(Booking.objects.filter(id=booking.id))
-        booking.refresh_from_db()
+        expire_booking_if_overdue(booking)
 
     if booking and event_type:
-        event = PaymentWebhookEvent.objects.create(
+        # Repeated verify calls for the same session outcome share one event row and apply it once.
+        event, _created = record_payment_event(
+            external_event_id=f"{session_id}:{event_type}",
             booking=booking,
             external_reference=session_id,
+            payment_reference=session_id,
             event_type=event_type,
             payload=session_payload,
-            processed=False,
-        )
-        apply_payment_event_to_booking(
-            booking=booking,
-            event_type=event_type,
-            payment_reference=session_id,
-            actor=actor,
         )
-        event.processed = True
-        event.processed_at = timezone.now()
-        event.save(update_fields=["processed", "processed_at"])
+        apply_recorded_payment_event(event.id, actor=actor)
 
     return {
         "booking": booking,
@@ -301,6 +111,7 @@ def process_stripe_session(*, session_id: str, booking_reference: str = "", acto
 
 class BookingViewSet(viewsets.ModelViewSet):
     serializer_class = BookingSerializer
+    pagination_class = CreatedAtCursorPagination
 
     def get_permissions(self):
         if self.action == "create":
@@ -318,9 +129,14 @@ class BookingViewSet(viewsets.ModelViewSet):
         else:
             scoped_queryset = queryset.filter(customer=user)
 
-        expire_requested_bookings(scoped_queryset)
         return scoped_queryset
 
+    def get_object(self):
+        # Overdue REQUESTED bookings are swept by the expire_bookings command; only settle the row being acted on.
+        booking = super().get_object()
+        expire_booking_if_overdue(booking)
+        return booking
+
     def perform_create(self, serializer):
         service = serializer.validated_data["service"]
         availability_slot = serializer.validated_data.get("availability_slot")
@@ -715,6 +531,7 @@ class BookingViewSet(viewsets.ModelViewSet):
         if checkout_session_id and booking.payment_reference != checkout_session_id:
             booking.payment_reference = checkout_session_id
             booking.save(update_fields=["payment_reference", "updated_at"])
+        register_payment_references(booking_id=booking.id, references=[checkout_session_id])
 
         webhook_url = settings.STRIPE_WEBHOOK_URL or request.build_absolute_uri(reverse("payment-webhook"))
 
@@ -792,6 +609,8 @@ class BookingViewSet(viewsets.ModelViewSet):
 
 
 class PaymentWebhookView(APIView):
+    """Verify and store payment events; `process_payment_events` applies them to bookings."""
+
     permission_classes = [AllowAny]
 
     def _process_internal_event(self, data):
@@ -801,47 +620,44 @@ class PaymentWebhookView(APIView):
         elif "booking_reference" in data:
             booking = Booking.objects.filter(reference=data["booking_reference"]).first()
 
-        if booking:
-            expire_requested_bookings(Booking.objects.filter(id=booking.id))
-            booking.refresh_from_db()
-
-        event = PaymentWebhookEvent.objects.create(
+        event, created = record_payment_event(
+            external_event_id=data.get("event_id", ""),
             booking=booking,
             external_reference=data.get("payment_reference", ""),
+            payment_reference=data.get("payment_reference", ""),
             event_type=data["event_type"],
             payload=data.get("payload", {}),
-            processed=False,
         )
 
-        if booking:
-            apply_payment_event_to_booking(
-                booking=booking,
-                event_type=data["event_type"],
-                payment_reference=data.get("payment_reference", ""),
-                actor=None,
-            )
-
-        event.processed = True
-        event.processed_at = timezone.now()
-        event.save(update_fields=["processed", "processed_at"])
-
-        return Response({"detail": "Webhook processed.", "booking_found": bool(booking)})
+        return Response(
+            {
+                "detail": "Webhook queued.",
+                "event_id": event.id,
+                "booking_found": bool(event.booking_id),
+                "duplicate": not created,
+            }
+        )
 
     def get(self, request):
         return Response({"detail": "Stripe webhook endpoint. Send POST requests from Stripe."})
 
     def post(self, request):
-        event_type = request.data.get("event_type") if hasattr(request.data, "get") else None
-        if event_type:
-            serializer = PaymentWebhookSerializer(data=request.data)
-            serializer.is_valid(raise_exception=True)
-            data = serializer.validated_data
-            return self._process_internal_event(data)
+        # Read the raw body before request.data: Stripe signs the exact bytes, and Django refuses
+        # to hand out request.body once the parsers have consumed the stream.
+        raw_body = request.body
+        signature_header = request.headers.get("Stripe-Signature", "")
+        if not signature_header:
+            event_type = request.data.get("event_type") if hasattr(request.data, "get") else None
+            if event_type:
+                serializer = PaymentWebhookSerializer(data=request.data)
+                serializer.is_valid(raise_exception=True)
+                data = serializer.validated_data
+                return self._process_internal_event(data)
 
         try:
             stripe_event = construct_event(
-                payload=request.body,
-                signature_header=request.headers.get("Stripe-Signature", ""),
+                payload=raw_body,
+                signature_header=signature_header,
             )
         except StripeSignatureError as exc:
             return Response({"detail": str(exc)}, status=status.HTTP_400_BAD_REQUEST)
@@ -856,13 +672,8 @@ class PaymentWebhookView(APIView):
                 status=status.HTTP_200_OK,
             )
 
-        payload_data = stripe_event.get("data") if isinstance(stripe_event.get("data"), dict) else {}
-        stripe_object = payload_data.get("object") if isinstance(payload_data.get("object"), dict) else {}
-
-        booking = resolve_booking_from_stripe_object(stripe_object)
-        if booking:
-            expire_requested_bookings(Booking.objects.filter(id=booking.id))
-            booking.refresh_from_db()
+        # Booking resolution and side effects run in the worker so Stripe gets its 200 straight away.
+        stripe_object = stripe_event_object(stripe_event)
         external_reference = str(
             stripe_object.get("id")
             or stripe_object.get("payment_intent")
@@ -873,36 +684,21 @@ class PaymentWebhookView(APIView):
         if stripe_event_type.startswith("checkout.session."):
             payment_reference = external_reference
 
-        event = PaymentWebhookEvent.objects.create(
-            booking=booking,
+        _event, created = record_payment_event(
+            external_event_id=str(stripe_event.get("id") or "").strip(),
             external_reference=external_reference,
+            payment_reference=payment_reference,
             event_type=mapped_event_type,
             payload=stripe_event,
-            processed=False,
         )
 
-        if booking:
-            try:
-                apply_payment_event_to_booking(
-                    booking=booking,
-                    event_type=mapped_event_type,
-                    payment_reference=payment_reference,
-                    actor=None,
-                )
-            except Exception as exc:  # pragma: no cover
-                return Response({"detail": f"Payment event apply failed: {exc}"}, status=status.HTTP_400_BAD_REQUEST)
-
-        event.processed = True
-        event.processed_at = timezone.now()
-        event.save(update_fields=["processed", "processed_at"])
-
         return Response(
             {
-                "detail": "Stripe webhook processed.",
+                "detail": "Stripe webhook queued.",
                 "provider": "STRIPE",
                 "provider_event_type": stripe_event_type,
                 "event_type": mapped_event_type,
-                "booking_found": bool(booking),
+                "duplicate": not created,
             },
             status=status.HTTP_200_OK,
         )
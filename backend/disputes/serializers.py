@@ -60,6 +60,12 @@ class DisputeSerializer(serializers.ModelSerializer):
         )
 
 
+class DisputeListSerializer(DisputeSerializer):
+    class Meta(DisputeSerializer.Meta):
+        fields = tuple(field for field in DisputeSerializer.Meta.fields if field != "evidence_items")
+        read_only_fields = tuple(field for field in DisputeSerializer.Meta.read_only_fields if field != "evidence_items")
+
+
 class AdminDecisionSerializer(serializers.Serializer):
     decision = serializers.ChoiceField(choices=Dispute.AdminDecision.choices)
     note = serializers.CharField(required=False, allow_blank=True)
@@ -0,0 +1,80 @@
+from decimal import Decimal
+
+from django.test import TestCase
+
+from accounts.models import ProviderProfile, User
+from bookings.models import Booking
+from marketplace.models import Service
+
+from .models import Dispute, DisputeEvidence
+
+
+class DisputeListQueryTests(TestCase):
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="admin_user",
+            email="admin@example.com",
+            password="StrongPass123!",
+            role=User.Role.ADMIN,
+            is_staff=True,
+        )
+        provider_user = User.objects.create_user(
+            username="provider_user",
+            email="provider@example.com",
+            password="StrongPass123!",
+            role=User.Role.PROVIDER,
+        )
+        provider = ProviderProfile.objects.create(
+            user=provider_user,
+            professional_name="Trusted Provider",
+            verification_status=ProviderProfile.VerificationStatus.APPROVED,
+        )
+        service = Service.objects.create(
+            provider=provider,
+            service_type=Service.ServiceType.UMRAH_BADAL,
+            title="Umrah Badal",
+            description="Performed on your behalf.",
+            city_scope=Service.CityScope.MAKKAH,
+            price_amount=Decimal("100.00"),
+        )
+        for index in range(3):
+            customer = User.objects.create_user(
+                username=f"customer_{index}",
+                email=f"customer{index}@example.com",
+                password="StrongPass123!",
+                role=User.Role.CUSTOMER,
+            )
+            booking = Booking.objects.create(
+                customer=customer,
+                provider=provider,
+                service=service,
+                status=Booking.Status.COMPLETED,
+            )
+            dispute = Dispute.objects.create(
+                booking=booking,
+                opened_by=customer,
+                requested_resolution=Dispute.RequestedResolution.REFUND,
+                reason="Not performed.",
+            )
+            for uploader in (customer, provider_user):
+                DisputeEvidence.objects.create(dispute=dispute, uploaded_by=uploader, file_url="https://example.com/proof.jpg")
+        self.client.force_login(self.admin)
+
+    def test_list_nests_evidence_only_when_included(self):
+        with self.assertNumQueries(4):
+            response = self.client.get("/api/disputes/")
+        self.assertNotIn("evidence_items", response.json()["results"][0])
+
+        with self.assertNumQueries(5):
+            response = self.client.get("/api/disputes/", {"include": "evidence"})
+        results = response.json()["results"]
+        self.assertEqual(len(results), 3)
+        self.assertEqual([len(result["evidence_items"]) for result in results], [2, 2, 2])
+        self.assertTrue(all(item["uploader_name"] is not None for item in results[0]["evidence_items"]))
+
+    def test_detail_always_nests_evidence(self):
+        dispute = Dispute.objects.first()
+
+        response = self.client.get(f"/api/disputes/{dispute.id}/")
+
+        self.assertEqual(len(response.json()["evidence_items"]), 2)
@@ -1,3 +1,4 @@
+from django.db.models import Prefetch
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied, ValidationError
@@ -12,16 +13,38 @@ from payouts.services import sync_payout_ledger_for_booking
 
 from .models import Dispute, DisputeEvidence
 from .permissions import IsDisputeParticipantOrAdmin
-from .serializers import AdminDecisionSerializer, DisputeSerializer, DisputeEvidenceSerializer, EvidenceCreateSerializer
+from .serializers import (
+    AdminDecisionSerializer,
+    DisputeEvidenceSerializer,
+    DisputeListSerializer,
+    DisputeSerializer,
+    EvidenceCreateSerializer,
+)
 
 
 class DisputeViewSet(viewsets.ModelViewSet):
     serializer_class = DisputeSerializer
     permission_classes = [IsAuthenticated]
 
+    def _includes_evidence(self):
+        # Lists skip the nested evidence unless asked for with ?include=evidence; single disputes always carry it.
+        if self.action != "list":
+            return True
+        include = self.request.query_params.get("include", "")
+        return "evidence" in {part.strip() for part in include.split(",")}
+
+    def get_serializer_class(self):
+        if self._includes_evidence():
+            return DisputeSerializer
+        return DisputeListSerializer
+
     def get_queryset(self):
         user = self.request.user
         queryset = Dispute.objects.select_related("booking", "booking__provider", "booking__provider__user", "opened_by")
+        if self._includes_evidence():
+            queryset = queryset.prefetch_related(
+                Prefetch("evidence_items", queryset=DisputeEvidence.objects.select_related("uploaded_by"))
+            )
 
         if user.is_staff or user.role == User.Role.ADMIN:
             return queryset
@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from marketplace.models import Review
+
+
+class Command(BaseCommand):
+    help = "Recompute provider rating sums, counts and averages from public reviews wherever they drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", type=int, action="append", dest="provider_ids", help="Limit to these provider ids.")
+
+    def handle(self, *args, **options):
+        fixed = Review.reconcile_provider_metrics(options["provider_ids"])
+        self.stdout.write(f"Reconciled {fixed} provider profile(s).")
@@ -0,0 +1,67 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:44
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_language_lookups(apps, schema_editor):
+    from accounts.languages import normalize_languages
+
+    for model_name, lookup_name, owner_field in (
+        ("Service", "ServiceLanguage", "service_id"),
+        ("ProviderAvailability", "AvailabilityLanguage", "slot_id"),
+    ):
+        Owner = apps.get_model("marketplace", model_name)
+        Lookup = apps.get_model("marketplace", lookup_name)
+        rows = [
+            Lookup(**{owner_field: owner_id, "code": code})
+            for owner_id, languages in Owner.objects.values_list("id", "languages").iterator()
+            for code in normalize_languages(languages)
+        ]
+        Lookup.objects.bulk_create(rows, batch_size=500, ignore_conflicts=True)
+
+
+def noop_reverse(apps, schema_editor):
+    return
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('marketplace', '0005_alter_provideravailability_city_scope_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AvailabilityLanguage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=64)),
+                ('slot', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='language_codes', to='marketplace.provideravailability')),
+            ],
+        ),
+        migrations.CreateModel(
+            name='ServiceLanguage',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('code', models.CharField(max_length=64)),
+                ('service', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='language_codes', to='marketplace.service')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['code', 'service'], name='service_language_code_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='servicelanguage',
+            constraint=models.UniqueConstraint(fields=('service', 'code'), name='uniq_service_language'),
+        ),
+        migrations.AddIndex(
+            model_name='availabilitylanguage',
+            index=models.Index(fields=['code', 'slot'], name='availability_language_code_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='availabilitylanguage',
+            constraint=models.UniqueConstraint(fields=('slot', 'code'), name='uniq_availability_language'),
+        ),
+        migrations.RunPython(backfill_language_lookups, noop_reverse),
+    ]
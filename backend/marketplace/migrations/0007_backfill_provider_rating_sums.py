@@ -0,0 +1,41 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:58
+
+from decimal import Decimal
+
+from django.db import migrations
+from django.db.models import Count, Sum
+
+
+def backfill_rating_sums(apps, schema_editor):
+    ProviderProfile = apps.get_model("accounts", "ProviderProfile")
+    Review = apps.get_model("marketplace", "Review")
+
+    ProviderProfile.objects.update(rating_sum=0, total_reviews=0, rating_average=Decimal("0.00"))
+    totals = (
+        Review.objects.filter(is_public=True)
+        .values("provider_id")
+        .annotate(rating_sum=Sum("rating"), total_reviews=Count("id"))
+        .order_by()
+    )
+    for row in totals.iterator():
+        ProviderProfile.objects.filter(id=row["provider_id"]).update(
+            rating_sum=row["rating_sum"],
+            total_reviews=row["total_reviews"],
+            rating_average=(Decimal(row["rating_sum"]) / row["total_reviews"]).quantize(Decimal("0.01")),
+        )
+
+
+def noop_reverse(apps, schema_editor):
+    return
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_providerprofile_rating_sum'),
+        ('marketplace', '0006_language_lookup'),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_rating_sums, noop_reverse),
+    ]
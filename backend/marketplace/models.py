@@ -3,11 +3,14 @@ from decimal import Decimal
 from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.core.validators import MaxValueValidator, MinValueValidator
-from django.db import models
-from django.db.models import Avg, Count
+from django.db import models, transaction
+from django.db.models import Case, Count, F, OuterRef, Q, Subquery, Sum, Value, When
+from django.db.models.functions import Cast, Coalesce, Round
 from django.utils import timezone
 
+from accounts.languages import sync_language_rows
 from accounts.models import ProviderProfile
+from umrah_link.cache import invalidate_public_listings
 
 
 class Service(models.Model):
@@ -43,6 +46,31 @@ class Service(models.Model):
         # Currency is platform-wide and fixed to USD.
         self.currency = "USD"
         super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "languages" in update_fields:
+            sync_language_rows(model=ServiceLanguage, owner_field="service_id", owner_id=self.pk, languages=self.languages)
+        invalidate_public_listings()
+
+    def delete(self, *args, **kwargs):
+        result = super().delete(*args, **kwargs)
+        invalidate_public_listings()
+        return result
+
+
+class ServiceLanguage(models.Model):
+    service = models.ForeignKey(Service, on_delete=models.CASCADE, related_name="language_codes")
+    code = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["service", "code"], name="uniq_service_language"),
+        ]
+        indexes = [
+            models.Index(fields=["code", "service"], name="service_language_code_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"ServiceLanguage<{self.service_id}:{self.code}>"
 
 
 class Review(models.Model):
@@ -68,25 +96,95 @@ class Review(models.Model):
     def __str__(self) -> str:
         return f"Review<{self.provider_id}:{self.rating}>"
 
-    def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
-        self.refresh_provider_metrics(self.provider_id)
+    def save(self, *args, refresh_metrics: bool = True, **kwargs):
+        """Pass refresh_metrics=False for bulk imports, then run `manage.py reconcile_provider_ratings`."""
+        with transaction.atomic():
+            previous = None
+            if refresh_metrics and self.pk:
+                previous = (
+                    Review.objects.select_for_update()
+                    .filter(pk=self.pk)
+                    .values("provider_id", "rating", "is_public")
+                    .first()
+                )
+            super().save(*args, **kwargs)
+            if refresh_metrics:
+                deltas = {}
+                if previous and previous["is_public"]:
+                    deltas[previous["provider_id"]] = (-previous["rating"], -1)
+                if self.is_public:
+                    rating_delta, count_delta = deltas.get(self.provider_id, (0, 0))
+                    deltas[self.provider_id] = (rating_delta + self.rating, count_delta + 1)
+                for provider_id, (rating_delta, count_delta) in deltas.items():
+                    if rating_delta or count_delta:
+                        self.apply_rating_delta(provider_id, rating_delta=rating_delta, count_delta=count_delta)
+        invalidate_public_listings()
+
+    def delete(self, *args, refresh_metrics: bool = True, **kwargs):
+        with transaction.atomic():
+            previous = (
+                Review.objects.select_for_update()
+                .filter(pk=self.pk)
+                .values("provider_id", "rating", "is_public")
+                .first()
+            )
+            result = super().delete(*args, **kwargs)
+            if refresh_metrics and previous and previous["is_public"]:
+                self.apply_rating_delta(previous["provider_id"], rating_delta=-previous["rating"], count_delta=-1)
+        invalidate_public_listings()
+        return result
 
-    def delete(self, *args, **kwargs):
-        provider_id = self.provider_id
-        super().delete(*args, **kwargs)
-        self.refresh_provider_metrics(provider_id)
+    @staticmethod
+    def rating_average_expression():
+        return Case(
+            When(total_reviews=0, then=Value(Decimal("0.00"))),
+            default=Cast(
+                Round(Cast(F("rating_sum"), models.FloatField()) / F("total_reviews"), 2),
+                models.DecimalField(max_digits=3, decimal_places=2),
+            ),
+            output_field=models.DecimalField(max_digits=3, decimal_places=2),
+        )
 
     @staticmethod
-    def refresh_provider_metrics(provider_id=None):
-        target_provider_id = provider_id
-        if target_provider_id is None:
-            return
+    def apply_rating_delta(provider_id, *, rating_delta: int, count_delta: int) -> None:
+        profiles = ProviderProfile.objects.filter(id=provider_id)
+        with transaction.atomic():
+            # The first UPDATE row-locks the profile, so concurrent reviews serialize instead of overwriting.
+            updated = profiles.filter(rating_sum__gte=-rating_delta, total_reviews__gte=-count_delta).update(
+                rating_sum=F("rating_sum") + rating_delta,
+                total_reviews=F("total_reviews") + count_delta,
+            )
+            if not updated:
+                # The stored totals miss reviews saved with refresh_metrics=False; rebuild them instead.
+                Review.reconcile_provider_metrics([provider_id])
+                return
+            profiles.update(rating_average=Review.rating_average_expression())
 
-        aggregate = Review.objects.filter(provider_id=target_provider_id).aggregate(avg_rating=Avg("rating"), count=Count("id"))
-        avg_rating = Decimal(str(aggregate["avg_rating"] or 0)).quantize(Decimal("0.01"))
-        count = aggregate["count"] or 0
-        ProviderProfile.objects.filter(id=target_provider_id).update(rating_average=avg_rating, total_reviews=count)
+    @staticmethod
+    def reconcile_provider_metrics(provider_ids=None) -> int:
+        """Recompute sums from public reviews for every profile that drifted; returns how many were fixed."""
+        public_reviews = Review.objects.filter(provider=OuterRef("pk"), is_public=True).order_by().values("provider")
+        expected_sum = Coalesce(Subquery(public_reviews.annotate(total=Sum("rating")).values("total")), 0)
+        expected_count = Coalesce(Subquery(public_reviews.annotate(total=Count("id")).values("total")), 0)
+
+        profiles = ProviderProfile.objects.all()
+        if provider_ids is not None:
+            profiles = profiles.filter(id__in=list(provider_ids))
+        drifted_ids = list(
+            profiles.annotate(expected_sum=expected_sum, expected_count=expected_count)
+            .filter(
+                ~Q(rating_sum=F("expected_sum"))
+                | ~Q(total_reviews=F("expected_count"))
+                | ~Q(rating_average=Review.rating_average_expression())
+            )
+            .values_list("id", flat=True)
+        )
+        if drifted_ids:
+            drifted = ProviderProfile.objects.filter(id__in=drifted_ids)
+            with transaction.atomic():
+                drifted.update(rating_sum=expected_sum, total_reviews=expected_count)
+                drifted.update(rating_average=Review.rating_average_expression())
+        return len(drifted_ids)
 
 
 class ProviderAvailability(models.Model):
@@ -118,3 +216,25 @@ class ProviderAvailability(models.Model):
             raise ValidationError("End time must be after start time.")
         if self.start_at < timezone.now():
             raise ValidationError("Availability start time must be in the future.")
+
+    def save(self, *args, **kwargs):
+        super().save(*args, **kwargs)
+        update_fields = kwargs.get("update_fields")
+        if update_fields is None or "languages" in update_fields:
+            sync_language_rows(model=AvailabilityLanguage, owner_field="slot_id", owner_id=self.pk, languages=self.languages)
+
+
+class AvailabilityLanguage(models.Model):
+    slot = models.ForeignKey(ProviderAvailability, on_delete=models.CASCADE, related_name="language_codes")
+    code = models.CharField(max_length=64)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["slot", "code"], name="uniq_availability_language"),
+        ]
+        indexes = [
+            models.Index(fields=["code", "slot"], name="availability_language_code_idx"),
+        ]
+
+    def __str__(self) -> str:
+        return f"AvailabilityLanguage<{self.slot_id}:{self.code}>"
@@ -1,31 +1,21 @@
 from rest_framework import serializers
 
 from accounts.models import ProviderProfile
+from accounts.serializers import resolve_provider_photo_url
 
 from .models import ProviderAvailability, Review, Service
 
 ALLOWED_SERVICE_CITY_SCOPES = {"MAKKAH", "MADINAH"}
+DIRECTORY_PHOTO_SIZE = 256
 
 
 class ProviderDirectorySerializer(serializers.ModelSerializer):
     languages = serializers.ListField(source="supported_languages", read_only=True)
-    services_count = serializers.SerializerMethodField()
+    services_count = serializers.IntegerField(source="active_services_count", read_only=True)
     profile_photo_url = serializers.SerializerMethodField()
 
-    def get_services_count(self, obj):
-        return obj.services.filter(is_active=True).count()
-
     def get_profile_photo_url(self, obj):
-        request = self.context.get("request")
-        if not obj.profile_photo:
-            return ""
-        try:
-            url = obj.profile_photo.url
-        except ValueError:
-            return ""
-        if request:
-            return request.build_absolute_uri(url)
-        return url
+        return resolve_provider_photo_url(self.context.get("request"), obj, size=DIRECTORY_PHOTO_SIZE)
 
     class Meta:
         model = ProviderProfile
@@ -53,17 +43,7 @@ class ServiceSerializer(serializers.ModelSerializer):
     provider_photo_url = serializers.SerializerMethodField()
 
     def get_provider_photo_url(self, obj):
-        request = self.context.get("request")
-        profile_photo = getattr(obj.provider, "profile_photo", None)
-        if not profile_photo:
-            return ""
-        try:
-            url = profile_photo.url
-        except ValueError:
-            return ""
-        if request:
-            return request.build_absolute_uri(url)
-        return url
+        return resolve_provider_photo_url(self.context.get("request"), obj.provider, size=DIRECTORY_PHOTO_SIZE)
 
     def validate(self, attrs):
         attrs["currency"] = "USD"
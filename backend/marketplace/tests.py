@@ -1,10 +1,22 @@
+import tempfile
 from datetime import timedelta
+from io import BytesIO
+from unittest import mock
 
+from django.core.cache import caches
+from django.core.files.storage import default_storage
+from django.test import override_settings
 from django.utils import timezone
+from PIL import Image
 from rest_framework.authtoken.models import Token
 from rest_framework.test import APITestCase
 
 from accounts.models import ProviderProfile, User
+from accounts.photo_variants import photo_variant_path
+from accounts.serializers import clear_provider_photo, resolve_provider_photo_url, store_provider_photo
+from umrah_link.cache import PUBLIC_LISTING_GENERATION_KEY
+
+from .models import Review, Service
 
 
 class ProviderLocationScopeValidationTests(APITestCase):
@@ -84,3 +96,349 @@ class ProviderLocationScopeValidationTests(APITestCase):
         self.assertEqual(response.status_code, 400)
         self.assertIn("city_scope", response.data)
 
+
+class ProviderDirectoryQueryCountTests(APITestCase):
+    directory_url = "/api/marketplace/providers/"
+
+    def _create_providers(self, count, start=0):
+        for index in range(start, start + count):
+            user = User.objects.create_user(
+                username=f"provider_{index}",
+                email=f"provider-{index}@example.com",
+                password="StrongPass123!",
+                role=User.Role.PROVIDER,
+            )
+            profile = ProviderProfile.objects.create(
+                user=user,
+                professional_name=f"Provider {index}",
+                city="Makkah",
+                base_locations=["Makkah"],
+                supported_languages=["Arabic"],
+                verification_status=ProviderProfile.VerificationStatus.APPROVED,
+                is_accepting_bookings=True,
+            )
+            for service_index, is_active in enumerate((True, True, False)):
+                Service.objects.create(
+                    provider=profile,
+                    service_type=Service.ServiceType.UMRAH_BADAL,
+                    title=f"Service {service_index}",
+                    description="Directory fixture",
+                    city_scope=Service.CityScope.MAKKAH,
+                    price_amount="100.00",
+                    is_active=is_active,
+                )
+
+    def test_directory_list_query_count_is_constant(self):
+        self._create_providers(3)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.directory_url)
+        self.assertEqual(len(response.data["results"]), 3)
+
+        self._create_providers(15, start=3)
+        with self.assertNumQueries(2):
+            response = self.client.get(self.directory_url)
+        self.assertEqual(len(response.data["results"]), 18)
+        self.assertTrue(all(item["services_count"] == 2 for item in response.data["results"]))
+
+    def test_service_type_filter_does_not_duplicate_providers(self):
+        self._create_providers(2)
+
+        response = self.client.get(self.directory_url, {"service_type": "umrah_badal"})
+
+        self.assertEqual(response.data["count"], 2)
+        self.assertEqual([item["services_count"] for item in response.data["results"]], [2, 2])
+
+
+class LanguageFilterTests(APITestCase):
+    services_url = "/api/marketplace/services/"
+    directory_url = "/api/marketplace/providers/"
+
+    def setUp(self):
+        user = User.objects.create_user(
+            username="language_provider",
+            email="language-provider@example.com",
+            password="StrongPass123!",
+            role=User.Role.PROVIDER,
+        )
+        self.profile = ProviderProfile.objects.create(
+            user=user,
+            professional_name="Language Provider",
+            supported_languages=["Arabic", "English"],
+            verification_status=ProviderProfile.VerificationStatus.APPROVED,
+            is_accepting_bookings=True,
+        )
+        for title, languages in (("Arabic only", ["Arabic"]), ("Bilingual", [" arabic ", "English"]), ("Urdu", ["Urdu"])):
+            Service.objects.create(
+                provider=self.profile,
+                service_type=Service.ServiceType.UMRAH_BADAL,
+                title=title,
+                description="Language fixture",
+                city_scope=Service.CityScope.MAKKAH,
+                languages=languages,
+                price_amount="100.00",
+            )
+
+    def _titles(self, params):
+        response = self.client.get(self.services_url, params)
+        return sorted(item["title"] for item in response.data["results"])
+
+    def test_language_filter_matches_whole_normalized_codes(self):
+        self.assertEqual(self._titles({"language": "ARABIC"}), ["Arabic only", "Bilingual"])
+        self.assertEqual(self._titles({"language": "Arab"}), [])
+
+    def test_multiple_languages_support_any_and_all(self):
+        self.assertEqual(self._titles({"language": "English,Urdu"}), ["Bilingual", "Urdu"])
+        self.assertEqual(self._titles({"language": ["Arabic", "English"], "language_match": "all"}), ["Bilingual"])
+
+    def test_directory_follows_profile_language_changes(self):
+        self.profile.supported_languages = ["Urdu"]
+        self.profile.save()
+
+        self.assertEqual(self.client.get(self.directory_url, {"language": "English"}).data["count"], 0)
+        self.assertEqual(self.client.get(self.directory_url, {"language": "urdu"}).data["count"], 1)
+
+
+class PublicListingCacheTests(APITestCase):
+    services_url = "/api/marketplace/services/"
+
+    def setUp(self):
+        user = User.objects.create_user(
+            username="cached_provider",
+            email="cached-provider@example.com",
+            password="StrongPass123!",
+            role=User.Role.PROVIDER,
+        )
+        self.profile = ProviderProfile.objects.create(
+            user=user,
+            professional_name="Cached Provider",
+            verification_status=ProviderProfile.VerificationStatus.APPROVED,
+            is_accepting_bookings=True,
+        )
+        self.service = Service.objects.create(
+            provider=self.profile,
+            service_type=Service.ServiceType.UMRAH_BADAL,
+            title="Cached service",
+            description="Cache fixture",
+            city_scope=Service.CityScope.MAKKAH,
+            price_amount="100.00",
+        )
+
+    def test_anonymous_listing_is_served_from_cache_until_a_service_changes(self):
+        first = self.client.get(self.services_url, {"city_scope": "makkah", "service_type": "umrah_badal"})
+        with self.assertNumQueries(0):
+            reordered = self.client.get(self.services_url, {"service_type": "umrah_badal", "city_scope": "makkah"})
+        self.assertEqual(reordered.data, first.data)
+
+        self.service.title = "Renamed service"
+        self.service.save()
+
+        refreshed = self.client.get(self.services_url, {"city_scope": "makkah", "service_type": "umrah_badal"})
+        self.assertEqual(refreshed.data["results"][0]["title"], "Renamed service")
+
+    def test_moderation_drops_provider_from_cached_directory(self):
+        self.assertEqual(self.client.get("/api/marketplace/providers/").data["count"], 1)
+
+        self.profile.verification_status = ProviderProfile.VerificationStatus.SUSPENDED
+        self.profile.save(update_fields=["verification_status", "updated_at"])
+
+        self.assertEqual(self.client.get("/api/marketplace/providers/").data["count"], 0)
+
+    # Two aliases on one locmem LOCATION share a store, standing in for two workers on one Redis server.
+    @override_settings(
+        CACHES={
+            alias: {"BACKEND": "django.core.cache.backends.locmem.LocMemCache", "LOCATION": "shared-listings"}
+            for alias in ("default", "other_worker")
+        }
+    )
+    def test_invalidation_is_visible_to_every_connection_of_a_shared_backend(self):
+        self.client.get(self.services_url)
+        generation = caches["other_worker"].get(PUBLIC_LISTING_GENERATION_KEY)
+
+        self.service.title = "Renamed service"
+        self.service.save()
+
+        self.assertIsNotNone(generation)
+        self.assertNotEqual(caches["other_worker"].get(PUBLIC_LISTING_GENERATION_KEY), generation)
+        self.assertEqual(
+            caches["other_worker"].get(PUBLIC_LISTING_GENERATION_KEY),
+            caches["default"].get(PUBLIC_LISTING_GENERATION_KEY),
+        )
+
+
+class ProviderPhotoEndpointTests(APITestCase):
+    def setUp(self):
+        media_root = tempfile.TemporaryDirectory()
+        self.addCleanup(media_root.cleanup)
+        media_override = override_settings(MEDIA_ROOT=media_root.name)
+        media_override.enable()
+        self.addCleanup(media_override.disable)
+        user = User.objects.create_user(
+            username="photo_provider",
+            email="photo-provider@example.com",
+            password="StrongPass123!",
+            role=User.Role.PROVIDER,
+        )
+        self.profile = ProviderProfile.objects.create(user=user, professional_name="Photo Provider")
+        store_provider_photo(self.profile, content=b"fake-image-bytes", content_type="image/jpeg")
+        self.photo_url = resolve_provider_photo_url(None, self.profile)
+
+    def test_versioned_photo_is_cached_long_term(self):
+        response = self.client.get(self.photo_url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.content, b"fake-image-bytes")
+        self.assertEqual(response["Content-Type"], "image/jpeg")
+        self.assertIn("immutable", response["Cache-Control"])
+        self.assertTrue(response["ETag"])
+        self.assertTrue(response["Last-Modified"])
+
+    def test_conditional_request_returns_not_modified(self):
+        etag = self.client.get(self.photo_url)["ETag"]
+
+        response = self.client.get(self.photo_url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response["ETag"], etag)
+
+    def test_upload_after_removal_does_not_reuse_photo_url(self):
+        response = self.client.get(self.photo_url)
+        clear_provider_photo(self.profile)
+        self.assertEqual(self.client.get(self.photo_url).status_code, 404)
+
+        store_provider_photo(self.profile, content=b"other-image-bytes", content_type="image/jpeg")
+        photo_url = resolve_provider_photo_url(None, self.profile)
+
+        self.assertNotEqual(photo_url, self.photo_url)
+        self.assertEqual(self.client.get(photo_url, HTTP_IF_NONE_MATCH=response["ETag"]).status_code, 200)
+
+    def test_etag_follows_content_and_stale_urls_revalidate(self):
+        first_etag = self.client.get(self.photo_url)["ETag"]
+        store_provider_photo(self.profile, content=b"fake-image-bytes", content_type="image/jpeg")
+
+        self.assertEqual(self.client.get(resolve_provider_photo_url(None, self.profile))["ETag"], first_etag)
+        stale = self.client.get(f"/api/marketplace/providers/{self.profile.pk}/photo/?v=1")
+        self.assertEqual(stale.status_code, 200)
+        self.assertNotIn("immutable", stale["Cache-Control"])
+
+    def test_size_parameter_redirects_to_stored_variant(self):
+        source = BytesIO()
+        Image.new("RGB", (1200, 900), color=(20, 120, 80)).save(source, format="PNG")
+        store_provider_photo(self.profile, content=source.getvalue(), content_type="image/png")
+        photo_url = resolve_provider_photo_url(None, self.profile, size=64)
+        path = photo_variant_path(
+            provider_profile_id=self.profile.pk,
+            version=self.profile.profile_photo_version,
+            size=64,
+            image_format="webp",
+        )
+
+        with mock.patch.object(default_storage, "exists", side_effect=AssertionError("storage was queried")):
+            response = self.client.get(photo_url)
+
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(response["Location"], default_storage.url(path))
+        self.assertIn("immutable", response["Cache-Control"])
+        with default_storage.open(path, "rb") as stored, Image.open(stored) as variant:
+            self.assertEqual(max(variant.size), 64)
+
+    def test_unrecorded_variant_is_rendered_once_and_recorded(self):
+        source = BytesIO()
+        Image.new("RGB", (400, 300), color=(200, 40, 40)).save(source, format="PNG")
+        store_provider_photo(self.profile, content=source.getvalue(), content_type="image/png")
+        ProviderProfile.objects.filter(pk=self.profile.pk).update(profile_photo_variants=[])
+        path = photo_variant_path(
+            provider_profile_id=self.profile.pk,
+            version=self.profile.profile_photo_version,
+            size=256,
+            image_format="jpeg",
+        )
+        default_storage.delete(path)
+
+        response = self.client.get(resolve_provider_photo_url(None, self.profile, size=256) + "&image_format=jpeg")
+
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(default_storage.exists(path))
+        self.profile.refresh_from_db()
+        self.assertEqual(self.profile.profile_photo_variants, ["256.jpeg"])
+
+    def test_variant_of_unreadable_photo_is_not_found(self):
+        response = self.client.get(resolve_provider_photo_url(None, self.profile, size=64))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertNotIn("immutable", response.get("Cache-Control", ""))
+
+
+class ProviderRatingAggregationTests(APITestCase):
+    def setUp(self):
+        provider_user = User.objects.create_user(
+            username="rated_provider",
+            email="rated-provider@example.com",
+            password="StrongPass123!",
+            role=User.Role.PROVIDER,
+        )
+        self.customer = User.objects.create_user(
+            username="rating_customer",
+            email="rating-customer@example.com",
+            password="StrongPass123!",
+        )
+        self.profile = ProviderProfile.objects.create(user=provider_user, professional_name="Rated Provider")
+        self.service = Service.objects.create(
+            provider=self.profile,
+            service_type=Service.ServiceType.UMRAH_BADAL,
+            title="Rated service",
+            description="Rating fixture",
+            city_scope=Service.CityScope.MAKKAH,
+            price_amount="100.00",
+        )
+
+    def _review(self, rating, **overrides):
+        values = {"service": self.service, "customer": self.customer, "provider": self.profile, "rating": rating}
+        values.update(overrides)
+        return Review.objects.create(**values)
+
+    def _metrics(self):
+        self.profile.refresh_from_db()
+        return self.profile.rating_sum, self.profile.total_reviews, str(self.profile.rating_average)
+
+    def test_metrics_follow_public_reviews_incrementally(self):
+        self._review(5)
+        second = self._review(4)
+        self._review(4)
+        self._review(1, is_public=False)
+        self.assertEqual(self._metrics(), (13, 3, "4.33"))
+
+        second.rating = 2
+        second.save()
+        self.assertEqual(self._metrics(), (11, 3, "3.67"))
+
+        second.is_public = False
+        second.save()
+        self.assertEqual(self._metrics(), (9, 2, "4.50"))
+
+        Review.objects.get(rating=5).delete()
+        self.assertEqual(self._metrics(), (4, 1, "4.00"))
+
+    def test_bulk_import_skips_refresh_until_reconciled(self):
+        for rating in (5, 3):
+            Review(service=self.service, customer=self.customer, provider=self.profile, rating=rating).save(
+                refresh_metrics=False
+            )
+        self.assertEqual(self._metrics(), (0, 0, "0.00"))
+
+        self.assertEqual(Review.reconcile_provider_metrics(), 1)
+        self.assertEqual(self._metrics(), (8, 2, "4.00"))
+        self.assertEqual(Review.reconcile_provider_metrics(), 0)
+
+    def test_removing_an_unreconciled_import_rebuilds_instead_of_going_negative(self):
+        imported = Review(service=self.service, customer=self.customer, provider=self.profile, rating=5)
+        imported.save(refresh_metrics=False)
+        self._review(3)
+        self.assertEqual(self._metrics(), (3, 1, "3.00"))
+
+        imported.rating = 1
+        imported.save()
+        self.assertEqual(self._metrics(), (4, 2, "2.00"))
+
+        Review.objects.filter(rating=3).get().delete()
+        imported.delete()
+        self.assertEqual(self._metrics(), (0, 0, "0.00"))
@@ -1,19 +1,59 @@
-from django.db.models import Q
+from django.core.files.storage import default_storage
+from django.db.models import Count, Exists, OuterRef, Q
+from django.http import Http404, HttpResponse, HttpResponseRedirect
+from django.shortcuts import get_object_or_404
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from rest_framework import mixins, permissions, status, viewsets
+from rest_framework.decorators import action
 from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 
-from accounts.models import ProviderProfile, User
+from accounts.languages import normalize_languages
+from accounts.models import ProviderLanguage, ProviderProfile, User
+from accounts.photo_store import get_provider_photo
+from accounts.photo_variants import (
+    DEFAULT_PHOTO_VARIANT_FORMAT,
+    PHOTO_VARIANT_FORMATS,
+    PHOTO_VARIANT_SIZES,
+    get_photo_variant,
+)
+from accounts.serializers import provider_photo_url_version
 from bookings.models import Booking
+from umrah_link.cache import CachedPublicListMixin
 
-from .models import ProviderAvailability, Review, Service
+from .models import AvailabilityLanguage, ProviderAvailability, Review, Service, ServiceLanguage
 from .permissions import CanManageOwnService, IsProviderUser
 from .serializers import ProviderAvailabilitySerializer, ProviderDirectorySerializer, ReviewSerializer, ServiceSerializer
 
+PHOTO_IMMUTABLE_MAX_AGE = 60 * 60 * 24 * 365
+PHOTO_REVALIDATE_MAX_AGE = 60 * 5
 
-class ProviderDirectoryViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+
+def filter_by_languages(queryset, query_params, *, lookup_model, owner_field: str):
+    """Exact-match `?language=` filter; repeat or comma-separate values, `language_match=all` requires every one."""
+    codes = normalize_languages(
+        [part for value in query_params.getlist("language") for part in value.split(",")]
+    )
+    if not codes:
+        return queryset
+
+    if query_params.get("language_match", "any").lower() == "all":
+        for code in codes:
+            queryset = queryset.filter(Exists(lookup_model.objects.filter(**{owner_field: OuterRef("pk")}, code=code)))
+        return queryset
+    return queryset.filter(Exists(lookup_model.objects.filter(**{owner_field: OuterRef("pk")}, code__in=codes)))
+
+
+class ProviderDirectoryViewSet(
+    CachedPublicListMixin,
+    mixins.ListModelMixin,
+    mixins.RetrieveModelMixin,
+    viewsets.GenericViewSet,
+):
     permission_classes = [permissions.AllowAny]
     serializer_class = ProviderDirectorySerializer
+    public_listing_scope = "providers"
 
     def get_queryset(self):
         queryset = ProviderProfile.objects.select_related("user").filter(
@@ -23,22 +63,98 @@ class ProviderDirectoryViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin,
             user__is_banned=False,
         )
 
-        language = self.request.query_params.get("language")
         city = self.request.query_params.get("city")
         service_type = self.request.query_params.get("service_type")
 
-        if language:
-            queryset = queryset.filter(Q(supported_languages__icontains=language))
+        queryset = filter_by_languages(
+            queryset,
+            self.request.query_params,
+            lookup_model=ProviderLanguage,
+            owner_field="provider",
+        )
         if city:
             queryset = queryset.filter(Q(city__icontains=city) | Q(base_locations__icontains=city))
         if service_type:
-            queryset = queryset.filter(services__service_type=service_type.upper(), services__is_active=True)
+            queryset = queryset.filter(
+                Exists(
+                    Service.objects.filter(
+                        provider=OuterRef("pk"),
+                        service_type=service_type.upper(),
+                        is_active=True,
+                    )
+                )
+            )
+
+        return queryset.annotate(
+            active_services_count=Count("services", filter=Q(services__is_active=True)),
+        ).order_by("-rating_average", "-total_reviews")
+
+    @action(detail=True, methods=["get"])
+    def photo(self, request, pk=None):
+        # Moderation screens link pending providers here too, so look the profile up outside the directory filters.
+        profile = get_object_or_404(
+            ProviderProfile.objects.only(
+                "id",
+                "profile_photo_version",
+                "profile_photo_stored",
+                "profile_photo_digest",
+                "profile_photo_variants",
+                "updated_at",
+            ),
+            pk=pk,
+        )
+        if not profile.profile_photo_stored:
+            raise Http404("Provider photo not found.")
+
+        size = request.query_params.get("size")
+        image_format = (request.query_params.get("image_format") or DEFAULT_PHOTO_VARIANT_FORMAT).lower()
+        if size is not None:
+            if not size.isdigit() or int(size) not in PHOTO_VARIANT_SIZES:
+                raise ValidationError({"size": f"Choose one of: {', '.join(map(str, PHOTO_VARIANT_SIZES))}."})
+            if image_format not in PHOTO_VARIANT_FORMATS:
+                raise ValidationError({"image_format": f"Choose one of: {', '.join(PHOTO_VARIANT_FORMATS)}."})
+            size = int(size)
+
+        # The digest is taken from the bytes at upload, so the ETag cannot match a different photo.
+        # Profiles stored before digests were recorded fall back to the version and always revalidate.
+        etag_parts = [profile.profile_photo_digest or f"{profile.pk}-v{profile.profile_photo_version}"]
+        if size:
+            etag_parts += [size, image_format]
+        etag = quote_etag("-".join(map(str, etag_parts)))
+        last_modified = int(profile.updated_at.timestamp())
+        requested_version = request.query_params.get("v")
+        if profile.profile_photo_digest and requested_version == provider_photo_url_version(profile):
+            cache_control = {"public": True, "max_age": PHOTO_IMMUTABLE_MAX_AGE, "immutable": True}
+        else:
+            cache_control = {"public": True, "max_age": PHOTO_REVALIDATE_MAX_AGE}
+
+        response = get_conditional_response(request, etag=etag, last_modified=last_modified)
+        if response is None and size:
+            variant_path = get_photo_variant(profile=profile, size=size, image_format=image_format)
+            if variant_path is None:
+                # Never fall back to the original here: it would be cached under this variant's ETag.
+                raise Http404("Provider photo variant not available.")
+            # Variant paths are versioned, so the storage URL serves these bytes directly from the media host.
+            response = HttpResponseRedirect(default_storage.url(variant_path))
+        if response is None:
+            # photo_store hands back the whole blob (uploads are capped at 5 MB), so there is nothing to stream.
+            stored_photo = get_provider_photo(provider_profile_id=profile.pk)
+            if not stored_photo:
+                raise Http404("Provider photo not found.")
+            response = HttpResponse(
+                stored_photo["content"],
+                content_type=stored_photo["content_type"] or "application/octet-stream",
+            )
 
-        return queryset.distinct().order_by("-rating_average", "-total_reviews")
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(last_modified)
+        patch_cache_control(response, **cache_control)
+        return response
 
 
-class ServiceViewSet(viewsets.ModelViewSet):
+class ServiceViewSet(CachedPublicListMixin, viewsets.ModelViewSet):
     serializer_class = ServiceSerializer
+    public_listing_scope = "services"
 
     def get_permissions(self):
         if self.action in {"list", "retrieve"}:
@@ -64,7 +180,6 @@ class ServiceViewSet(viewsets.ModelViewSet):
 
         service_type = self.request.query_params.get("service_type")
         city_scope = self.request.query_params.get("city_scope")
-        language = self.request.query_params.get("language")
         max_price = self.request.query_params.get("max_price")
         provider_id = self.request.query_params.get("provider")
 
@@ -72,8 +187,12 @@ class ServiceViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(service_type=service_type.upper())
         if city_scope:
             queryset = queryset.filter(city_scope=city_scope.upper())
-        if language:
-            queryset = queryset.filter(languages__icontains=language)
+        queryset = filter_by_languages(
+            queryset,
+            self.request.query_params,
+            lookup_model=ServiceLanguage,
+            owner_field="service",
+        )
         if max_price:
             queryset = queryset.filter(price_amount__lte=max_price)
         if provider_id:
@@ -121,7 +240,6 @@ class AvailabilityViewSet(viewsets.ModelViewSet):
         provider_id = self.request.query_params.get("provider")
         service_type = self.request.query_params.get("service_type")
         city_scope = self.request.query_params.get("city_scope")
-        language = self.request.query_params.get("language")
         date_from = self.request.query_params.get("date_from")
         date_to = self.request.query_params.get("date_to")
         available_only = self.request.query_params.get("available")
@@ -132,8 +250,12 @@ class AvailabilityViewSet(viewsets.ModelViewSet):
             queryset = queryset.filter(service_type=service_type.upper())
         if city_scope:
             queryset = queryset.filter(city_scope=city_scope.upper())
-        if language:
-            queryset = queryset.filter(languages__icontains=language)
+        queryset = filter_by_languages(
+            queryset,
+            self.request.query_params,
+            lookup_model=AvailabilityLanguage,
+            owner_field="slot",
+        )
         if date_from:
             queryset = queryset.filter(start_at__date__gte=date_from)
         if date_to:
@@ -156,8 +278,9 @@ class AvailabilityViewSet(viewsets.ModelViewSet):
         serializer.save(provider=provider_profile)
 
 
-class ReviewViewSet(viewsets.ModelViewSet):
+class ReviewViewSet(CachedPublicListMixin, viewsets.ModelViewSet):
     serializer_class = ReviewSerializer
+    public_listing_scope = "reviews"
 
     def get_permissions(self):
         if self.action in {"list", "retrieve"}:
@@ -0,0 +1,182 @@
+import json
+import threading
+import time
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Callable, Iterator, Optional
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from rest_framework.authentication import BaseAuthentication
+from rest_framework.exceptions import AuthenticationFailed, ValidationError
+from rest_framework.renderers import BaseRenderer
+
+from .models import Message
+
+STREAM_BATCH_SIZE = 100
+STREAM_RETRY_MS = 3000
+STREAM_TOKEN_SALT = "messaging.thread-stream"
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+class InMemoryEventLayer:
+    """Process-local wake-ups for open thread streams. Payloads are always re-read from the database."""
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._versions: dict[int, int] = {}
+
+    def version(self, thread_id: int) -> int:
+        with self._condition:
+            return self._versions.get(thread_id, 0)
+
+    def publish(self, thread_id: int) -> None:
+        with self._condition:
+            self._versions[thread_id] = self._versions.get(thread_id, 0) + 1
+            self._condition.notify_all()
+
+    def wait(self, thread_id: int, version: int, timeout: float) -> int:
+        with self._condition:
+            self._condition.wait_for(lambda: self._versions.get(thread_id, 0) != version, timeout=timeout)
+            return self._versions.get(thread_id, 0)
+
+
+event_layer = InMemoryEventLayer()
+
+
+def publish_thread_event(thread_id: int) -> None:
+    transaction.on_commit(lambda: event_layer.publish(thread_id))
+
+
+def issue_stream_token(*, thread_id: int, user) -> str:
+    return signing.dumps({"thread": thread_id, "user": user.pk}, salt=STREAM_TOKEN_SALT)
+
+
+class StreamTokenAuthentication(BaseAuthentication):
+    """Authenticate `?stream_token=` on thread streams, since EventSource cannot send an Authorization header."""
+
+    def authenticate(self, request):
+        token = request.query_params.get("stream_token")
+        if not token:
+            return None
+        try:
+            payload = signing.loads(token, salt=STREAM_TOKEN_SALT, max_age=settings.MESSAGING_STREAM_TOKEN_MAX_AGE)
+        except signing.BadSignature as exc:
+            raise AuthenticationFailed("Invalid or expired stream token.") from exc
+
+        thread_id = request.parser_context.get("kwargs", {}).get("pk")
+        if str(payload.get("thread")) != str(thread_id):
+            raise AuthenticationFailed("Stream token was issued for another thread.")
+        user = get_user_model().objects.filter(pk=payload.get("user"), is_active=True).first()
+        if user is None:
+            raise AuthenticationFailed("Invalid or expired stream token.")
+        return user, None
+
+    def authenticate_header(self, request):
+        return "Token"
+
+
+class EventStreamRenderer(BaseRenderer):
+    media_type = "text/event-stream"
+    format = "event-stream"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Successful streams bypass rendering; only error payloads get here.
+        return _format_event("error", data)
+
+
+def _format_event(event: str, data, event_id=None) -> str:
+    lines = [f"id: {event_id}"] if event_id is not None else []
+    lines.append(f"event: {event}")
+    lines.append(f"data: {json.dumps(data, cls=DjangoJSONEncoder)}")
+    return "\n".join(lines) + "\n\n"
+
+
+def latest_message_id(thread_id: int) -> int:
+    return Message.objects.filter(thread_id=thread_id).aggregate(latest=Max("id"))["latest"] or 0
+
+
+def encode_stream_event_id(last_message_id: int, receipts_since: datetime) -> str:
+    return f"{last_message_id}-{(receipts_since - _EPOCH) // _MICROSECOND}"
+
+
+def parse_stream_event_id(value: str) -> tuple[int, Optional[datetime]]:
+    """Split `<message id>-<receipt cursor>`; a bare message id resumes messages only."""
+    last_id, _, micros = value.partition("-")
+    if not last_id.isdigit() or (micros and not micros.isdigit()):
+        raise ValidationError({"last_id": "Must be an event id from this stream."})
+    receipts_since = _EPOCH + timedelta(microseconds=int(micros)) if micros else None
+    return int(last_id), receipts_since
+
+
+def stream_thread_events(
+    *,
+    thread_id: int,
+    last_message_id: int,
+    serialize: Callable[[Message], dict],
+    receipts_since: Optional[datetime] = None,
+) -> Iterator[str]:
+    """Yield SSE frames for messages after `last_message_id`, then for new messages and read receipts.
+
+    Every event id carries both cursors, so a client resuming with Last-Event-ID also gets the
+    receipts issued while it was disconnected.
+    """
+    deadline = time.monotonic() + settings.MESSAGING_STREAM_MAX_SECONDS
+    version = event_layer.version(thread_id)
+    if receipts_since is None:
+        receipts_since = timezone.now()
+    # Receipts stamped at the cursor are re-checked, since bulk mark-read shares one read_at;
+    # ids already sent at that instant are skipped.
+    sent_at_cursor: set[int] = set()
+    yield f"retry: {STREAM_RETRY_MS}\n\n"
+
+    while True:
+        messages = list(
+            Message.objects.filter(thread_id=thread_id, id__gt=last_message_id)
+            .select_related("sender")
+            .order_by("id")[:STREAM_BATCH_SIZE]
+        )
+        for message in messages:
+            last_message_id = message.id
+            yield _format_event(
+                "message",
+                serialize(message),
+                event_id=encode_stream_event_id(last_message_id, receipts_since),
+            )
+
+        receipts = Message.objects.filter(
+            thread_id=thread_id,
+            id__lte=last_message_id,
+            read_at__gte=receipts_since,
+        ).order_by("read_at", "id")
+        for message_id, read_at in receipts.values_list("id", "read_at"):
+            if read_at == receipts_since and message_id in sent_at_cursor:
+                continue
+            if read_at != receipts_since:
+                receipts_since = read_at
+                sent_at_cursor = set()
+            sent_at_cursor.add(message_id)
+            yield _format_event(
+                "read",
+                {"id": message_id, "read_at": read_at},
+                event_id=encode_stream_event_id(last_message_id, receipts_since),
+            )
+
+        if len(messages) == STREAM_BATCH_SIZE:
+            continue
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return
+        if not connection.in_atomic_block:
+            # Hand the database connection back while idle; the next poll reopens one.
+            connection.close()
+        next_version = event_layer.wait(thread_id, version, timeout=min(settings.MESSAGING_STREAM_POLL_SECONDS, remaining))
+        if next_version == version:
+            yield ": keep-alive\n\n"
+        version = next_version
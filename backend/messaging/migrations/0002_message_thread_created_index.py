@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:46
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='message',
+            index=models.Index(fields=['thread', 'created_at'], name='message_thread_created_idx'),
+        ),
+    ]
@@ -0,0 +1,49 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:50
+
+from django.db import migrations, models
+
+
+def backfill_unread_counts(apps, schema_editor):
+    BookingThread = apps.get_model("messaging", "BookingThread")
+    Message = apps.get_model("messaging", "Message")
+
+    for thread in BookingThread.objects.select_related("provider").iterator():
+        unread = Message.objects.filter(thread_id=thread.id, read_at__isnull=True)
+        thread.customer_unread_count = unread.exclude(sender_id=thread.customer_id).count()
+        thread.provider_unread_count = unread.exclude(sender_id=thread.provider.user_id).count()
+        thread.save(update_fields=["customer_unread_count", "provider_unread_count"])
+
+
+def noop_reverse(apps, schema_editor):
+    return
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('messaging', '0003_message_thread_id_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingthread',
+            name='customer_last_read_message_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bookingthread',
+            name='customer_unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bookingthread',
+            name='provider_last_read_message_id',
+            field=models.PositiveBigIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='bookingthread',
+            name='provider_unread_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(backfill_unread_counts, noop_reverse),
+    ]
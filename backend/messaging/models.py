@@ -11,6 +11,11 @@ class BookingThread(models.Model):
     customer = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name="threads_as_customer")
     provider = models.ForeignKey(ProviderProfile, on_delete=models.CASCADE, related_name="threads_as_provider")
     is_closed = models.BooleanField(default=False)
+    # Maintained by messaging.services so inbox badges never need a COUNT per thread.
+    customer_last_read_message_id = models.PositiveBigIntegerField(default=0)
+    provider_last_read_message_id = models.PositiveBigIntegerField(default=0)
+    customer_unread_count = models.PositiveIntegerField(default=0)
+    provider_unread_count = models.PositiveIntegerField(default=0)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
@@ -38,6 +43,10 @@ class Message(models.Model):
 
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            models.Index(fields=["thread", "created_at"], name="message_thread_created_idx"),
+            models.Index(fields=["thread", "id"], name="message_thread_id_idx"),
+        ]
 
     def clean(self):
         participants = {self.thread.customer_id, self.thread.provider.user_id}
@@ -1,11 +1,14 @@
 from rest_framework import serializers
 
 from .models import BookingThread, Message
+from .services import participant_side
 
 
 class BookingThreadSerializer(serializers.ModelSerializer):
     booking_reference = serializers.UUIDField(source="booking.reference", read_only=True)
     provider_name = serializers.CharField(source="provider.professional_name", read_only=True)
+    unread_count = serializers.SerializerMethodField()
+    last_read_message_id = serializers.SerializerMethodField()
 
     class Meta:
         model = BookingThread
@@ -17,6 +20,8 @@ class BookingThreadSerializer(serializers.ModelSerializer):
             "provider",
             "provider_name",
             "is_closed",
+            "unread_count",
+            "last_read_message_id",
             "created_at",
             "updated_at",
         )
@@ -30,6 +35,20 @@ class BookingThreadSerializer(serializers.ModelSerializer):
             "updated_at",
         )
 
+    def _viewer_side(self, obj):
+        request = self.context.get("request")
+        if request is None or not request.user.is_authenticated:
+            return None
+        return participant_side(obj, request.user)
+
+    def get_unread_count(self, obj):
+        side = self._viewer_side(obj)
+        return getattr(obj, f"{side}_unread_count") if side else 0
+
+    def get_last_read_message_id(self, obj):
+        side = self._viewer_side(obj)
+        return getattr(obj, f"{side}_last_read_message_id") if side else None
+
 
 class MessageSerializer(serializers.ModelSerializer):
     sender_name = serializers.CharField(source="sender.get_full_name", read_only=True)
@@ -0,0 +1,55 @@
+from typing import Optional
+
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import BookingThread, Message
+
+
+def participant_side(thread: BookingThread, user) -> Optional[str]:
+    if user.id == thread.customer_id:
+        return "customer"
+    if user.id == thread.provider.user_id:
+        return "provider"
+    return None
+
+
+def record_new_message(message: Message) -> None:
+    """Bump the unread counter of every participant other than the sender."""
+    sender_side = participant_side(message.thread, message.sender)
+    updates = {
+        f"{side}_unread_count": F(f"{side}_unread_count") + 1
+        for side in ("customer", "provider")
+        if side != sender_side
+    }
+    BookingThread.objects.filter(id=message.thread_id).update(**updates, updated_at=timezone.now())
+
+
+def mark_thread_read(*, thread: BookingThread, user, up_to_message_id: Optional[int] = None) -> int:
+    """Mark the other participant's messages up to `up_to_message_id` read in one UPDATE and refresh the counter."""
+    side = participant_side(thread, user)
+    if side is None:
+        raise ValueError("Only thread participants have read state.")
+
+    with transaction.atomic():
+        locked_thread = BookingThread.objects.select_for_update().get(id=thread.id)
+        incoming = Message.objects.filter(thread_id=thread.id).exclude(sender_id=user.id)
+        # Clamp client ids so a pointer past the newest incoming message cannot hide later ones.
+        latest_incoming_id = incoming.order_by("-id").values_list("id", flat=True).first() or 0
+        if up_to_message_id is None or up_to_message_id > latest_incoming_id:
+            up_to_message_id = latest_incoming_id
+
+        updated = incoming.filter(id__lte=up_to_message_id, read_at__isnull=True).update(read_at=timezone.now())
+        last_read_id = max(getattr(locked_thread, f"{side}_last_read_message_id"), up_to_message_id)
+        unread_count = incoming.filter(id__gt=last_read_id).count()
+        BookingThread.objects.filter(id=thread.id).update(
+            **{
+                f"{side}_last_read_message_id": last_read_id,
+                f"{side}_unread_count": unread_count,
+            }
+        )
+
+    setattr(thread, f"{side}_last_read_message_id", last_read_id)
+    setattr(thread, f"{side}_unread_count", unread_count)
+    return updated
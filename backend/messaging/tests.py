@@ -0,0 +1,156 @@
+from datetime import timedelta
+from decimal import Decimal
+
+from django.test import SimpleTestCase, override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase
+
+from accounts.models import ProviderProfile, User
+from bookings.models import Booking
+from marketplace.models import Service
+
+from .events import InMemoryEventLayer, encode_stream_event_id
+from .models import BookingThread, Message
+
+
+class ThreadFixtureMixin:
+    def setUp(self):
+        self.customer = User.objects.create_user(
+            username="chat_customer",
+            email="chat-customer@example.com",
+            password="StrongPass123!",
+            role=User.Role.CUSTOMER,
+        )
+        provider_user = User.objects.create_user(
+            username="chat_provider",
+            email="chat-provider@example.com",
+            password="StrongPass123!",
+            role=User.Role.PROVIDER,
+        )
+        self.provider_user = provider_user
+        provider = ProviderProfile.objects.create(user=provider_user, professional_name="Chat Provider")
+        service = Service.objects.create(
+            provider=provider,
+            service_type=Service.ServiceType.ZIYARAH_GUIDE,
+            title="Ziyarah",
+            description="Guided visit.",
+            city_scope=Service.CityScope.MADINAH,
+            price_amount=Decimal("80.00"),
+        )
+        booking = Booking.objects.create(
+            customer=self.customer,
+            provider=provider,
+            service=service,
+            status=Booking.Status.ACCEPTED,
+            escrow_status=Booking.EscrowStatus.HELD,
+        )
+        self.thread = BookingThread.objects.create(booking=booking, customer=self.customer, provider=provider)
+        self.messages = [
+            Message.objects.create(thread=self.thread, sender=self.customer, body=f"Message {index}")
+            for index in range(3)
+        ]
+        self.events_url = f"/api/messaging/threads/{self.thread.id}/events/"
+        self.client.force_authenticate(self.customer)
+
+
+@override_settings(MESSAGING_STREAM_MAX_SECONDS=0)
+class ThreadEventStreamTests(ThreadFixtureMixin, APITestCase):
+    def _stream(self, **extra):
+        response = self.client.get(self.events_url, HTTP_ACCEPT="text/event-stream", **extra)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response["Content-Type"], "text/event-stream")
+        return b"".join(response.streaming_content).decode()
+
+    def test_stream_resumes_after_last_event_id(self):
+        body = self._stream(HTTP_LAST_EVENT_ID=str(self.messages[0].id))
+
+        self.assertNotIn(f"id: {self.messages[0].id}-", body)
+        self.assertIn(f"id: {self.messages[1].id}-", body)
+        self.assertIn(f"id: {self.messages[2].id}-", body)
+        self.assertEqual(body.count("event: message\n"), 2)
+        self.assertIn('"body": "Message 2"', body)
+
+    def test_resume_replays_read_receipts_missed_while_disconnected(self):
+        read_at = timezone.now()
+        Message.objects.filter(id=self.messages[1].id).update(read_at=read_at)
+
+        body = self._stream(HTTP_LAST_EVENT_ID=encode_stream_event_id(self.messages[2].id, read_at - timedelta(seconds=1)))
+
+        self.assertNotIn("event: message", body)
+        self.assertIn(f'event: read\ndata: {{"id": {self.messages[1].id}', body)
+        self.assertEqual(self._stream(HTTP_LAST_EVENT_ID=str(self.messages[2].id)).count("event: read"), 0)
+
+    def test_stream_token_authenticates_event_source_clients(self):
+        token = self.client.post(f"/api/messaging/threads/{self.thread.id}/stream_token/").data["stream_token"]
+        self.client.force_authenticate(None)
+
+        response = self.client.get(self.events_url, {"stream_token": token}, HTTP_ACCEPT="text/event-stream")
+        rejected = self.client.get(self.events_url, {"stream_token": token + "x"}, HTTP_ACCEPT="text/event-stream")
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(rejected.status_code, 401)
+        self.assertEqual(self.client.get(f"/api/messaging/threads/{self.thread.id}/", {"stream_token": token}).status_code, 401)
+
+    def test_new_connection_only_streams_new_messages(self):
+        self.assertNotIn("event: message", self._stream())
+
+    def test_stream_is_limited_to_participants(self):
+        outsider = User.objects.create_user(username="outsider", email="outsider@example.com", password="StrongPass123!")
+        self.client.force_authenticate(outsider)
+
+        response = self.client.get(self.events_url, HTTP_ACCEPT="text/event-stream")
+
+        self.assertEqual(response.status_code, 404)
+
+
+class ThreadMarkReadTests(ThreadFixtureMixin, APITestCase):
+    def _reply(self, count):
+        self.client.force_authenticate(self.provider_user)
+        sent_ids = [
+            self.client.post("/api/messaging/messages/", {"thread": self.thread.id, "body": f"Reply {index}"}).data["id"]
+            for index in range(count)
+        ]
+        self.client.force_authenticate(self.customer)
+        return sent_ids
+
+    def test_mark_thread_read_updates_unread_counter(self):
+        sent_ids = self._reply(3)
+        self.assertEqual(self.client.get(f"/api/messaging/threads/{self.thread.id}/").data["unread_count"], 3)
+
+        response = self.client.post(
+            f"/api/messaging/threads/{self.thread.id}/mark_read/",
+            {"up_to_message_id": sent_ids[1]},
+        )
+
+        self.assertEqual(response.data["updated"], 2)
+        self.assertEqual(response.data["thread"]["unread_count"], 1)
+        self.assertEqual(response.data["thread"]["last_read_message_id"], sent_ids[1])
+        self.assertEqual(Message.objects.filter(id__in=sent_ids, read_at__isnull=True).count(), 1)
+        self.client.force_authenticate(self.provider_user)
+        self.assertEqual(self.client.get(f"/api/messaging/threads/{self.thread.id}/").data["unread_count"], 0)
+
+    def test_mark_read_clamps_ids_beyond_the_newest_incoming_message(self):
+        sent_ids = self._reply(1)
+
+        response = self.client.post(
+            f"/api/messaging/threads/{self.thread.id}/mark_read/",
+            {"up_to_message_id": sent_ids[0] + 1000},
+        )
+        later_id = self._reply(1)[0]
+
+        self.assertEqual(response.data["updated"], 1)
+        self.assertEqual(response.data["thread"]["last_read_message_id"], sent_ids[0])
+        self.thread.refresh_from_db()
+        self.assertEqual(self.thread.customer_last_read_message_id, sent_ids[0])
+        self.assertEqual(self.client.get(f"/api/messaging/threads/{self.thread.id}/").data["unread_count"], 1)
+        self.assertFalse(Message.objects.get(id=later_id).read_at)
+
+
+class InMemoryEventLayerTests(SimpleTestCase):
+    def test_wait_returns_once_thread_is_published(self):
+        layer = InMemoryEventLayer()
+        version = layer.version(7)
+
+        self.assertEqual(layer.wait(7, version, timeout=0), version)
+        layer.publish(7)
+        self.assertEqual(layer.wait(7, version, timeout=0), version + 1)
@@ -1,16 +1,33 @@
+from django.conf import settings
+from django.db import transaction
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.exceptions import PermissionDenied, ValidationError
 from rest_framework.permissions import IsAuthenticated
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
+from rest_framework.settings import api_settings
 
 from accounts.models import User
 from notifications.services import notify_booking_participants
-
+from umrah_link.pagination import OldestFirstCursorPagination
+from umrah_link.sync import build_sync_payload, wants_sync
+
+from .events import (
+    EventStreamRenderer,
+    StreamTokenAuthentication,
+    issue_stream_token,
+    latest_message_id,
+    parse_stream_event_id,
+    publish_thread_event,
+    stream_thread_events,
+)
 from .models import BookingThread, Message
 from .permissions import IsThreadParticipantOrAdmin
 from .serializers import BookingThreadSerializer, MessageSerializer
+from .services import mark_thread_read, participant_side, record_new_message
 
 
 class BookingThreadViewSet(viewsets.ModelViewSet):
@@ -57,12 +74,70 @@ class BookingThreadViewSet(viewsets.ModelViewSet):
             raise PermissionDenied(permission.message)
         return super().update(request, *args, **kwargs)
 
+    @action(detail=True, methods=["post"])
+    def mark_read(self, request, pk=None):
+        thread = self.get_object()
+        if participant_side(thread, request.user) is None:
+            raise PermissionDenied("Only booking participants can mark messages as read.")
+
+        up_to_message_id = request.data.get("up_to_message_id")
+        if up_to_message_id is not None:
+            try:
+                up_to_message_id = int(up_to_message_id)
+            except (TypeError, ValueError) as exc:
+                raise ValidationError({"up_to_message_id": "Must be a message id."}) from exc
+
+        updated = mark_thread_read(thread=thread, user=request.user, up_to_message_id=up_to_message_id)
+        if updated:
+            publish_thread_event(thread.id)
+        return Response({"updated": updated, "thread": self.get_serializer(thread).data})
+
+    @action(detail=True, methods=["post"])
+    def stream_token(self, request, pk=None):
+        thread = self.get_object()
+        return Response(
+            {
+                "stream_token": issue_stream_token(thread_id=thread.id, user=request.user),
+                "expires_in": settings.MESSAGING_STREAM_TOKEN_MAX_AGE,
+            }
+        )
+
+    @action(
+        detail=True,
+        methods=["get"],
+        renderer_classes=[EventStreamRenderer, JSONRenderer],
+        authentication_classes=[StreamTokenAuthentication, *api_settings.DEFAULT_AUTHENTICATION_CLASSES],
+    )
+    def events(self, request, pk=None):
+        thread = self.get_object()
+        last_event_id = request.headers.get("Last-Event-ID") or request.query_params.get("last_id")
+        receipts_since = None
+        if last_event_id is None:
+            last_message_id = latest_message_id(thread.id)
+        else:
+            last_message_id, receipts_since = parse_stream_event_id(last_event_id)
+
+        serializer_context = self.get_serializer_context()
+        response = StreamingHttpResponse(
+            stream_thread_events(
+                thread_id=thread.id,
+                last_message_id=last_message_id,
+                receipts_since=receipts_since,
+                serialize=lambda message: MessageSerializer(message, context=serializer_context).data,
+            ),
+            content_type="text/event-stream",
+        )
+        response["Cache-Control"] = "no-cache"
+        response["X-Accel-Buffering"] = "no"
+        return response
+
     def partial_update(self, request, *args, **kwargs):
         return self.update(request, *args, **kwargs)
 
 
 class MessageViewSet(viewsets.ModelViewSet):
     serializer_class = MessageSerializer
+    pagination_class = OldestFirstCursorPagination
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -82,6 +157,17 @@ class MessageViewSet(viewsets.ModelViewSet):
 
         return filtered
 
+    def list(self, request, *args, **kwargs):
+        if wants_sync(request.query_params):
+            return Response(
+                build_sync_payload(
+                    self.filter_queryset(self.get_queryset()),
+                    request.query_params,
+                    serialize=lambda items: self.get_serializer(items, many=True).data,
+                )
+            )
+        return super().list(request, *args, **kwargs)
+
     def perform_create(self, serializer):
         thread = serializer.validated_data["thread"]
         user = self.request.user
@@ -96,7 +182,10 @@ class MessageViewSet(viewsets.ModelViewSet):
         if not thread.booking.can_open_chat():
             raise ValidationError("Messaging unlocks only after payment.")
 
-        message = serializer.save(sender=user)
+        with transaction.atomic():
+            message = serializer.save(sender=user)
+            record_new_message(message)
+        publish_thread_event(thread.id)
         notify_booking_participants(
             booking=thread.booking,
             title="New message",
@@ -113,7 +202,12 @@ class MessageViewSet(viewsets.ModelViewSet):
             raise PermissionDenied(permission.message)
 
         if message.sender_id != request.user.id and message.read_at is None:
-            message.read_at = timezone.now()
-            message.save(update_fields=["read_at"])
+            if participant_side(message.thread, request.user) is None:
+                message.read_at = timezone.now()
+                message.save(update_fields=["read_at"])
+            else:
+                mark_thread_read(thread=message.thread, user=request.user, up_to_message_id=message.id)
+                message.refresh_from_db(fields=["read_at"])
+            publish_thread_event(message.thread_id)
 
         return Response(self.get_serializer(message).data)
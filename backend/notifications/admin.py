@@ -12,6 +12,6 @@ class NotificationAdmin(admin.ModelAdmin):
 
 @admin.register(NotificationDelivery)
 class NotificationDeliveryAdmin(admin.ModelAdmin):
-    list_display = ("id", "notification", "channel", "destination", "status", "created_at")
+    list_display = ("id", "notification", "channel", "destination", "status", "attempts", "next_attempt_at", "created_at")
     list_filter = ("channel", "status")
     search_fields = ("destination", "notification__title")
@@ -0,0 +1,142 @@
+from __future__ import annotations
+
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+from typing import Iterable, Optional
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .models import NotificationDelivery
+
+DELIVERY_BATCH_SIZE = 100
+DELIVERY_WORKERS = 4
+MAX_DELIVERY_ATTEMPTS = 5
+RETRY_BASE_DELAY = timedelta(minutes=1)
+CLAIM_LEASE = timedelta(minutes=5)
+
+
+def claim_pending_deliveries(
+    *,
+    batch_size: int = DELIVERY_BATCH_SIZE,
+    delivery_ids: Optional[Iterable[int]] = None,
+    now=None,
+) -> list[NotificationDelivery]:
+    now = now or timezone.now()
+    with transaction.atomic():
+        queryset = NotificationDelivery.objects.filter(
+            status=NotificationDelivery.Status.PENDING,
+            next_attempt_at__lte=now,
+        )
+        if delivery_ids is not None:
+            queryset = queryset.filter(id__in=list(delivery_ids))
+        claimed_ids = list(
+            queryset.select_for_update(skip_locked=True).order_by("next_attempt_at", "id").values_list("id", flat=True)[
+                :batch_size
+            ]
+        )
+        if not claimed_ids:
+            return []
+        # Lease the rows so other workers skip them while this one talks to the mail server.
+        NotificationDelivery.objects.filter(id__in=claimed_ids).update(
+            attempts=F("attempts") + 1,
+            next_attempt_at=now + CLAIM_LEASE,
+        )
+
+    return list(NotificationDelivery.objects.filter(id__in=claimed_ids).select_related("notification").order_by("id"))
+
+
+def _send_email_batch(deliveries: list[NotificationDelivery]) -> dict[int, tuple[bool, dict]]:
+    results = {}
+    from_email = getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@umrahlink.com")
+    connection = get_connection(fail_silently=False)
+    try:
+        connection.open()
+    except Exception as exc:
+        return {delivery.id: (False, {"error": str(exc)}) for delivery in deliveries}
+
+    try:
+        for delivery in deliveries:
+            message = EmailMessage(
+                subject=delivery.notification.title,
+                body=delivery.notification.body,
+                from_email=from_email,
+                to=[delivery.destination],
+                connection=connection,
+            )
+            try:
+                message.send()
+                results[delivery.id] = (True, {"provider": "django-email-backend", "simulated": False})
+            except Exception as exc:
+                results[delivery.id] = (False, {"error": str(exc)})
+    finally:
+        try:
+            connection.close()
+        except Exception:  # pragma: no cover
+            pass
+    return results
+
+
+def _send_sms(delivery: NotificationDelivery) -> tuple[bool, dict]:
+    return True, {
+        "provider": "sms-simulated",
+        "simulated": True,
+        "message": f"SMS placeholder: {delivery.notification.title}",
+    }
+
+
+def _record_results(deliveries: list[NotificationDelivery], results: dict[int, tuple[bool, dict]], now) -> dict[str, int]:
+    summary = {"sent": 0, "failed": 0, "retrying": 0}
+    for delivery in deliveries:
+        delivered, payload = results[delivery.id]
+        delivery.updated_at = now
+        if delivered:
+            delivery.status = NotificationDelivery.Status.SENT
+            delivery.response_payload = payload
+            summary["sent"] += 1
+        elif delivery.attempts >= MAX_DELIVERY_ATTEMPTS:
+            delivery.status = NotificationDelivery.Status.FAILED
+            delivery.response_payload = {**payload, "attempts": delivery.attempts}
+            summary["failed"] += 1
+        else:
+            delivery.next_attempt_at = now + RETRY_BASE_DELAY * (2 ** (delivery.attempts - 1))
+            delivery.response_payload = {**payload, "attempts": delivery.attempts}
+            summary["retrying"] += 1
+
+    NotificationDelivery.objects.bulk_update(
+        deliveries,
+        ["status", "response_payload", "next_attempt_at", "updated_at"],
+    )
+    return summary
+
+
+def deliver_pending_notifications(
+    *,
+    batch_size: int = DELIVERY_BATCH_SIZE,
+    workers: int = DELIVERY_WORKERS,
+    delivery_ids: Optional[Iterable[int]] = None,
+) -> dict[str, int]:
+    """Send one claimed batch of PENDING deliveries and record the outcome of each."""
+    deliveries = claim_pending_deliveries(batch_size=batch_size, delivery_ids=delivery_ids)
+    if not deliveries:
+        return {"sent": 0, "failed": 0, "retrying": 0}
+
+    results = {
+        delivery.id: _send_sms(delivery)
+        for delivery in deliveries
+        if delivery.channel == NotificationDelivery.Channel.SMS
+    }
+    emails = [delivery for delivery in deliveries if delivery.channel == NotificationDelivery.Channel.EMAIL]
+    # Each worker thread holds one mail connection for its share of the batch; only the main thread touches the DB.
+    chunks = [chunk for chunk in (emails[index::max(1, workers)] for index in range(max(1, workers))) if chunk]
+    if len(chunks) == 1:
+        results.update(_send_email_batch(chunks[0]))
+    elif chunks:
+        with ThreadPoolExecutor(max_workers=len(chunks)) as executor:
+            for chunk_results in executor.map(_send_email_batch, chunks):
+                results.update(chunk_results)
+
+    return _record_results(deliveries, results, timezone.now())
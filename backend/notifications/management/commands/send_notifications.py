@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from notifications.delivery import DELIVERY_BATCH_SIZE, DELIVERY_WORKERS, deliver_pending_notifications
+
+
+class Command(BaseCommand):
+    help = "Send PENDING email/SMS notification deliveries, retrying failures with backoff."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=DELIVERY_BATCH_SIZE)
+        parser.add_argument("--workers", type=int, default=DELIVERY_WORKERS, help="Concurrent mail connections.")
+        parser.add_argument(
+            "--interval",
+            type=int,
+            default=0,
+            help="Keep running and poll the outbox every N seconds. Drains once when omitted.",
+        )
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        workers = max(1, options["workers"])
+        interval = max(0, options["interval"])
+
+        while True:
+            totals = {"sent": 0, "failed": 0, "retrying": 0}
+            while True:
+                summary = deliver_pending_notifications(batch_size=batch_size, workers=workers)
+                for key, value in summary.items():
+                    totals[key] += value
+                if sum(summary.values()) < batch_size:
+                    break
+            self.stdout.write(
+                f"Sent {totals['sent']}, retrying {totals['retrying']}, failed {totals['failed']} delivery(ies)."
+            )
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:52
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_unread_counters(apps, schema_editor):
+    Notification = apps.get_model("notifications", "Notification")
+    NotificationCounter = apps.get_model("notifications", "NotificationCounter")
+    unread = (
+        Notification.objects.filter(is_read=False)
+        .values("user_id")
+        .annotate(unread_count=models.Count("id"))
+        .order_by()
+    )
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=row["user_id"], unread_count=row["unread_count"]) for row in unread],
+        batch_size=500,
+    )
+
+
+def noop_reverse(apps, schema_editor):
+    return
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('notifications', '0004_notification_user_id_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread_count', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.RunPython(backfill_unread_counters, noop_reverse),
+    ]
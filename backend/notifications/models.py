@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.utils import timezone
 
 
 class Notification(models.Model):
@@ -31,11 +32,29 @@ class Notification(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["user", "-created_at"], name="notification_user_recent_idx"),
+            models.Index(fields=["user", "id"], name="notification_user_id_idx"),
+        ]
 
     def __str__(self):
         return f"Notification<{self.user_id}:{self.title}>"
 
 
+class NotificationCounter(models.Model):
+    # Kept in step by notifications.services so the unread badge is a primary-key read.
+    user = models.OneToOneField(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="notification_counter",
+    )
+    unread_count = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"NotificationCounter<{self.user_id}:{self.unread_count}>"
+
+
 class NotificationDelivery(models.Model):
     class Channel(models.TextChoices):
         EMAIL = "EMAIL", "Email"
@@ -52,11 +71,16 @@ class NotificationDelivery(models.Model):
     status = models.CharField(max_length=12, choices=Status.choices, default=Status.PENDING)
     provider_reference = models.CharField(max_length=120, blank=True)
     response_payload = models.JSONField(default=dict, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["status", "next_attempt_at"], name="notif_delivery_outbox_idx"),
+        ]
 
     def __str__(self):
         return f"NotificationDelivery<{self.notification_id}:{self.channel}:{self.status}>"
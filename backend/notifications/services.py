@@ -1,11 +1,17 @@
 from __future__ import annotations
 
+from collections import Counter, defaultdict
+
 from django.conf import settings
-from django.core.mail import send_mail
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+from django.db.models.functions import Greatest
+from django.utils import timezone
 
 from bookings.models import Booking
 
-from .models import Notification, NotificationDelivery
+from .delivery import deliver_pending_notifications
+from .models import Notification, NotificationCounter, NotificationDelivery
 
 
 def _map_event_type(event_type: str) -> str:
@@ -15,52 +21,121 @@ def _map_event_type(event_type: str) -> str:
     return Notification.EventType.SYSTEM
 
 
-def notify_user(*, user, title: str, body: str = "", event_type: str = Notification.EventType.SYSTEM, actor=None, metadata=None):
-    notification = Notification.objects.create(
-        user=user,
-        actor=actor,
-        event_type=_map_event_type(event_type),
-        title=title,
-        body=body,
-        metadata=metadata or {},
-    )
+def schedule_deliveries(deliveries) -> None:
+    """Deliveries are drained by the send_notifications worker unless eager delivery is enabled."""
+    if not deliveries or not getattr(settings, "NOTIFICATION_DELIVERY_EAGER", False):
+        return
+    delivery_ids = [delivery.id for delivery in deliveries]
+    transaction.on_commit(lambda: deliver_pending_notifications(delivery_ids=delivery_ids))
 
-    if user.email:
-        delivery = NotificationDelivery.objects.create(
-            notification=notification,
-            channel=NotificationDelivery.Channel.EMAIL,
-            destination=user.email,
-            status=NotificationDelivery.Status.PENDING,
+
+def _increment_unread_counts(user_ids) -> None:
+    increments = Counter(user_ids)
+    NotificationCounter.objects.bulk_create(
+        [NotificationCounter(user_id=user_id) for user_id in increments],
+        ignore_conflicts=True,
+    )
+    users_by_increment = defaultdict(list)
+    for user_id, increment in increments.items():
+        users_by_increment[increment].append(user_id)
+    NotificationCounter.objects.filter(user_id__in=increments).update(
+        unread_count=F("unread_count")
+        + Case(
+            *[When(user_id__in=user_ids, then=Value(increment)) for increment, user_ids in users_by_increment.items()],
+            default=Value(0),
         )
-        try:
-            send_mail(
-                subject=title,
-                message=body,
-                from_email=getattr(settings, "DEFAULT_FROM_EMAIL", "no-reply@umrahlink.com"),
-                recipient_list=[user.email],
-                fail_silently=True,
+    )
+
+
+def get_unread_count(user) -> int:
+    unread_count = NotificationCounter.objects.filter(user_id=user.id).values_list("unread_count", flat=True).first()
+    if unread_count is None:
+        unread_count = Notification.objects.filter(user_id=user.id, is_read=False).count()
+        NotificationCounter.objects.get_or_create(user_id=user.id, defaults={"unread_count": unread_count})
+    return unread_count
+
+
+def mark_notifications_read(*, user, notification_ids=None) -> int:
+    queryset = Notification.objects.filter(user_id=user.id, is_read=False)
+    if notification_ids is not None:
+        queryset = queryset.filter(id__in=list(notification_ids))
+    with transaction.atomic():
+        updated = queryset.update(is_read=True, read_at=timezone.now())
+        if updated:
+            NotificationCounter.objects.filter(user_id=user.id).update(
+                unread_count=Greatest(F("unread_count") - updated, 0)
             )
-            delivery.status = NotificationDelivery.Status.SENT
-            delivery.response_payload = {"provider": "django-send-mail", "simulated": False}
-        except Exception as exc:  # pragma: no cover
-            delivery.status = NotificationDelivery.Status.FAILED
-            delivery.response_payload = {"error": str(exc)}
-        delivery.save(update_fields=["status", "response_payload", "updated_at"])
-
-    if user.phone_number:
-        NotificationDelivery.objects.create(
-            notification=notification,
-            channel=NotificationDelivery.Channel.SMS,
-            destination=user.phone_number,
-            status=NotificationDelivery.Status.SENT,
-            response_payload={
-                "provider": "sms-simulated",
-                "simulated": True,
-                "message": f"SMS placeholder: {title}",
-            },
+    return updated
+
+
+def notify_many(
+    *,
+    users,
+    title: str,
+    body: str = "",
+    event_type: str = Notification.EventType.SYSTEM,
+    actor=None,
+    metadata=None,
+) -> list[Notification]:
+    """Fan one notification out to many users with a single insert per table."""
+    recipients = list(users)
+    if not recipients:
+        return []
+
+    mapped_event_type = _map_event_type(event_type)
+    # Counters must move with the rows they count, so a failure part-way leaves neither behind.
+    with transaction.atomic():
+        notifications = Notification.objects.bulk_create(
+            [
+                Notification(
+                    user=user,
+                    actor=actor,
+                    event_type=mapped_event_type,
+                    title=title,
+                    body=body,
+                    metadata=metadata or {},
+                )
+                for user in recipients
+            ]
         )
 
-    return notification
+        _increment_unread_counts(user.id for user in recipients)
+
+        deliveries = []
+        for user, notification in zip(recipients, notifications):
+            if user.email:
+                deliveries.append(
+                    NotificationDelivery(
+                        notification=notification,
+                        channel=NotificationDelivery.Channel.EMAIL,
+                        destination=user.email,
+                        status=NotificationDelivery.Status.PENDING,
+                    )
+                )
+            if user.phone_number:
+                deliveries.append(
+                    NotificationDelivery(
+                        notification=notification,
+                        channel=NotificationDelivery.Channel.SMS,
+                        destination=user.phone_number,
+                        status=NotificationDelivery.Status.PENDING,
+                    )
+                )
+        if deliveries:
+            schedule_deliveries(NotificationDelivery.objects.bulk_create(deliveries))
+
+    return notifications
+
+
+def notify_user(*, user, title: str, body: str = "", event_type: str = Notification.EventType.SYSTEM, actor=None, metadata=None):
+    return notify_many(
+        users=[user],
+        title=title,
+        body=body,
+        event_type=event_type,
+        actor=actor,
+        metadata=metadata,
+    )[0]
 
 
 def notify_booking_participants(*, booking: Booking, title: str, body: str, actor=None, metadata=None):
@@ -72,14 +147,11 @@ def notify_booking_participants(*, booking: Booking, title: str, body: str, acto
         event_type = Notification.EventType.MESSAGE
 
     targets = [booking.customer, booking.provider.user]
-    for user in targets:
-        if actor and user.id == actor.id:
-            continue
-        notify_user(
-            user=user,
-            title=title,
-            body=body,
-            event_type=event_type,
-            actor=actor,
-            metadata=metadata or {"booking_id": booking.id, "booking_reference": str(booking.reference)},
-        )
+    notify_many(
+        users=[user for user in targets if not (actor and user.id == actor.id)],
+        title=title,
+        body=body,
+        event_type=event_type,
+        actor=actor,
+        metadata=metadata or {"booking_id": booking.id, "booking_reference": str(booking.reference)},
+    )
@@ -0,0 +1,196 @@
+from datetime import timedelta
+from smtplib import SMTPException
+from unittest import mock
+
+from django.core import mail
+from django.core.mail.backends.base import BaseEmailBackend
+from django.db import DatabaseError
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from accounts.models import User
+
+from .delivery import MAX_DELIVERY_ATTEMPTS, deliver_pending_notifications
+from .models import Notification, NotificationDelivery
+from .services import get_unread_count, notify_many, notify_user
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    def send_messages(self, email_messages):
+        raise SMTPException("Mail server unavailable.")
+
+
+@override_settings(EMAIL_BACKEND="django.core.mail.backends.locmem.EmailBackend")
+class NotificationOutboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="customer_user",
+            email="customer@example.com",
+            password="StrongPass123!",
+            phone_number="+966500000000",
+        )
+
+    def test_notify_user_only_queues_deliveries(self):
+        notify_user(user=self.user, title="Booking created", body="Your booking was created.")
+
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(
+            set(NotificationDelivery.objects.values_list("channel", "status")),
+            {
+                (NotificationDelivery.Channel.EMAIL, NotificationDelivery.Status.PENDING),
+                (NotificationDelivery.Channel.SMS, NotificationDelivery.Status.PENDING),
+            },
+        )
+
+    def test_worker_sends_pending_deliveries(self):
+        notify_user(user=self.user, title="Booking created", body="Your booking was created.")
+
+        summary = deliver_pending_notifications()
+
+        self.assertEqual(summary, {"sent": 2, "failed": 0, "retrying": 0})
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ["customer@example.com"])
+        self.assertFalse(NotificationDelivery.objects.exclude(status=NotificationDelivery.Status.SENT).exists())
+
+    def test_failed_email_is_retried_then_marked_failed(self):
+        self.user.phone_number = ""
+        self.user.save(update_fields=["phone_number"])
+        notify_user(user=self.user, title="Booking created")
+        delivery = NotificationDelivery.objects.get()
+
+        with override_settings(EMAIL_BACKEND="notifications.tests.FailingEmailBackend"):
+            for _ in range(MAX_DELIVERY_ATTEMPTS):
+                NotificationDelivery.objects.filter(id=delivery.id).update(next_attempt_at=delivery.created_at)
+                deliver_pending_notifications()
+
+        delivery.refresh_from_db()
+        self.assertEqual(delivery.status, NotificationDelivery.Status.FAILED)
+        self.assertEqual(delivery.attempts, MAX_DELIVERY_ATTEMPTS)
+
+    def test_notify_many_uses_constant_queries(self):
+        admins = [
+            User.objects.create_user(
+                username=f"admin_{index}",
+                email=f"admin-{index}@example.com",
+                password="StrongPass123!",
+                role=User.Role.ADMIN,
+            )
+            for index in range(5)
+        ]
+
+        # Recipients, then one savepoint wrapping the notification, counter and delivery inserts.
+        with self.assertNumQueries(7):
+            notifications = notify_many(users=User.objects.filter(role=User.Role.ADMIN), title="Someone registered")
+
+        self.assertEqual({notification.user_id for notification in notifications}, {admin.id for admin in admins})
+        self.assertEqual(NotificationDelivery.objects.count(), len(admins))
+
+
+class NotificationSyncTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="sync_user",
+            email="sync@example.com",
+            password="StrongPass123!",
+        )
+        self.client.force_login(self.user)
+        lag = mock.patch("umrah_link.sync.SYNC_COMMIT_LAG", timedelta(0))
+        lag.start()
+        self.addCleanup(lag.stop)
+
+    def test_sync_token_returns_only_new_items_and_read_changes(self):
+        first, second = notify_many(users=[self.user, self.user], title="Booking update")
+        initial = self.client.get("/api/notifications/", {"after_id": 0}).json()
+        self.assertEqual([item["id"] for item in initial["results"]], [first.id, second.id])
+
+        self.client.post(f"/api/notifications/{first.id}/mark_read/")
+        third = notify_user(user=self.user, title="New message")
+        delta = self.client.get("/api/notifications/", {"sync_token": initial["sync_token"]}).json()
+
+        self.assertEqual([item["id"] for item in delta["results"]], [third.id])
+        self.assertEqual([item["id"] for item in delta["read_updates"]], [first.id])
+        self.assertFalse(delta["has_more"])
+
+    def test_read_updates_are_capped_and_resume_from_the_token(self):
+        notifications = notify_many(users=[self.user] * 3, title="Booking update")
+        initial = self.client.get("/api/notifications/", {"after_id": 0}).json()
+        self.client.post("/api/notifications/mark_all_read/")
+
+        with mock.patch("umrah_link.sync.SYNC_BATCH_SIZE", 2):
+            first = self.client.get("/api/notifications/", {"sync_token": initial["sync_token"]}).json()
+            second = self.client.get("/api/notifications/", {"sync_token": first["sync_token"]}).json()
+
+        self.assertTrue(first["has_more"])
+        self.assertFalse(second["has_more"])
+        self.assertEqual(
+            [item["id"] for item in first["read_updates"] + second["read_updates"]],
+            [notification.id for notification in notifications],
+        )
+
+    def test_rows_newer_than_the_commit_lag_wait_for_the_next_sync(self):
+        first, second = notify_many(users=[self.user, self.user], title="Booking update")
+        Notification.objects.filter(id=first.id).update(created_at=timezone.now() - timedelta(minutes=5))
+
+        with mock.patch("umrah_link.sync.SYNC_COMMIT_LAG", timedelta(minutes=1)):
+            initial = self.client.get("/api/notifications/", {"after_id": 0}).json()
+            self.client.post(f"/api/notifications/{first.id}/mark_read/")
+            held = self.client.get("/api/notifications/", {"sync_token": initial["sync_token"]}).json()
+        # Once the lag has passed, the held back row and read change both arrive.
+        released = self.client.get("/api/notifications/", {"sync_token": held["sync_token"]}).json()
+
+        self.assertEqual([item["id"] for item in initial["results"]], [first.id])
+        self.assertFalse(initial["has_more"])
+        self.assertEqual((held["results"], held["read_updates"]), ([], []))
+        self.assertEqual([item["id"] for item in released["results"]], [second.id])
+        self.assertEqual([item["id"] for item in released["read_updates"]], [first.id])
+
+    def test_invalid_sync_token_is_rejected(self):
+        response = self.client.get("/api/notifications/", {"sync_token": "not-a-token"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_since_requires_after_id(self):
+        response = self.client.get("/api/notifications/", {"since": "2026-01-01T00:00:00Z"})
+
+        self.assertEqual(response.status_code, 400)
+
+
+class NotificationUnreadCountTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username="badge_user",
+            email="badge@example.com",
+            password="StrongPass123!",
+        )
+        self.client.force_login(self.user)
+
+    def _unread_count(self):
+        return self.client.get("/api/notifications/unread_count/").json()["unread_count"]
+
+    def test_counter_follows_notify_and_mark_read(self):
+        first, _second, _third = notify_many(users=[self.user] * 3, title="Booking update")
+        self.assertEqual(self._unread_count(), 3)
+
+        self.client.post(f"/api/notifications/{first.id}/mark_read/")
+        self.client.post(f"/api/notifications/{first.id}/mark_read/")
+        self.assertEqual(self._unread_count(), 2)
+
+        self.client.post("/api/notifications/mark_all_read/")
+        self.assertEqual(self._unread_count(), 0)
+
+    def test_unread_count_is_a_single_lookup(self):
+        notify_user(user=self.user, title="Booking update")
+        self._unread_count()
+
+        with self.assertNumQueries(1):
+            get_unread_count(self.user)
+
+    def test_failed_fan_out_leaves_no_rows_or_counter_changes(self):
+        notify_user(user=self.user, title="Booking update")
+
+        with mock.patch.object(NotificationDelivery.objects, "bulk_create", side_effect=DatabaseError("boom")):
+            with self.assertRaises(DatabaseError):
+                notify_many(users=[self.user] * 2, title="Booking update")
+
+        self.assertEqual(Notification.objects.filter(user=self.user).count(), 1)
+        self.assertEqual(get_unread_count(self.user), 1)
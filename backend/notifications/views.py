@@ -1,15 +1,19 @@
-from django.utils import timezone
 from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 
+from umrah_link.pagination import CreatedAtCursorPagination
+from umrah_link.sync import build_sync_payload, wants_sync
+
 from .models import Notification
 from .serializers import NotificationSerializer
+from .services import get_unread_count, mark_notifications_read
 
 
 class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
     serializer_class = NotificationSerializer
+    pagination_class = CreatedAtCursorPagination
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -19,17 +23,29 @@ class NotificationViewSet(viewsets.ReadOnlyModelViewSet):
             queryset = queryset.filter(is_read=False)
         return queryset
 
+    def list(self, request, *args, **kwargs):
+        if wants_sync(request.query_params):
+            return Response(
+                build_sync_payload(
+                    self.filter_queryset(self.get_queryset()),
+                    request.query_params,
+                    serialize=lambda items: self.get_serializer(items, many=True).data,
+                )
+            )
+        return super().list(request, *args, **kwargs)
+
+    @action(detail=False, methods=["get"])
+    def unread_count(self, request):
+        return Response({"unread_count": get_unread_count(request.user)})
+
     @action(detail=True, methods=["post"])
     def mark_read(self, request, pk=None):
         notification = self.get_object()
-        notification.is_read = True
-        notification.read_at = timezone.now()
-        notification.save(update_fields=["is_read", "read_at"])
+        if mark_notifications_read(user=request.user, notification_ids=[notification.id]):
+            notification.refresh_from_db(fields=["is_read", "read_at"])
         return Response(self.get_serializer(notification).data)
 
     @action(detail=False, methods=["post"])
     def mark_all_read(self, request):
-        queryset = self.get_queryset().filter(is_read=False)
-        now = timezone.now()
-        updated = queryset.update(is_read=True, read_at=now)
+        updated = mark_notifications_read(user=request.user)
         return Response({"detail": "Notifications marked as read.", "updated": updated}, status=status.HTTP_200_OK)
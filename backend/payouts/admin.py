@@ -1,6 +1,7 @@
 from django.contrib import admin
 
-from .models import PayoutLedger, ProviderPayoutProfile
+from .models import PayoutLedger, ProviderEarningsSummary, ProviderPayoutProfile
+from .services import refresh_earnings_summaries
 
 
 @admin.register(ProviderPayoutProfile)
@@ -15,3 +16,17 @@ class PayoutLedgerAdmin(admin.ModelAdmin):
     list_display = ("id", "booking", "provider", "status", "net_amount", "payout_method", "updated_at")
     list_filter = ("status", "payout_method")
     search_fields = ("booking__reference", "provider__professional_name", "provider__user__username")
+
+    def save_model(self, request, obj, form, change):
+        super().save_model(request, obj, form, change)
+        refresh_earnings_summaries([obj.provider_id])
+
+    def delete_model(self, request, obj):
+        super().delete_model(request, obj)
+        refresh_earnings_summaries([obj.provider_id])
+
+
+@admin.register(ProviderEarningsSummary)
+class ProviderEarningsSummaryAdmin(admin.ModelAdmin):
+    list_display = ("provider", "pending_amount", "approved_amount", "paid_amount", "failed_amount", "last_payout_at")
+    search_fields = ("provider__professional_name",)
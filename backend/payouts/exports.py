@@ -0,0 +1,189 @@
+import csv
+import json
+from datetime import datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from typing import Any, Iterable, Iterator, Optional
+
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+from rest_framework.renderers import BaseRenderer
+
+from .models import PayoutLedger
+
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_FORMATS = ("csv", "ndjson")
+EXPORT_VALUE_FIELDS = (
+    "id",
+    "booking_id",
+    "booking__reference",
+    "provider_id",
+    "provider__professional_name",
+    "status",
+    "gross_amount",
+    "platform_fee",
+    "net_amount",
+    "payout_method",
+    "payout_details_snapshot",
+    "payout_date",
+    "approved_at",
+    "paid_at",
+    "admin_note",
+    "created_at",
+)
+# One column per payout detail across all methods (bank, M-Pesa, USDT); blank where the method does not use it.
+SNAPSHOT_COLUMNS = (
+    "bank_account_name",
+    "bank_name",
+    "saudi_iban",
+    "mpesa_full_name",
+    "mpesa_phone",
+    "usdt_network",
+    "usdt_wallet_address",
+)
+EXPORT_COLUMNS = (
+    "id",
+    "booking_id",
+    "booking_reference",
+    "provider_id",
+    "provider_name",
+    "status",
+    "gross_amount",
+    "platform_fee",
+    "net_amount",
+    "payout_method",
+    *SNAPSHOT_COLUMNS,
+    "payout_date",
+    "approved_at",
+    "paid_at",
+    "admin_note",
+    "created_at",
+)
+
+# Free-text cells a spreadsheet could run as a formula; amounts and ids are never user-supplied.
+CSV_TEXT_COLUMNS = frozenset(("provider_name", *SNAPSHOT_COLUMNS, "admin_note"))
+CSV_FORMULA_PREFIXES = ("=", "+", "-", "@", "\t", "\r")
+
+
+class CSVRenderer(BaseRenderer):
+    media_type = "text/csv"
+    format = "csv"
+    charset = "utf-8"
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        # Successful exports stream past the renderer; only error payloads get here.
+        return json.dumps(data)
+
+
+class NDJSONRenderer(CSVRenderer):
+    media_type = "application/x-ndjson"
+    format = "ndjson"
+
+
+def _parse_boundary(value: str, *, name: str) -> tuple[datetime, bool]:
+    """Return the moment `value` names and whether it was a bare date."""
+    parsed = parse_datetime(value)
+    is_date = parsed is None
+    if is_date:
+        day = parse_date(value)
+        if day is None:
+            raise ValidationError({name: "Must be an ISO 8601 date or datetime."})
+        parsed = datetime.combine(day, time.min)
+    if timezone.is_naive(parsed):
+        # Finance reads dates in the platform's zone (TIME_ZONE), not UTC.
+        parsed = timezone.make_aware(parsed)
+    return parsed, is_date
+
+
+def filter_export_queryset(queryset, *, created_from: Optional[str] = None, created_to: Optional[str] = None):
+    if created_from:
+        start, _is_date = _parse_boundary(created_from, name="created_from")
+        queryset = queryset.filter(created_at__gte=start)
+    if created_to:
+        end, is_date = _parse_boundary(created_to, name="created_to")
+        # A bare end date includes the whole day.
+        if is_date:
+            queryset = queryset.filter(created_at__lt=end + timedelta(days=1))
+        else:
+            queryset = queryset.filter(created_at__lte=end)
+    return queryset
+
+
+def ledger_export_queryset(
+    *,
+    status: Optional[str] = None,
+    provider_id: Optional[int] = None,
+    created_from: Optional[str] = None,
+    created_to: Optional[str] = None,
+):
+    queryset = PayoutLedger.objects.all()
+    if status:
+        queryset = queryset.filter(status=status.upper())
+    if provider_id:
+        queryset = queryset.filter(provider_id=provider_id)
+    return filter_export_queryset(queryset, created_from=created_from, created_to=created_to)
+
+
+def _export_value(value: Any) -> Any:
+    if value is None:
+        return ""
+    if isinstance(value, datetime):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return str(value)
+    return value if isinstance(value, (int, str)) else str(value)
+
+
+def iter_export_rows(queryset, *, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[dict[str, Any]]:
+    rows = queryset.order_by("-created_at", "-id").values(*EXPORT_VALUE_FIELDS).iterator(chunk_size=chunk_size)
+    for row in rows:
+        snapshot = row.pop("payout_details_snapshot") or {}
+        row["booking_reference"] = row.pop("booking__reference")
+        row["provider_name"] = row.pop("provider__professional_name")
+        for column in SNAPSHOT_COLUMNS:
+            row[column] = snapshot.get(column, "") if isinstance(snapshot, dict) else ""
+        yield {column: _export_value(row[column]) for column in EXPORT_COLUMNS}
+
+
+def _escape_csv_formula(value: Any) -> Any:
+    if isinstance(value, str) and value.startswith(CSV_FORMULA_PREFIXES):
+        return f"'{value}"
+    return value
+
+
+def iter_csv(rows: Iterable[dict[str, Any]], *, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    buffer = StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=EXPORT_COLUMNS)
+    writer.writeheader()
+    pending = 0
+    for row in rows:
+        writer.writerow(
+            {column: _escape_csv_formula(value) if column in CSV_TEXT_COLUMNS else value for column, value in row.items()}
+        )
+        pending += 1
+        if pending >= chunk_size:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+            pending = 0
+    yield buffer.getvalue()
+
+
+def iter_ndjson(rows: Iterable[dict[str, Any]], *, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    lines = []
+    for row in rows:
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) >= chunk_size:
+            yield "\n".join(lines) + "\n"
+            lines = []
+    if lines:
+        yield "\n".join(lines) + "\n"
+
+
+def iter_ledger_export(queryset, *, export_format: str, chunk_size: int = EXPORT_CHUNK_SIZE) -> Iterator[str]:
+    """Stream the ledger as CSV or NDJSON text chunks; memory stays bounded by `chunk_size` rows."""
+    rows = iter_export_rows(queryset, chunk_size=chunk_size)
+    if export_format == "ndjson":
+        return iter_ndjson(rows, chunk_size=chunk_size)
+    return iter_csv(rows, chunk_size=chunk_size)
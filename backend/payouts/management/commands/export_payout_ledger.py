@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+from rest_framework.exceptions import ValidationError
+
+from payouts.exports import EXPORT_CHUNK_SIZE, EXPORT_FORMATS, iter_ledger_export, ledger_export_queryset
+
+
+class Command(BaseCommand):
+    help = "Stream the payout ledger as CSV or NDJSON, with payout details flattened per method."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--format", choices=EXPORT_FORMATS, default="csv", dest="export_format")
+        parser.add_argument("--status", help="PENDING, APPROVED, PAID or FAILED.")
+        parser.add_argument("--provider", type=int, help="Provider profile id.")
+        parser.add_argument("--from", dest="created_from", help="Created at or after this ISO date/datetime.")
+        parser.add_argument("--to", dest="created_to", help="Created on or before this ISO date/datetime.")
+        parser.add_argument("--output", help="File path. Writes to stdout when omitted.")
+        parser.add_argument("--chunk-size", type=int, default=EXPORT_CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        try:
+            queryset = ledger_export_queryset(
+                status=options["status"],
+                provider_id=options["provider"],
+                created_from=options["created_from"],
+                created_to=options["created_to"],
+            )
+        except ValidationError as exc:
+            raise CommandError(str(exc.detail))
+
+        chunks = iter_ledger_export(
+            queryset,
+            export_format=options["export_format"],
+            chunk_size=max(1, options["chunk_size"]),
+        )
+        if not options["output"]:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
+            return
+
+        with open(options["output"], "w", encoding="utf-8", newline="") as handle:
+            for chunk in chunks:
+                handle.write(chunk)
+        self.stderr.write(f"Wrote payout ledger export to {options['output']}.")
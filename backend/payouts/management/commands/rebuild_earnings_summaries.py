@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from payouts.models import PayoutLedger, ProviderEarningsSummary
+from payouts.services import refresh_earnings_summaries
+
+
+class Command(BaseCommand):
+    help = "Recompute provider earnings summaries from the payout ledger."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--provider", type=int, action="append", dest="provider_ids", help="Provider id; repeatable.")
+        parser.add_argument("--batch-size", type=int, default=500)
+
+    def handle(self, *args, **options):
+        provider_ids = options["provider_ids"]
+        if not provider_ids:
+            # Providers with ledger rows, plus any stale summary whose rows are gone.
+            provider_ids = [
+                *PayoutLedger.objects.order_by().values_list("provider_id", flat=True).distinct(),
+                *ProviderEarningsSummary.objects.values_list("provider_id", flat=True),
+            ]
+        provider_ids = sorted(set(provider_ids))
+        batch_size = max(1, options["batch_size"])
+        for start in range(0, len(provider_ids), batch_size):
+            refresh_earnings_summaries(provider_ids[start : start + batch_size])
+        self.stdout.write(f"Rebuilt earnings summaries for {len(provider_ids)} provider(s).")
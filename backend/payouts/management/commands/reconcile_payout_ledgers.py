@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Q
+
+from bookings.models import Booking
+from payouts.services import PAYOUT_SYNC_BATCH_SIZE, sync_payout_ledgers
+
+
+class Command(BaseCommand):
+    help = "Re-sync payout ledger rows for every completed booking and every booking that already has a ledger row."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=PAYOUT_SYNC_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        batch_size = max(1, options["batch_size"])
+        booking_ids = list(
+            Booking.objects.filter(Q(status=Booking.Status.COMPLETED) | Q(payout_ledger__isnull=False))
+            .order_by("id")
+            .values_list("id", flat=True)
+        )
+
+        totals = sync_payout_ledgers(booking_ids=booking_ids, batch_size=batch_size)
+
+        self.stdout.write(
+            f"Created {totals['created']}, updated {totals['updated']}, unchanged {totals['unchanged']}, "
+            f"failed {totals['failed']} payout ledger row(s)."
+        )
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.30 on 2026-10-16 20:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('payouts', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='payoutledger',
+            index=models.Index(fields=['-created_at', '-id'], name='payout_ledger_recent_idx'),
+        ),
+    ]
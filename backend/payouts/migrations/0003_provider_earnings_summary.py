@@ -0,0 +1,54 @@
+# Generated by Django 4.2.30 on 2026-10-16 21:08
+
+from decimal import Decimal
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_earnings_summaries(apps, schema_editor):
+    PayoutLedger = apps.get_model("payouts", "PayoutLedger")
+    ProviderEarningsSummary = apps.get_model("payouts", "ProviderEarningsSummary")
+    aggregates = {"last_payout_at": models.Max("payout_date", filter=models.Q(status="PAID"))}
+    for status in ("PENDING", "APPROVED", "PAID", "FAILED"):
+        aggregates[f"{status.lower()}_count"] = models.Count("id", filter=models.Q(status=status))
+        aggregates[f"{status.lower()}_amount"] = models.Sum("net_amount", filter=models.Q(status=status))
+    rows = PayoutLedger.objects.values("provider_id").annotate(**aggregates).order_by()
+    ProviderEarningsSummary.objects.bulk_create(
+        [
+            ProviderEarningsSummary(**{field: value for field, value in row.items() if value is not None})
+            for row in rows
+        ],
+        batch_size=500,
+    )
+
+
+def noop_reverse(apps, schema_editor):
+    return
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('accounts', '0006_providerprofile_rating_sum'),
+        ('payouts', '0002_payout_ledger_recent_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProviderEarningsSummary',
+            fields=[
+                ('provider', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='earnings_summary', serialize=False, to='accounts.providerprofile')),
+                ('pending_count', models.PositiveIntegerField(default=0)),
+                ('pending_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('approved_count', models.PositiveIntegerField(default=0)),
+                ('approved_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('paid_count', models.PositiveIntegerField(default=0)),
+                ('paid_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('failed_count', models.PositiveIntegerField(default=0)),
+                ('failed_amount', models.DecimalField(decimal_places=2, default=Decimal('0.00'), max_digits=12)),
+                ('last_payout_at', models.DateTimeField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.RunPython(backfill_earnings_summaries, noop_reverse),
+    ]
@@ -110,6 +110,9 @@ class PayoutLedger(models.Model):
 
     class Meta:
         ordering = ["-created_at"]
+        indexes = [
+            models.Index(fields=["-created_at", "-id"], name="payout_ledger_recent_idx"),
+        ]
 
     def __str__(self) -> str:
         return f"PayoutLedger<booking={self.booking_id}, status={self.status}>"
@@ -122,3 +125,26 @@ class PayoutLedger(models.Model):
             Decimal("0.01")
         ):
             raise ValidationError("Net amount must equal gross amount minus platform fee.")
+
+
+class ProviderEarningsSummary(models.Model):
+    # Kept in step with the ledger by payouts.services.refresh_earnings_summaries so dashboards read one row.
+    provider = models.OneToOneField(
+        ProviderProfile,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name="earnings_summary",
+    )
+    pending_count = models.PositiveIntegerField(default=0)
+    pending_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    approved_count = models.PositiveIntegerField(default=0)
+    approved_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    paid_count = models.PositiveIntegerField(default=0)
+    paid_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    failed_count = models.PositiveIntegerField(default=0)
+    failed_amount = models.DecimalField(max_digits=12, decimal_places=2, default=Decimal("0.00"))
+    last_payout_at = models.DateTimeField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self) -> str:
+        return f"ProviderEarningsSummary<{self.provider_id}>"
@@ -1,7 +1,8 @@
 from rest_framework import serializers
 from django.utils import timezone
 
-from .models import PayoutLedger, ProviderPayoutProfile
+from .models import PayoutLedger, ProviderEarningsSummary, ProviderPayoutProfile
+from .services import PAYOUT_BATCH_MAX_SIZE
 
 
 class ProviderPayoutProfileSerializer(serializers.ModelSerializer):
@@ -147,5 +148,51 @@ class PayoutLedgerSerializer(serializers.ModelSerializer):
         )
 
 
+class ProviderEarningsSummarySerializer(serializers.ModelSerializer):
+    provider_name = serializers.CharField(source="provider.professional_name", read_only=True)
+
+    class Meta:
+        model = ProviderEarningsSummary
+        fields = (
+            "provider",
+            "provider_name",
+            "pending_count",
+            "pending_amount",
+            "approved_count",
+            "approved_amount",
+            "paid_count",
+            "paid_amount",
+            "failed_count",
+            "failed_amount",
+            "last_payout_at",
+            "updated_at",
+        )
+        read_only_fields = fields
+
+
 class PayoutActionSerializer(serializers.Serializer):
     admin_note = serializers.CharField(required=False, allow_blank=True, max_length=1000)
+
+
+class PayoutBatchActionSerializer(PayoutActionSerializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        required=False,
+        allow_empty=False,
+        max_length=PAYOUT_BATCH_MAX_SIZE,
+    )
+    status = serializers.CharField(required=False)
+    provider = serializers.IntegerField(required=False, min_value=1)
+
+    def validate_status(self, value):
+        value = value.upper()
+        if value not in PayoutLedger.Status.values:
+            raise serializers.ValidationError("Unknown payout status.")
+        return value
+
+    def validate(self, attrs):
+        if "ids" in attrs and ("status" in attrs or "provider" in attrs):
+            raise serializers.ValidationError("Provide either ids or a status/provider filter, not both.")
+        if "ids" not in attrs and "status" not in attrs and "provider" not in attrs:
+            raise serializers.ValidationError("Provide ids or a status/provider filter.")
+        return attrs
@@ -1,10 +1,15 @@
+from datetime import timedelta
 from decimal import Decimal
-from typing import Optional
+from typing import Iterable, Optional
 
-from accounts.models import ProviderProfile, User
+from django.db import transaction
+from django.db.models import Count, Max, Q, Sum
+from django.utils import timezone
+
+from accounts.models import User
 from bookings.models import Booking
 
-from .models import PayoutLedger, ProviderPayoutProfile
+from .models import PayoutLedger, ProviderEarningsSummary, ProviderPayoutProfile
 
 
 def _build_snapshot(profile: Optional[ProviderPayoutProfile]) -> tuple[str, dict]:
@@ -30,32 +35,64 @@ def _build_snapshot(profile: Optional[ProviderPayoutProfile]) -> tuple[str, dict
     }
 
 
-def sync_payout_ledger_for_booking(*, booking: Booking, actor: Optional[User] = None):
-    provider: ProviderProfile = booking.provider
+EARNINGS_STATUSES = {
+    "pending": PayoutLedger.Status.PENDING,
+    "approved": PayoutLedger.Status.APPROVED,
+    "paid": PayoutLedger.Status.PAID,
+    "failed": PayoutLedger.Status.FAILED,
+}
+EARNINGS_SUMMARY_FIELDS = [
+    *(f"{prefix}_{suffix}" for prefix in EARNINGS_STATUSES for suffix in ("count", "amount")),
+    "last_payout_at",
+    "updated_at",
+]
+PAYOUT_SYNC_BATCH_SIZE = 500
+PAYOUT_SYNC_FIELDS = [
+    "gross_amount",
+    "platform_fee",
+    "net_amount",
+    "payout_method",
+    "payout_details_snapshot",
+    "status",
+    "updated_at",
+]
+PAYABLE_ESCROW_STATUSES = {
+    Booking.EscrowStatus.PAID,
+    Booking.EscrowStatus.HELD,
+    Booking.EscrowStatus.RELEASED,
+}
+PAYOUT_BATCH_ACTIONS = {
+    "approve": PayoutLedger.Status.APPROVED,
+    "mark_paid": PayoutLedger.Status.PAID,
+    "mark_failed": PayoutLedger.Status.FAILED,
+}
+PAYOUT_BATCH_MAX_SIZE = 1000
+PAYOUT_HOLD_PERIOD = timedelta(hours=24)
+
+
+def _plan_payout_sync(
+    *,
+    booking: Booking,
+    payout: Optional[PayoutLedger],
+    payout_profile: Optional[ProviderPayoutProfile],
+) -> tuple[Optional[PayoutLedger], str]:
+    """Apply the booking to its ledger row in memory; returns the row and "create", "update" or ""."""
     gross_amount = Decimal(str(booking.subtotal_amount or "0.00")).quantize(Decimal("0.01"))
     platform_fee = Decimal(str(booking.platform_fee or "0.00")).quantize(Decimal("0.01"))
     net_amount = (gross_amount - platform_fee).quantize(Decimal("0.01"))
-    try:
-        payout_profile = provider.payout_profile
-    except Exception:
-        payout_profile = None
     payout_method, payout_snapshot = _build_snapshot(payout_profile)
 
-    payout = PayoutLedger.objects.filter(booking=booking).first()
-
-    should_create_or_update = booking.status == Booking.Status.COMPLETED and booking.escrow_status in {
-        Booking.EscrowStatus.PAID,
-        Booking.EscrowStatus.HELD,
-        Booking.EscrowStatus.RELEASED,
-    }
+    should_create_or_update = (
+        booking.status == Booking.Status.COMPLETED and booking.escrow_status in PAYABLE_ESCROW_STATUSES
+    )
 
     if should_create_or_update:
         # Keep payout approval as an explicit admin action; sync only prepares pending payout records.
         target_status = PayoutLedger.Status.PENDING
 
         if payout is None:
-            payout = PayoutLedger.objects.create(
-                provider=provider,
+            payout = PayoutLedger(
+                provider_id=booking.provider_id,
                 booking=booking,
                 gross_amount=gross_amount,
                 platform_fee=platform_fee,
@@ -64,26 +101,214 @@ def sync_payout_ledger_for_booking(*, booking: Booking, actor: Optional[User] =
                 payout_method=payout_method,
                 payout_details_snapshot=payout_snapshot,
             )
-            return payout
-
-        update_fields = ["gross_amount", "platform_fee", "net_amount", "payout_method", "payout_details_snapshot", "updated_at"]
-        payout.gross_amount = gross_amount
-        payout.platform_fee = platform_fee
-        payout.net_amount = net_amount
-        payout.payout_method = payout_method
-        payout.payout_details_snapshot = payout_snapshot
-
-        if payout.status in {PayoutLedger.Status.PENDING, PayoutLedger.Status.FAILED} and payout.status != target_status:
-            payout.status = target_status
-            update_fields.append("status")
+            return payout, "create"
 
-        payout.save(update_fields=list(dict.fromkeys(update_fields)))
-        return payout
+        values = {
+            "gross_amount": gross_amount,
+            "platform_fee": platform_fee,
+            "net_amount": net_amount,
+            "payout_method": payout_method,
+            "payout_details_snapshot": payout_snapshot,
+        }
+        if payout.status == PayoutLedger.Status.FAILED:
+            values["status"] = target_status
+        changed = [field for field, value in values.items() if getattr(payout, field) != value]
+        for field in changed:
+            setattr(payout, field, values[field])
+        return payout, "update" if changed else ""
 
-    if payout and payout.status != PayoutLedger.Status.PAID and (
+    if payout and payout.status not in {PayoutLedger.Status.PAID, PayoutLedger.Status.FAILED} and (
         booking.escrow_status == Booking.EscrowStatus.REFUNDED or booking.status in {Booking.Status.CANCELLED, Booking.Status.REJECTED}
     ):
         payout.status = PayoutLedger.Status.FAILED
-        payout.save(update_fields=["status", "updated_at"])
+        return payout, "update"
+
+    return payout, ""
+
+
+def refresh_earnings_summaries(provider_ids: Iterable[int]) -> None:
+    """Recompute the earnings summary rows for these providers from their ledger rows."""
+    provider_ids = sorted(set(provider_ids))
+    if not provider_ids:
+        return
+
+    with transaction.atomic():
+        ProviderEarningsSummary.objects.bulk_create(
+            [ProviderEarningsSummary(provider_id=provider_id) for provider_id in provider_ids],
+            ignore_conflicts=True,
+        )
+        # Lock first, then aggregate, so concurrent refreshes for a provider cannot write a stale total last.
+        summaries = list(
+            ProviderEarningsSummary.objects.select_for_update().filter(provider_id__in=provider_ids).order_by("provider_id")
+        )
+        aggregates = {}
+        for prefix, ledger_status in EARNINGS_STATUSES.items():
+            aggregates[f"{prefix}_count"] = Count("id", filter=Q(status=ledger_status))
+            aggregates[f"{prefix}_amount"] = Sum("net_amount", filter=Q(status=ledger_status))
+        aggregates["last_payout_at"] = Max("payout_date", filter=Q(status=PayoutLedger.Status.PAID))
+        totals = {
+            row["provider_id"]: row
+            for row in PayoutLedger.objects.filter(provider_id__in=provider_ids)
+            .values("provider_id")
+            .annotate(**aggregates)
+            .order_by()
+        }
+
+        now = timezone.now()
+        for summary in summaries:
+            row = totals.get(summary.provider_id, {})
+            for prefix in EARNINGS_STATUSES:
+                setattr(summary, f"{prefix}_count", row.get(f"{prefix}_count") or 0)
+                setattr(summary, f"{prefix}_amount", row.get(f"{prefix}_amount") or Decimal("0.00"))
+            summary.last_payout_at = row.get("last_payout_at")
+            summary.updated_at = now
+        ProviderEarningsSummary.objects.bulk_update(summaries, EARNINGS_SUMMARY_FIELDS)
+
+
+def sync_payout_ledger_for_booking(*, booking: Booking, actor: Optional[User] = None):
+    try:
+        payout_profile = booking.provider.payout_profile
+    except Exception:
+        payout_profile = None
 
+    with transaction.atomic():
+        # Take the booking lock sync_payout_ledgers takes, so the two cannot both create this booking's row.
+        list(Booking.objects.select_for_update().filter(id=booking.id).values_list("id", flat=True))
+        payout = PayoutLedger.objects.filter(booking=booking).first()
+        payout, change = _plan_payout_sync(booking=booking, payout=payout, payout_profile=payout_profile)
+        if not change:
+            return payout
+        if change == "create":
+            payout.save()
+        else:
+            payout.save(update_fields=PAYOUT_SYNC_FIELDS)
+        refresh_earnings_summaries([payout.provider_id])
     return payout
+
+
+def sync_payout_ledgers(*, booking_ids: Iterable[int], batch_size: int = PAYOUT_SYNC_BATCH_SIZE) -> dict[str, int]:
+    """Sync ledger rows for many bookings: per batch, one query each for bookings, ledger rows and payout profiles."""
+    booking_ids = list(dict.fromkeys(booking_ids))
+    summary = {"created": 0, "updated": 0, "unchanged": 0, "failed": 0}
+
+    for start in range(0, len(booking_ids), batch_size):
+        chunk = booking_ids[start : start + batch_size]
+        with transaction.atomic():
+            bookings = list(Booking.objects.select_for_update().filter(id__in=chunk).order_by("id"))
+            payouts = {payout.booking_id: payout for payout in PayoutLedger.objects.filter(booking_id__in=chunk)}
+            profiles = {
+                profile.provider_id: profile
+                for profile in ProviderPayoutProfile.objects.filter(
+                    provider_id__in={booking.provider_id for booking in bookings}
+                )
+            }
+
+            now = timezone.now()
+            to_create, to_update = [], []
+            unchanged = 0
+            failed = len(chunk) - len(bookings)
+            for booking in bookings:
+                try:
+                    payout, change = _plan_payout_sync(
+                        booking=booking,
+                        payout=payouts.get(booking.id),
+                        payout_profile=profiles.get(booking.provider_id),
+                    )
+                except (ArithmeticError, TypeError, ValueError):
+                    failed += 1
+                    continue
+                if change == "create":
+                    to_create.append(payout)
+                elif change == "update":
+                    payout.updated_at = now
+                    to_update.append(payout)
+                else:
+                    unchanged += 1
+
+            PayoutLedger.objects.bulk_create(to_create, batch_size=batch_size)
+            PayoutLedger.objects.bulk_update(to_update, PAYOUT_SYNC_FIELDS, batch_size=batch_size)
+            refresh_earnings_summaries(payout.provider_id for payout in to_create + to_update)
+
+        summary["created"] += len(to_create)
+        summary["updated"] += len(to_update)
+        summary["unchanged"] += unchanged
+        summary["failed"] += failed
+
+    return summary
+
+
+def payout_approval_error(*, booking: Booking) -> Optional[str]:
+    if booking.status != Booking.Status.COMPLETED:
+        return "Payout approval requires a completed booking."
+    if not booking.has_both_completion_confirmations:
+        return "Payout approval requires both provider and customer completion confirmations."
+    if booking.escrow_status != Booking.EscrowStatus.RELEASED:
+        return "Payout approval requires escrow status RELEASED."
+
+    try:
+        dispute = booking.dispute
+    except Exception:
+        dispute = None
+
+    if dispute and dispute.status in {"OPEN", "UNDER_REVIEW"}:
+        return "Payout approval is blocked while the booking has an open dispute."
+    return None
+
+
+def payout_transition_error(*, payout: PayoutLedger, action: str, now) -> Optional[str]:
+    if action == "approve":
+        if payout.status not in {PayoutLedger.Status.PENDING, PayoutLedger.Status.FAILED}:
+            return "Only pending or failed payouts can be approved."
+        return payout_approval_error(booking=payout.booking)
+    if action == "mark_paid":
+        if payout.status != PayoutLedger.Status.APPROVED:
+            return "Only approved payouts can be marked as paid."
+        if not payout.approved_at:
+            return "Payout must have an approval timestamp before marking as paid."
+        if now < payout.approved_at + PAYOUT_HOLD_PERIOD:
+            return "Payout anti-fraud hold is active. Mark paid only after 24 hours from approval."
+        return None
+    if payout.status == PayoutLedger.Status.PAID:
+        return "Paid payouts cannot be marked as failed."
+    return None
+
+
+def batch_transition_payouts(*, action: str, payout_ids: Iterable[int], actor: User, note: str = "") -> list[dict]:
+    """Apply one admin action to many ledger rows; returns an outcome per id, in request order."""
+    target_status = PAYOUT_BATCH_ACTIONS[action]
+    payout_ids = list(dict.fromkeys(payout_ids))
+    now = timezone.now()
+
+    with transaction.atomic():
+        # Rows are locked in id order; bookings and disputes come along in the same query for validation.
+        payouts = {
+            payout.id: payout
+            for payout in PayoutLedger.objects.select_for_update(of=("self",))
+            .select_related("booking", "booking__dispute")
+            .filter(id__in=payout_ids)
+            .order_by("id")
+        }
+
+        outcomes, eligible = [], []
+        for payout_id in payout_ids:
+            payout = payouts.get(payout_id)
+            if payout is None:
+                outcomes.append({"id": payout_id, "ok": False, "error": "Not found."})
+                continue
+            error = payout_transition_error(payout=payout, action=action, now=now)
+            if error:
+                outcomes.append({"id": payout_id, "ok": False, "status": payout.status, "error": error})
+                continue
+            eligible.append(payout)
+            outcomes.append({"id": payout_id, "ok": True, "status": target_status})
+
+        if eligible:
+            values = {"status": target_status, "admin_note": note, "updated_at": now}
+            if action == "approve":
+                values.update(approved_by=actor, approved_at=now)
+            elif action == "mark_paid":
+                values.update(payout_date=now, paid_by=actor, paid_at=now)
+            PayoutLedger.objects.filter(id__in=[payout.id for payout in eligible]).update(**values)
+            refresh_earnings_summaries(payout.provider_id for payout in eligible)
+
+    return outcomes
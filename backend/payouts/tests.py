@@ -0,0 +1,297 @@
+import csv
+import json
+from datetime import datetime, timedelta, timezone as dt_timezone
+from decimal import Decimal
+from io import StringIO
+from unittest import mock
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from accounts.models import ProviderProfile, User
+from bookings.models import Booking
+from disputes.models import Dispute
+from marketplace.models import Service
+
+from .exports import filter_export_queryset
+from .models import PayoutLedger, ProviderEarningsSummary, ProviderPayoutProfile
+from .services import sync_payout_ledger_for_booking, sync_payout_ledgers
+
+
+class PayoutTestMixin:
+    def setUp(self):
+        self.admin = User.objects.create_user(
+            username="admin_user",
+            email="admin@example.com",
+            password="StrongPass123!",
+            role=User.Role.ADMIN,
+            is_staff=True,
+        )
+        self.customer = User.objects.create_user(
+            username="customer_user",
+            email="customer@example.com",
+            password="StrongPass123!",
+            role=User.Role.CUSTOMER,
+        )
+        provider_user = User.objects.create_user(
+            username="provider_user",
+            email="provider@example.com",
+            password="StrongPass123!",
+            role=User.Role.PROVIDER,
+        )
+        self.provider = ProviderProfile.objects.create(
+            user=provider_user,
+            professional_name="Trusted Provider",
+            verification_status=ProviderProfile.VerificationStatus.APPROVED,
+        )
+        self.service = Service.objects.create(
+            provider=self.provider,
+            service_type=Service.ServiceType.UMRAH_BADAL,
+            title="Umrah Badal",
+            description="Performed on your behalf.",
+            city_scope=Service.CityScope.MAKKAH,
+            price_amount=Decimal("100.00"),
+        )
+        ProviderPayoutProfile.objects.create(
+            provider=self.provider,
+            method=ProviderPayoutProfile.Method.MPESA,
+            mpesa_full_name="Trusted Provider",
+            mpesa_phone="+254700000000",
+        )
+
+    def _booking(self, **overrides):
+        values = {
+            "customer": self.customer,
+            "provider": self.provider,
+            "service": self.service,
+            "status": Booking.Status.COMPLETED,
+            "escrow_status": Booking.EscrowStatus.RELEASED,
+        }
+        values.update(overrides)
+        return Booking.objects.create(**values)
+
+
+class PayoutLedgerSyncTests(PayoutTestMixin, TestCase):
+    def test_bulk_sync_creates_updates_and_fails_in_constant_queries(self):
+        new = [self._booking() for _ in range(3)]
+        refunded = self._booking(status=Booking.Status.CANCELLED, escrow_status=Booking.EscrowStatus.REFUNDED)
+        PayoutLedger.objects.create(
+            provider=self.provider,
+            booking=refunded,
+            gross_amount=Decimal("100.00"),
+            platform_fee=Decimal("8.00"),
+            net_amount=Decimal("92.00"),
+        )
+        booking_ids = [booking.id for booking in new] + [refunded.id, 999999]
+
+        with self.assertNumQueries(13):
+            summary = sync_payout_ledgers(booking_ids=booking_ids)
+
+        self.assertEqual(summary, {"created": 3, "updated": 1, "unchanged": 0, "failed": 1})
+        self.assertEqual(PayoutLedger.objects.get(booking=refunded).status, PayoutLedger.Status.FAILED)
+        ledger = PayoutLedger.objects.get(booking=new[0])
+        self.assertEqual(ledger.status, PayoutLedger.Status.PENDING)
+        self.assertEqual(ledger.payout_method, ProviderPayoutProfile.Method.MPESA)
+        self.assertEqual(ledger.payout_details_snapshot["mpesa_phone"], "+254700000000")
+        self.assertEqual(
+            sync_payout_ledgers(booking_ids=booking_ids),
+            {"created": 0, "updated": 0, "unchanged": 4, "failed": 1},
+        )
+
+    def test_sync_endpoint_reports_counts(self):
+        booking = self._booking()
+        self.client.force_login(self.admin)
+
+        response = self.client.post(
+            "/api/payouts/ledger/sync_from_bookings/",
+            {"booking_ids": [booking.id]},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()["created"], 1)
+        self.assertEqual(response.json()["synced"], 1)
+
+
+class PayoutLedgerExportTests(PayoutTestMixin, TestCase):
+    def setUp(self):
+        super().setUp()
+        self.paid = self._booking()
+        self.pending = self._booking()
+        sync_payout_ledgers(booking_ids=[self.paid.id, self.pending.id])
+        PayoutLedger.objects.filter(booking=self.paid).update(status=PayoutLedger.Status.PAID)
+
+    def test_csv_export_streams_flattened_rows(self):
+        self.client.force_login(self.admin)
+
+        response = self.client.get("/api/payouts/ledger/export/", {"status": "paid", "created_from": "2000-01-01"})
+        rows = list(csv.DictReader(StringIO(b"".join(response.streaming_content).decode("utf-8"))))
+
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response["Content-Type"].startswith("text/csv"))
+        self.assertEqual([row["booking_id"] for row in rows], [str(self.paid.id)])
+        self.assertEqual(rows[0]["mpesa_phone"], "'+254700000000")
+        self.assertEqual(rows[0]["saudi_iban"], "")
+
+    def test_csv_export_escapes_formula_cells(self):
+        PayoutLedger.objects.filter(booking=self.paid).update(admin_note='=HYPERLINK("http://x","y")')
+        self.client.force_login(self.admin)
+
+        response = self.client.get("/api/payouts/ledger/export/", {"status": "paid"})
+        row = next(csv.DictReader(StringIO(b"".join(response.streaming_content).decode("utf-8"))))
+
+        self.assertEqual(row["admin_note"], '\'=HYPERLINK("http://x","y")')
+        self.assertEqual(row["net_amount"], str(PayoutLedger.objects.get(booking=self.paid).net_amount))
+
+    def test_bare_dates_use_the_platform_time_zone(self):
+        # 22:00 UTC on 1 January is already 2 January in Riyadh (UTC+3).
+        PayoutLedger.objects.filter(booking=self.paid).update(
+            created_at=datetime(2026, 1, 1, 22, 0, tzinfo=dt_timezone.utc)
+        )
+        queryset = PayoutLedger.objects.filter(booking=self.paid)
+
+        self.assertFalse(filter_export_queryset(queryset, created_to="2026-01-01").exists())
+        self.assertTrue(filter_export_queryset(queryset, created_from="2026-01-02").exists())
+
+    def test_ndjson_export_command_and_provider_scope(self):
+        out = StringIO()
+        call_command("export_payout_ledger", "--format", "ndjson", "--to", "2000-01-01", stdout=out)
+        self.assertEqual(out.getvalue(), "")
+
+        out = StringIO()
+        call_command("export_payout_ledger", "--format", "ndjson", "--provider", str(self.provider.id), stdout=out)
+        lines = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual({line["booking_id"] for line in lines}, {self.paid.id, self.pending.id})
+
+        self.client.force_login(self.customer)
+        response = self.client.get("/api/payouts/ledger/export/", {"format": "ndjson"})
+        self.assertEqual(b"".join(response.streaming_content), b"")
+
+
+class ProviderEarningsSummaryTests(PayoutTestMixin, TestCase):
+    def test_summary_follows_sync_and_admin_actions(self):
+        first = self._booking(
+            provider_completed_confirmed_at=timezone.now(),
+            customer_completed_confirmed_at=timezone.now(),
+        )
+        second = self._booking()
+        sync_payout_ledgers(booking_ids=[first.id])
+        sync_payout_ledger_for_booking(booking=second)
+        self.client.force_login(self.admin)
+        payout = PayoutLedger.objects.get(booking=first)
+
+        self.client.post(f"/api/payouts/ledger/{payout.id}/approve/", {}, content_type="application/json")
+        PayoutLedger.objects.filter(id=payout.id).update(approved_at=timezone.now() - timedelta(days=2))
+        self.client.post(f"/api/payouts/ledger/{payout.id}/mark_paid/", {}, content_type="application/json")
+
+        summary = ProviderEarningsSummary.objects.get(provider=self.provider)
+        self.assertEqual((summary.pending_count, summary.paid_count), (1, 1))
+        self.assertEqual(summary.pending_amount, PayoutLedger.objects.get(booking=second).net_amount)
+        self.assertIsNotNone(summary.last_payout_at)
+
+        self.client.force_login(self.provider.user)
+        with self.assertNumQueries(4):
+            response = self.client.get("/api/payouts/earnings/")
+        self.assertEqual(response.json()["results"][0]["paid_count"], 1)
+
+    def test_admin_provider_filter_rejects_non_integer_ids(self):
+        sync_payout_ledgers(booking_ids=[self._booking().id])
+        self.client.force_login(self.admin)
+
+        rejected = self.client.get("/api/payouts/earnings/", {"provider": "abc"})
+        filtered = self.client.get("/api/payouts/earnings/", {"provider": self.provider.id})
+
+        self.assertEqual(rejected.status_code, 400)
+        self.assertIn("provider", rejected.json())
+        self.assertEqual([row["provider"] for row in filtered.json()["results"]], [self.provider.id])
+
+    def test_rebuild_command_repairs_drift(self):
+        sync_payout_ledgers(booking_ids=[self._booking().id])
+        ProviderEarningsSummary.objects.update(pending_count=9)
+
+        call_command("rebuild_earnings_summaries", stdout=StringIO())
+
+        self.assertEqual(ProviderEarningsSummary.objects.get(provider=self.provider).pending_count, 1)
+
+
+class PayoutBatchActionTests(PayoutTestMixin, TestCase):
+    def _confirmed_booking(self):
+        return self._booking(
+            provider_completed_confirmed_at=timezone.now(),
+            customer_completed_confirmed_at=timezone.now(),
+        )
+
+    def test_batch_approve_reports_per_id_outcomes(self):
+        ready = [self._confirmed_booking() for _ in range(3)]
+        disputed = self._confirmed_booking()
+        unconfirmed = self._booking()
+        sync_payout_ledgers(booking_ids=[booking.id for booking in ready + [disputed, unconfirmed]])
+        Dispute.objects.create(
+            booking=disputed,
+            opened_by=self.customer,
+            requested_resolution=Dispute.RequestedResolution.choices[0][0],
+            reason="Not performed.",
+        )
+        ids = list(PayoutLedger.objects.order_by("booking_id").values_list("id", flat=True))
+        self.client.force_login(self.admin)
+
+        with self.assertNumQueries(12):
+            response = self.client.post(
+                "/api/payouts/ledger/batch_approve/",
+                {"ids": ids + [999999], "admin_note": "Weekly run"},
+                content_type="application/json",
+            )
+
+        body = response.json()
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((body["succeeded"], body["failed"]), (3, 3))
+        self.assertEqual([result["id"] for result in body["results"]], ids + [999999])
+        self.assertIn("open dispute", body["results"][3]["error"])
+        self.assertIn("confirmations", body["results"][4]["error"])
+        self.assertEqual(body["results"][5]["error"], "Not found.")
+        approved = PayoutLedger.objects.filter(status=PayoutLedger.Status.APPROVED)
+        self.assertEqual(set(approved.values_list("approved_by", flat=True)), {self.admin.id})
+        self.assertEqual(ProviderEarningsSummary.objects.get(provider=self.provider).approved_count, 3)
+
+    def test_batch_mark_paid_by_filter_respects_hold(self):
+        bookings = [self._confirmed_booking() for _ in range(2)]
+        sync_payout_ledgers(booking_ids=[booking.id for booking in bookings])
+        PayoutLedger.objects.update(status=PayoutLedger.Status.APPROVED, approved_at=timezone.now())
+        PayoutLedger.objects.filter(booking=bookings[0]).update(approved_at=timezone.now() - timedelta(days=2))
+        self.client.force_login(self.admin)
+
+        response = self.client.post(
+            "/api/payouts/ledger/batch_mark_paid/",
+            {"status": "approved", "provider": self.provider.id},
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.json()["succeeded"], 1)
+        self.assertEqual(PayoutLedger.objects.get(booking=bookings[0]).status, PayoutLedger.Status.PAID)
+        self.assertIn("hold", response.json()["results"][1]["error"])
+        self.assertEqual(
+            self.client.post("/api/payouts/ledger/batch_mark_failed/", {}, content_type="application/json").status_code,
+            400,
+        )
+
+    def test_filter_batches_report_truncation_and_detail_routes_share_rules(self):
+        bookings = [self._confirmed_booking() for _ in range(3)]
+        sync_payout_ledgers(booking_ids=[booking.id for booking in bookings])
+        PayoutLedger.objects.update(status=PayoutLedger.Status.APPROVED, approved_at=timezone.now())
+        self.client.force_login(self.admin)
+
+        with mock.patch("payouts.views.PAYOUT_BATCH_MAX_SIZE", 2):
+            response = self.client.post(
+                "/api/payouts/ledger/batch_mark_failed/",
+                {"status": "approved"},
+                content_type="application/json",
+            )
+        held = PayoutLedger.objects.filter(status=PayoutLedger.Status.APPROVED).get()
+        detail = self.client.post(f"/api/payouts/ledger/{held.id}/mark_paid/", {}, content_type="application/json")
+
+        self.assertEqual(response.json()["succeeded"], 2)
+        self.assertTrue(response.json()["truncated"])
+        self.assertEqual(response.json()["remaining"], 1)
+        self.assertEqual(detail.status_code, 400)
+        self.assertIn("hold", str(detail.json()))
@@ -1,10 +1,16 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import AdminProviderPayoutProfilesViewSet, PayoutLedgerViewSet, ProviderPayoutProfileMeView
+from .views import (
+    AdminProviderPayoutProfilesViewSet,
+    PayoutLedgerViewSet,
+    ProviderEarningsSummaryViewSet,
+    ProviderPayoutProfileMeView,
+)
 
 router = DefaultRouter()
 router.register(r"ledger", PayoutLedgerViewSet, basename="payout-ledger")
+router.register(r"earnings", ProviderEarningsSummaryViewSet, basename="provider-earnings")
 router.register(r"admin/provider-profiles", AdminProviderPayoutProfilesViewSet, basename="admin-provider-payout-profiles")
 
 urlpatterns = [
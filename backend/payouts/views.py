@@ -1,4 +1,6 @@
+from django.db import transaction
 from django.db.models import Q
+from django.http import StreamingHttpResponse
 from django.utils import timezone
 from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
@@ -8,29 +10,31 @@ from rest_framework.response import Response
 from rest_framework.views import APIView
 
 from accounts.models import ProviderProfile, User
-from bookings.models import Booking
+from umrah_link.pagination import CreatedAtCursorPagination
 
-from .models import PayoutLedger, ProviderPayoutProfile
+from .exports import CSVRenderer, NDJSONRenderer, filter_export_queryset, iter_ledger_export
+from .models import PayoutLedger, ProviderEarningsSummary, ProviderPayoutProfile
 from .permissions import IsPlatformAdmin
-from .serializers import PayoutActionSerializer, PayoutLedgerSerializer, ProviderPayoutProfileSerializer
-from .services import sync_payout_ledger_for_booking
-
-
-def validate_payout_approval_preconditions(*, booking: Booking):
-    if booking.status != Booking.Status.COMPLETED:
-        raise ValidationError("Payout approval requires a completed booking.")
-    if not booking.has_both_completion_confirmations:
-        raise ValidationError("Payout approval requires both provider and customer completion confirmations.")
-    if booking.escrow_status != Booking.EscrowStatus.RELEASED:
-        raise ValidationError("Payout approval requires escrow status RELEASED.")
-
-    try:
-        dispute = booking.dispute
-    except Exception:
-        dispute = None
-
-    if dispute and dispute.status in {"OPEN", "UNDER_REVIEW"}:
-        raise ValidationError("Payout approval is blocked while the booking has an open dispute.")
+from .serializers import (
+    PayoutActionSerializer,
+    PayoutBatchActionSerializer,
+    PayoutLedgerSerializer,
+    ProviderEarningsSummarySerializer,
+    ProviderPayoutProfileSerializer,
+)
+from .services import (
+    PAYOUT_BATCH_MAX_SIZE,
+    batch_transition_payouts,
+    payout_transition_error,
+    refresh_earnings_summaries,
+    sync_payout_ledgers,
+)
+
+
+def validate_payout_transition(*, payout: PayoutLedger, action: str):
+    error = payout_transition_error(payout=payout, action=action, now=timezone.now())
+    if error:
+        raise ValidationError(error)
 
 
 class ProviderPayoutProfileMeView(APIView):
@@ -69,6 +73,7 @@ class ProviderPayoutProfileMeView(APIView):
 
 class PayoutLedgerViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     serializer_class = PayoutLedgerSerializer
+    pagination_class = CreatedAtCursorPagination
     permission_classes = [IsAuthenticated]
 
     def get_queryset(self):
@@ -104,12 +109,78 @@ class PayoutLedgerViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, view
         if not isinstance(booking_ids, list) or not booking_ids:
             raise ValidationError("Provide non-empty booking_ids array.")
 
-        synced = 0
-        for booking in Booking.objects.select_related("provider", "provider__user").filter(id__in=booking_ids):
-            sync_payout_ledger_for_booking(booking=booking, actor=request.user)
-            synced += 1
+        try:
+            booking_ids = [int(booking_id) for booking_id in booking_ids]
+        except (TypeError, ValueError):
+            raise ValidationError("booking_ids must be integers.")
+
+        summary = sync_payout_ledgers(booking_ids=booking_ids)
+        synced = summary["created"] + summary["updated"] + summary["unchanged"]
+        return Response({"detail": "Payout sync completed.", "synced": synced, **summary})
+
+    @action(detail=False, methods=["get"], renderer_classes=[CSVRenderer, NDJSONRenderer])
+    def export(self, request):
+        queryset = filter_export_queryset(
+            self.get_queryset(),
+            created_from=request.query_params.get("created_from"),
+            created_to=request.query_params.get("created_to"),
+        )
+        export_format = request.accepted_renderer.format
+        filename = f"payout-ledger-{timezone.now():%Y%m%d-%H%M%S}.{export_format}"
+        response = StreamingHttpResponse(
+            iter_ledger_export(queryset, export_format=export_format),
+            content_type=request.accepted_renderer.media_type,
+        )
+        response["Content-Disposition"] = f'attachment; filename="{filename}"'
+        response["Cache-Control"] = "no-cache"
+        return response
+
+    def _batch_transition(self, request, action_name):
+        serializer = PayoutBatchActionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        data = serializer.validated_data
+
+        payout_ids = data.get("ids")
+        remaining = 0
+        if payout_ids is None:
+            queryset = PayoutLedger.objects.all()
+            if data.get("status"):
+                queryset = queryset.filter(status=data["status"])
+            if data.get("provider"):
+                queryset = queryset.filter(provider_id=data["provider"])
+            payout_ids = list(queryset.order_by("id").values_list("id", flat=True)[: PAYOUT_BATCH_MAX_SIZE + 1])
+            if len(payout_ids) > PAYOUT_BATCH_MAX_SIZE:
+                remaining = queryset.count() - PAYOUT_BATCH_MAX_SIZE
+                payout_ids = payout_ids[:PAYOUT_BATCH_MAX_SIZE]
+
+        results = batch_transition_payouts(
+            action=action_name,
+            payout_ids=payout_ids,
+            actor=request.user,
+            note=data.get("admin_note", ""),
+        )
+        succeeded = sum(1 for result in results if result["ok"])
+        return Response(
+            {
+                "succeeded": succeeded,
+                "failed": len(results) - succeeded,
+                "truncated": bool(remaining),
+                "remaining": remaining,
+                "results": results,
+            }
+        )
 
-        return Response({"detail": "Payout sync completed.", "synced": synced})
+    @action(detail=False, methods=["post"], permission_classes=[IsAuthenticated, IsPlatformAdmin])
+    def batch_approve(self, request):
+        return self._batch_transition(request, "approve")
+
+    @action(detail=False, methods=["post"], permission_classes=[IsAuthenticated, IsPlatformAdmin])
+    def batch_mark_paid(self, request):
+        return self._batch_transition(request, "mark_paid")
+
+    @action(detail=False, methods=["post"], permission_classes=[IsAuthenticated, IsPlatformAdmin])
+    def batch_mark_failed(self, request):
+        return self._batch_transition(request, "mark_failed")
 
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated, IsPlatformAdmin])
     def approve(self, request, pk=None):
@@ -118,15 +189,15 @@ class PayoutLedgerViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, view
         serializer.is_valid(raise_exception=True)
         note = serializer.validated_data.get("admin_note", "")
 
-        if payout.status not in {PayoutLedger.Status.PENDING, PayoutLedger.Status.FAILED}:
-            raise ValidationError("Only pending or failed payouts can be approved.")
-        validate_payout_approval_preconditions(booking=payout.booking)
+        validate_payout_transition(payout=payout, action="approve")
 
         payout.status = PayoutLedger.Status.APPROVED
         payout.admin_note = note
         payout.approved_by = request.user
         payout.approved_at = timezone.now()
-        payout.save(update_fields=["status", "admin_note", "approved_by", "approved_at", "updated_at"])
+        with transaction.atomic():
+            payout.save(update_fields=["status", "admin_note", "approved_by", "approved_at", "updated_at"])
+            refresh_earnings_summaries([payout.provider_id])
         return Response(self.get_serializer(payout).data)
 
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated, IsPlatformAdmin])
@@ -136,23 +207,16 @@ class PayoutLedgerViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, view
         serializer.is_valid(raise_exception=True)
         note = serializer.validated_data.get("admin_note", "")
 
-        if payout.status != PayoutLedger.Status.APPROVED:
-            raise ValidationError("Only approved payouts can be marked as paid.")
-        if not payout.approved_at:
-            raise ValidationError("Payout must have an approval timestamp before marking as paid.")
-
-        earliest_payout_at = payout.approved_at + timezone.timedelta(hours=24)
-        if timezone.now() < earliest_payout_at:
-            raise ValidationError(
-                "Payout anti-fraud hold is active. Mark paid only after 24 hours from approval."
-            )
+        validate_payout_transition(payout=payout, action="mark_paid")
 
         payout.status = PayoutLedger.Status.PAID
         payout.admin_note = note
         payout.payout_date = timezone.now()
         payout.paid_by = request.user
         payout.paid_at = timezone.now()
-        payout.save(update_fields=["status", "admin_note", "payout_date", "paid_by", "paid_at", "updated_at"])
+        with transaction.atomic():
+            payout.save(update_fields=["status", "admin_note", "payout_date", "paid_by", "paid_at", "updated_at"])
+            refresh_earnings_summaries([payout.provider_id])
         return Response(self.get_serializer(payout).data)
 
     @action(detail=True, methods=["post"], permission_classes=[IsAuthenticated, IsPlatformAdmin])
@@ -162,15 +226,37 @@ class PayoutLedgerViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, view
         serializer.is_valid(raise_exception=True)
         note = serializer.validated_data.get("admin_note", "")
 
-        if payout.status == PayoutLedger.Status.PAID:
-            raise ValidationError("Paid payouts cannot be marked as failed.")
+        validate_payout_transition(payout=payout, action="mark_failed")
 
         payout.status = PayoutLedger.Status.FAILED
         payout.admin_note = note
-        payout.save(update_fields=["status", "admin_note", "updated_at"])
+        with transaction.atomic():
+            payout.save(update_fields=["status", "admin_note", "updated_at"])
+            refresh_earnings_summaries([payout.provider_id])
         return Response(self.get_serializer(payout).data)
 
 
+class ProviderEarningsSummaryViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    serializer_class = ProviderEarningsSummarySerializer
+    permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = ProviderEarningsSummary.objects.select_related("provider")
+        user = self.request.user
+
+        if user.is_staff or user.role == User.Role.ADMIN:
+            provider_id = self.request.query_params.get("provider")
+            if provider_id:
+                if not provider_id.isdigit():
+                    raise ValidationError({"provider": "Must be a provider id."})
+                queryset = queryset.filter(provider_id=int(provider_id))
+        elif user.role == User.Role.PROVIDER:
+            queryset = queryset.filter(provider__user=user)
+        else:
+            queryset = queryset.none()
+        return queryset.order_by("provider_id")
+
+
 class AdminProviderPayoutProfilesViewSet(mixins.ListModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
     permission_classes = [IsAuthenticated, IsPlatformAdmin]
     serializer_class = ProviderPayoutProfileSerializer
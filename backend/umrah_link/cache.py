@@ -0,0 +1,85 @@
+import hashlib
+import time
+import uuid
+from typing import Callable
+from urllib.parse import urlencode
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from rest_framework.response import Response
+
+PUBLIC_LISTING_GENERATION_KEY = "public-listings:generation"
+PUBLIC_LISTING_LOCK_TIMEOUT = 10
+PUBLIC_LISTING_LOCK_WAIT = 2.0
+PUBLIC_LISTING_LOCK_POLL = 0.05
+
+
+def _listing_generation() -> str:
+    generation = cache.get(PUBLIC_LISTING_GENERATION_KEY)
+    if generation is None:
+        cache.add(PUBLIC_LISTING_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+        generation = cache.get(PUBLIC_LISTING_GENERATION_KEY)
+    return generation
+
+
+def _bump_listing_generation() -> None:
+    cache.set(PUBLIC_LISTING_GENERATION_KEY, uuid.uuid4().hex, timeout=None)
+
+
+def invalidate_public_listings() -> None:
+    """Retire every cached public listing. Bumped again on commit so a concurrent miss cannot re-cache old rows."""
+    _bump_listing_generation()
+    transaction.on_commit(_bump_listing_generation)
+
+
+def public_listing_cache_key(request, *, scope: str) -> str:
+    params = sorted(
+        (name, value.strip())
+        for name in request.query_params
+        for value in request.query_params.getlist(name)
+        if value.strip()
+    )
+    fingerprint = hashlib.md5(f"{request.get_host()}{request.path}?{urlencode(params)}".encode()).hexdigest()
+    return f"public-listings:{_listing_generation()}:{scope}:{fingerprint}"
+
+
+def cached_public_listing(request, *, scope: str, compute: Callable[[], object]):
+    key = public_listing_cache_key(request, scope=scope)
+    data = cache.get(key)
+    if data is not None:
+        return data
+
+    lock_key = f"{key}:lock"
+    if cache.add(lock_key, 1, timeout=PUBLIC_LISTING_LOCK_TIMEOUT):
+        try:
+            data = compute()
+            cache.set(key, data, timeout=settings.PUBLIC_LISTING_CACHE_TIMEOUT)
+            return data
+        finally:
+            cache.delete(lock_key)
+
+    # Another request is already rebuilding this page; wait briefly for its result instead of piling on.
+    deadline = time.monotonic() + PUBLIC_LISTING_LOCK_WAIT
+    while time.monotonic() < deadline:
+        time.sleep(PUBLIC_LISTING_LOCK_POLL)
+        data = cache.get(key)
+        if data is not None:
+            return data
+    return compute()
+
+
+class CachedPublicListMixin:
+    """Serve anonymous list requests through the shared public-listing cache."""
+
+    public_listing_scope = ""
+
+    def list(self, request, *args, **kwargs):
+        if request.user.is_authenticated:
+            return super().list(request, *args, **kwargs)
+        data = cached_public_listing(
+            request,
+            scope=self.public_listing_scope,
+            compute=lambda: super(CachedPublicListMixin, self).list(request, *args, **kwargs).data,
+        )
+        return Response(data)
@@ -0,0 +1,29 @@
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Keyset pagination on (created_at, id); send `?page=N` to get numbered pages with a total count instead."""
+
+    ordering = ("-created_at", "-id")
+    page_size_query_param = "page_size"
+    max_page_size = 100
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_number_paginator = None
+        if PageNumberPagination.page_query_param in request.query_params:
+            self.page_number_paginator = PageNumberPagination()
+            return self.page_number_paginator.paginate_queryset(queryset.order_by(*self.ordering), request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.page_number_paginator is not None:
+            return self.page_number_paginator.get_paginated_response(data)
+        return super().get_paginated_response(data)
+
+
+class OldestFirstCursorPagination(CreatedAtCursorPagination):
+    ordering = ("created_at", "id")
+
+
+class DateJoinedCursorPagination(CreatedAtCursorPagination):
+    ordering = ("-date_joined", "-id")
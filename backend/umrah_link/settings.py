@@ -121,6 +121,39 @@ else:
         }
     }
 
+# Listing invalidation bumps a generation key in the cache, so it only reaches the workers that share
+# the backend. Set REDIS_URL wherever more than one process serves traffic. Without it the cache is
+# per process (`locmem`; `file` is per host), and the listing TTL drops so a write that another worker
+# never saw can only leave its listings stale for a few seconds.
+REDIS_URL = os.getenv("REDIS_URL", "").strip()
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "redis" if REDIS_URL else "locmem").strip().lower()
+if CACHE_BACKEND == "redis":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL or "redis://127.0.0.1:6379/0",
+        }
+    }
+elif CACHE_BACKEND == "file":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": os.getenv("CACHE_DIR", str(BASE_DIR / ".cache")).strip(),
+        }
+    }
+elif CACHE_BACKEND == "locmem":
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "umrah-link",
+        }
+    }
+else:
+    raise ValueError("CACHE_BACKEND must be one of: redis, file, locmem.")
+PUBLIC_LISTING_CACHE_TIMEOUT = int(
+    os.getenv("PUBLIC_LISTING_CACHE_TIMEOUT", "60" if CACHE_BACKEND == "redis" else "5")
+)
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         "NAME": "django.contrib.auth.password_validation.UserAttributeSimilarityValidator",
@@ -199,6 +232,17 @@ EMAIL_HOST_PASSWORD = os.getenv("EMAIL_HOST_PASSWORD", "").strip()
 EMAIL_USE_TLS = env_bool("EMAIL_USE_TLS", True)
 EMAIL_USE_SSL = env_bool("EMAIL_USE_SSL", False)
 EMAIL_TIMEOUT = int(os.getenv("EMAIL_TIMEOUT", "30"))
+# Deliveries are queued as PENDING rows and sent by `manage.py send_notifications`.
+# Enable eager delivery only where no worker runs; it sends after the request's transaction commits.
+NOTIFICATION_DELIVERY_EAGER = env_bool("NOTIFICATION_DELIVERY_EAGER", False)
+
+# Thread event streams (`/api/messaging/threads/<id>/events/`). Writes in the same process wake a stream
+# immediately; the poll interval bounds latency for messages written by other worker processes.
+MESSAGING_STREAM_POLL_SECONDS = int(os.getenv("MESSAGING_STREAM_POLL_SECONDS", "5"))
+# Each open stream holds a WSGI worker thread for up to MESSAGING_STREAM_MAX_SECONDS; clients reconnect
+# with Last-Event-ID, so keep this short unless the streams run on dedicated (gevent/ASGI) workers.
+MESSAGING_STREAM_MAX_SECONDS = int(os.getenv("MESSAGING_STREAM_MAX_SECONDS", "25"))
+MESSAGING_STREAM_TOKEN_MAX_AGE = int(os.getenv("MESSAGING_STREAM_TOKEN_MAX_AGE", "60"))
 
 # Payments (Stripe)
 STRIPE_SECRET_KEY = os.getenv("STRIPE_SECRET_KEY", "").strip()
@@ -208,4 +252,8 @@ STRIPE_WEBHOOK_URL = os.getenv("STRIPE_WEBHOOK_URL", "").strip()
 STRIPE_SUCCESS_URL = os.getenv("STRIPE_SUCCESS_URL", "").strip()
 STRIPE_CANCEL_URL = os.getenv("STRIPE_CANCEL_URL", "").strip()
 STRIPE_WEBHOOK_TOLERANCE = int(os.getenv("STRIPE_WEBHOOK_TOLERANCE", "300"))
+# Shared keep-alive HTTP client for payment gateway calls (bookings.gateway_http).
+PAYMENT_GATEWAY_MAX_CONNECTIONS = int(os.getenv("PAYMENT_GATEWAY_MAX_CONNECTIONS", "4"))
+PAYMENT_GATEWAY_CONNECT_TIMEOUT = float(os.getenv("PAYMENT_GATEWAY_CONNECT_TIMEOUT", "5"))
+PAYMENT_GATEWAY_READ_TIMEOUT = float(os.getenv("PAYMENT_GATEWAY_READ_TIMEOUT", "20"))
 FRONTEND_BASE_URL = os.getenv("FRONTEND_BASE_URL", "http://localhost:3000").strip()
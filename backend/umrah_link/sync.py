@@ -0,0 +1,108 @@
+from datetime import datetime, timedelta, timezone as dt_timezone
+from typing import Callable, Optional
+
+from django.db.models import Q
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+from rest_framework.exceptions import ValidationError
+
+SYNC_BATCH_SIZE = 200
+# Ids and timestamps are handed out before a transaction commits, so rows newer than this may not be
+# visible yet. Each sync only covers rows at least this old; the next one picks up the rest.
+SYNC_COMMIT_LAG = timedelta(seconds=5)
+SYNC_QUERY_PARAMS = ("after_id", "since", "sync_token")
+_EPOCH = datetime(1970, 1, 1, tzinfo=dt_timezone.utc)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def wants_sync(query_params) -> bool:
+    return any(name in query_params for name in SYNC_QUERY_PARAMS)
+
+
+def encode_sync_token(last_id: int, watermark: datetime, read_after_id: int = 0) -> str:
+    parts = [last_id, (watermark - _EPOCH) // _MICROSECOND]
+    if read_after_id:
+        parts.append(read_after_id)
+    return "-".join(map(str, parts))
+
+
+def decode_sync_token(token: str) -> tuple[int, datetime, int]:
+    parts = token.split("-")
+    if len(parts) not in {2, 3} or not all(part.isdigit() for part in parts):
+        raise ValidationError({"sync_token": "Invalid sync token."})
+    last_id, micros, read_after_id = (*map(int, parts), 0)[:3]
+    return last_id, _EPOCH + timedelta(microseconds=micros), read_after_id
+
+
+def _parse_sync_params(query_params) -> tuple[int, Optional[datetime], int]:
+    after_id, since, read_after_id = 0, None, 0
+    if query_params.get("sync_token"):
+        after_id, since, read_after_id = decode_sync_token(query_params["sync_token"])
+
+    raw_after_id = query_params.get("after_id")
+    if raw_after_id is not None:
+        if not raw_after_id.isdigit():
+            raise ValidationError({"after_id": "Must be a non-negative integer."})
+        after_id = int(raw_after_id)
+
+    raw_since = query_params.get("since")
+    if raw_since is not None:
+        if raw_after_id is None:
+            raise ValidationError({"since": "Pass after_id with since, or use sync_token."})
+        since = parse_datetime(raw_since)
+        if since is None:
+            raise ValidationError({"since": "Must be an ISO 8601 datetime."})
+        if timezone.is_naive(since):
+            since = timezone.make_aware(since, dt_timezone.utc)
+        read_after_id = 0
+    return after_id, since, read_after_id
+
+
+def build_sync_payload(queryset, query_params, *, serialize: Callable[[list], list]) -> dict:
+    """Delta since the client's last sync: rows with a higher id, plus read-state changes on rows it already has.
+
+    Clients start with `after_id` and then send back `sync_token`. `since` only selects read
+    updates, so it must come with `after_id`. Both lists are capped at SYNC_BATCH_SIZE; `has_more`
+    means the client should call again with the new token straight away. Rows created or read in
+    the last SYNC_COMMIT_LAG are left for the next call, so a slow commit is not skipped.
+    """
+    after_id, since, read_after_id = _parse_sync_params(query_params)
+    horizon = timezone.now() - SYNC_COMMIT_LAG
+    watermark = max(horizon, since) if since is not None else horizon
+
+    items = list(queryset.filter(id__gt=after_id).order_by("id")[: SYNC_BATCH_SIZE + 1])
+    has_more = len(items) > SYNC_BATCH_SIZE
+    items = items[:SYNC_BATCH_SIZE]
+    # Stop at the first recent row: an older id may still be uncommitted, and after_id cannot go back.
+    settled = next((index for index, item in enumerate(items) if item.created_at > horizon), None)
+    if settled is not None:
+        items = items[:settled]
+        has_more = False
+
+    read_updates = []
+    next_read_after_id = 0
+    if since is not None and after_id:
+        # Keyset on (read_at, id): bulk mark-read stamps many rows with the same read_at.
+        changed = Q(read_at__gt=since)
+        if read_after_id:
+            changed |= Q(read_at=since, id__gt=read_after_id)
+        read_updates = list(
+            queryset.filter(changed, read_at__lte=horizon, id__lte=after_id)
+            .order_by("read_at", "id")
+            .values("id", "read_at")[: SYNC_BATCH_SIZE + 1]
+        )
+        if len(read_updates) > SYNC_BATCH_SIZE:
+            read_updates = read_updates[:SYNC_BATCH_SIZE]
+            has_more = True
+            watermark = read_updates[-1]["read_at"]
+            next_read_after_id = read_updates[-1]["id"]
+        elif read_after_id and watermark == since:
+            # Nothing past the horizon moved yet; keep the keyset position within `since`.
+            next_read_after_id = read_after_id
+
+    return {
+        "results": serialize(items),
+        "read_updates": read_updates,
+        "has_more": has_more,
+        "sync_token": encode_sync_token(items[-1].id if items else after_id, watermark, next_read_after_id),
+    }
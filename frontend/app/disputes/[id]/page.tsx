@@ -163,11 +163,11 @@ export default function DisputeDetailsPage() {
 
             <section className="panel">
               <h2 className="section-title">{t("Evidence", "الأدلة")}</h2>
-              {dispute.evidence_items.length === 0 ? (
+              {(dispute.evidence_items ?? []).length === 0 ? (
                 <p className="page-sub mini">{t("No evidence uploaded yet.", "لا توجد أدلة مرفوعة بعد.")}</p>
               ) : (
                 <div className="evidence-grid">
-                  {dispute.evidence_items.map((item) => (
+                  {(dispute.evidence_items ?? []).map((item) => (
                     <article key={item.id} className="evidence-card">
                       <p className="page-sub mini">{t("By", "بواسطة")} {item.uploader_name || t("User", "مستخدم")}</p>
                       <p className="page-sub mini">{item.note || t("No note", "لا توجد ملاحظة")}</p>
@@ -156,6 +156,8 @@ export interface BookingThread {
   provider: number;
   provider_name: string;
   is_closed: boolean;
+  unread_count: number;
+  last_read_message_id: number | null;
   created_at: string;
   updated_at: string;
 }
@@ -194,7 +196,8 @@ export interface Dispute {
   admin_note: string;
   resolved_by: number | null;
   resolved_at: string | null;
-  evidence_items: DisputeEvidence[];
+  // Always on the detail route; list responses include it only with ?include=evidence.
+  evidence_items?: DisputeEvidence[];
   created_at: string;
   updated_at: string;
 }
@@ -791,6 +794,67 @@ export function markMessageRead(token: string, messageId: number) {
   return request<ChatMessage>(`/messaging/messages/${messageId}/mark_read/`, { method: "POST", token });
 }
 
+export function createThreadStreamToken(token: string, threadId: number) {
+  return request<{ stream_token: string; expires_in: number }>(`/messaging/threads/${threadId}/stream_token/`, {
+    method: "POST",
+    token
+  });
+}
+
+export interface ThreadStreamHandlers {
+  onMessage: (message: ChatMessage) => void;
+  onRead?: (receipt: { id: number; read_at: string }) => void;
+}
+
+// EventSource cannot send the Authorization header, so each connection uses a short-lived stream token.
+// The server closes streams after a short hold; reconnects mint a fresh token and resume from the last event id.
+export function openThreadEventStream(token: string, threadId: number, handlers: ThreadStreamHandlers) {
+  let source: EventSource | null = null;
+  let lastEventId = "";
+  let closed = false;
+
+  const track = (event: MessageEvent) => {
+    if (event.lastEventId) {
+      lastEventId = event.lastEventId;
+    }
+  };
+
+  const connect = async () => {
+    try {
+      const { stream_token } = await createThreadStreamToken(token, threadId);
+      if (closed) {
+        return;
+      }
+      const query = toQueryString({ stream_token, last_id: lastEventId });
+      source = new EventSource(`${resolveApiBaseUrl()}/messaging/threads/${threadId}/events/${query}`);
+      source.addEventListener("message", (event) => {
+        track(event as MessageEvent);
+        handlers.onMessage(JSON.parse((event as MessageEvent).data) as ChatMessage);
+      });
+      source.addEventListener("read", (event) => {
+        track(event as MessageEvent);
+        handlers.onRead?.(JSON.parse((event as MessageEvent).data) as { id: number; read_at: string });
+      });
+      source.onerror = () => {
+        source?.close();
+        if (!closed) {
+          window.setTimeout(connect, 3000);
+        }
+      };
+    } catch {
+      if (!closed) {
+        window.setTimeout(connect, 3000);
+      }
+    }
+  };
+
+  void connect();
+  return () => {
+    closed = true;
+    source?.close();
+  };
+}
+
 export function markThreadMessagesRead(token: string, thread: number) {
   return request<{ updated: number }>("/messaging/messages/mark-thread-read/", {
     method: "POST",
@@ -1022,6 +1086,10 @@ export function listNotifications(token: string, filters: { unread?: 1 } = {}) {
   return request<PaginatedResponse<NotificationItem>>(`/notifications/${query}`, { token });
 }
 
+export function getUnreadNotificationCount(token: string) {
+  return request<{ unread_count: number }>("/notifications/unread_count/", { token });
+}
+
 export function markNotificationRead(token: string, notificationId: number) {
   return request<NotificationItem>(`/notifications/${notificationId}/mark_read/`, { method: "POST", token });
 }